@@ -5,46 +5,164 @@ d = { 'settings': { 'branch': 'main',
                 'doc_host': 'https://alex4321.github.io',
                 'git_url': 'https://github.com/alex4321/llama-memorizing-transformers',
                 'lib_path': 'llama_memorizing_transformers'},
-  'syms': { 'llama_memorizing_transformers.context_choice': { 'llama_memorizing_transformers.context_choice.BaseContextChoice': ( 'context_choice.html#basecontextchoice',
+  'syms': { 'llama_memorizing_transformers.benchmarks': { 'llama_memorizing_transformers.benchmarks._environment': ( 'benchmarks.html#_environment',
+                                                                                                                     'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._exact_top_k': ( 'benchmarks.html#_exact_top_k',
+                                                                                                                     'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._memory_recall': ( 'benchmarks.html#_memory_recall',
+                                                                                                                       'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._peak_rss_bytes': ( 'benchmarks.html#_peak_rss_bytes',
+                                                                                                                        'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._peak_rss_growth': ( 'benchmarks.html#_peak_rss_growth',
+                                                                                                                         'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._reset_peak_rss': ( 'benchmarks.html#_reset_peak_rss',
+                                                                                                                        'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._result_key': ( 'benchmarks.html#_result_key',
+                                                                                                                    'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._rss_bytes': ( 'benchmarks.html#_rss_bytes',
+                                                                                                                   'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._stage_totals': ( 'benchmarks.html#_stage_totals',
+                                                                                                                      'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._tiny_memorizing_llama': ( 'benchmarks.html#_tiny_memorizing_llama',
+                                                                                                                               'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks._tiny_tokenizer': ( 'benchmarks.html#_tiny_tokenizer',
+                                                                                                                        'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.benchmark_layer': ( 'benchmarks.html#benchmark_layer',
+                                                                                                                        'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.benchmark_memory': ( 'benchmarks.html#benchmark_memory',
+                                                                                                                         'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.benchmark_trainer': ( 'benchmarks.html#benchmark_trainer',
+                                                                                                                          'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.compare_benchmarks': ( 'benchmarks.html#compare_benchmarks',
+                                                                                                                           'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.main': ( 'benchmarks.html#main',
+                                                                                                             'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.memory_benchmarks': ( 'benchmarks.html#memory_benchmarks',
+                                                                                                                          'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.model_benchmarks': ( 'benchmarks.html#model_benchmarks',
+                                                                                                                         'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.run_benchmarks': ( 'benchmarks.html#run_benchmarks',
+                                                                                                                       'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.synthetic_hidden_states': ( 'benchmarks.html#synthetic_hidden_states',
+                                                                                                                                'llama_memorizing_transformers/benchmarks.py'),
+                                                          'llama_memorizing_transformers.benchmarks.tiny_llama_config': ( 'benchmarks.html#tiny_llama_config',
+                                                                                                                          'llama_memorizing_transformers/benchmarks.py')},
+            'llama_memorizing_transformers.context_choice': { 'llama_memorizing_transformers.context_choice.BaseContextChoice': ( 'context_choice.html#basecontextchoice',
                                                                                                                                   'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.BaseContextChoice.__init__': ( 'context_choice.html#basecontextchoice.__init__',
                                                                                                                                            'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.BaseContextChoice._fused_mix_parameters': ( 'context_choice.html#basecontextchoice._fused_mix_parameters',
+                                                                                                                                                        'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.BaseContextChoice.forward': ( 'context_choice.html#basecontextchoice.forward',
                                                                                                                                           'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.BaseContextChoice.get_loss_component': ( 'context_choice.html#basecontextchoice.get_loss_component',
                                                                                                                                                      'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.BaseContextChoice.global_scores': ( 'context_choice.html#basecontextchoice.global_scores',
+                                                                                                                                                'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.BaseContextChoice.local_logits': ( 'context_choice.html#basecontextchoice.local_logits',
+                                                                                                                                               'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.BaseContextChoice.mix': ( 'context_choice.html#basecontextchoice.mix',
+                                                                                                                                      'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceConstant': ( 'context_choice.html#contextchoiceconstant',
                                                                                                                                       'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceConstant.__init__': ( 'context_choice.html#contextchoiceconstant.__init__',
                                                                                                                                                'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.ContextChoiceConstant._fused_mix_parameters': ( 'context_choice.html#contextchoiceconstant._fused_mix_parameters',
+                                                                                                                                                            'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceConstant.forward': ( 'context_choice.html#contextchoiceconstant.forward',
                                                                                                                                               'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.ContextChoiceConstant.local_logits': ( 'context_choice.html#contextchoiceconstant.local_logits',
+                                                                                                                                                   'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceLinear': ( 'context_choice.html#contextchoicelinear',
                                                                                                                                     'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceLinear.__init__': ( 'context_choice.html#contextchoicelinear.__init__',
                                                                                                                                              'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.ContextChoiceLinear._fused_mix_parameters': ( 'context_choice.html#contextchoicelinear._fused_mix_parameters',
+                                                                                                                                                          'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.ContextChoiceLinear.forward': ( 'context_choice.html#contextchoicelinear.forward',
                                                                                                                                             'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.ContextChoiceLinear.local_logits': ( 'context_choice.html#contextchoicelinear.local_logits',
+                                                                                                                                                 'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.compiled_fused_context_mix': ( 'context_choice.html#compiled_fused_context_mix',
+                                                                                                                                           'llama_memorizing_transformers/context_choice.py'),
+                                                              'llama_memorizing_transformers.context_choice.fused_context_mix': ( 'context_choice.html#fused_context_mix',
+                                                                                                                                  'llama_memorizing_transformers/context_choice.py'),
                                                               'llama_memorizing_transformers.context_choice.local_score_loss': ( 'context_choice.html#local_score_loss',
                                                                                                                                  'llama_memorizing_transformers/context_choice.py')},
             'llama_memorizing_transformers.document_trainer': { 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer': ( 'document_trainer.html#memorizingllamadocumenttrainer',
                                                                                                                                                    'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer.__init__': ( 'document_trainer.html#memorizingllamadocumenttrainer.__init__',
                                                                                                                                                             'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._block_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._block_losses',
+                                                                                                                                                                 'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._cleanup': ( 'document_trainer.html#memorizingllamadocumenttrainer._cleanup',
+                                                                                                                                                            'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._context_choices': ( 'document_trainer.html#memorizingllamadocumenttrainer._context_choices',
+                                                                                                                                                                    'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._document_blocks': ( 'document_trainer.html#memorizingllamadocumenttrainer._document_blocks',
+                                                                                                                                                                    'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_batch_block_tokens': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_batch_block_tokens',
+                                                                                                                                                                           'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_block_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_block_losses',
+                                                                                                                                                                     'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_forked_train_block_tokens': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_forked_train_block_tokens',
+                                                                                                                                                                                  'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_kv_cached_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_kv_cached_losses',
+                                                                                                                                                                         'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_losses',
                                                                                                                                                                'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._get_train_block_tokens': ( 'document_trainer.html#memorizingllamadocumenttrainer._get_train_block_tokens',
                                                                                                                                                                            'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._kv_cached_block_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._kv_cached_block_losses',
+                                                                                                                                                                           'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._kv_cached_block_start': ( 'document_trainer.html#memorizingllamadocumenttrainer._kv_cached_block_start',
+                                                                                                                                                                          'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._length_buckets': ( 'document_trainer.html#memorizingllamadocumenttrainer._length_buckets',
+                                                                                                                                                                   'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._memorizing_layers': ( 'document_trainer.html#memorizingllamadocumenttrainer._memorizing_layers',
+                                                                                                                                                                      'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._profile': ( 'document_trainer.html#memorizingllamadocumenttrainer._profile',
+                                                                                                                                                            'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._rearrange_tokens': ( 'document_trainer.html#memorizingllamadocumenttrainer._rearrange_tokens',
                                                                                                                                                                      'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._retrieval_callback_kwargs': ( 'document_trainer.html#memorizingllamadocumenttrainer._retrieval_callback_kwargs',
+                                                                                                                                                                              'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._retrieval_counters': ( 'document_trainer.html#memorizingllamadocumenttrainer._retrieval_counters',
+                                                                                                                                                                       'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._set_layers_memory': ( 'document_trainer.html#memorizingllamadocumenttrainer._set_layers_memory',
+                                                                                                                                                                      'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._split_token_sequences': ( 'document_trainer.html#memorizingllamadocumenttrainer._split_token_sequences',
                                                                                                                                                                           'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._timing_callback_kwargs': ( 'document_trainer.html#memorizingllamadocumenttrainer._timing_callback_kwargs',
+                                                                                                                                                                           'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._timing_counters': ( 'document_trainer.html#memorizingllamadocumenttrainer._timing_counters',
+                                                                                                                                                                    'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._train_on_losses': ( 'document_trainer.html#memorizingllamadocumenttrainer._train_on_losses',
+                                                                                                                                                                    'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer._vocab_size': ( 'document_trainer.html#memorizingllamadocumenttrainer._vocab_size',
                                                                                                                                                                'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer.eval_document': ( 'document_trainer.html#memorizingllamadocumenttrainer.eval_document',
                                                                                                                                                                  'llama_memorizing_transformers/document_trainer.py'),
                                                                 'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer.train_document': ( 'document_trainer.html#memorizingllamadocumenttrainer.train_document',
-                                                                                                                                                                  'llama_memorizing_transformers/document_trainer.py')},
+                                                                                                                                                                  'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.MemorizingLlamaDocumentTrainer.train_documents': ( 'document_trainer.html#memorizingllamadocumenttrainer.train_documents',
+                                                                                                                                                                   'llama_memorizing_transformers/document_trainer.py'),
+                                                                'llama_memorizing_transformers.document_trainer.sliding_windows': ( 'document_trainer.html#sliding_windows',
+                                                                                                                                    'llama_memorizing_transformers/document_trainer.py')},
+            'llama_memorizing_transformers.generation': { 'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator': ( 'generation.html#memorizingllamastreaminggenerator',
+                                                                                                                                          'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator.__init__': ( 'generation.html#memorizingllamastreaminggenerator.__init__',
+                                                                                                                                                   'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator._forward': ( 'generation.html#memorizingllamastreaminggenerator._forward',
+                                                                                                                                                   'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator._next_tokens': ( 'generation.html#memorizingllamastreaminggenerator._next_tokens',
+                                                                                                                                                       'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator.generate': ( 'generation.html#memorizingllamastreaminggenerator.generate',
+                                                                                                                                                   'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.MemorizingLlamaStreamingGenerator.stream': ( 'generation.html#memorizingllamastreaminggenerator.stream',
+                                                                                                                                                 'llama_memorizing_transformers/generation.py'),
+                                                          'llama_memorizing_transformers.generation.shift_past_key_values': ( 'generation.html#shift_past_key_values',
+                                                                                                                              'llama_memorizing_transformers/generation.py')},
             'llama_memorizing_transformers.memorizing_block': { 'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer': ( 'memorizing_block.html#memorizingllamadecoderlayer',
                                                                                                                                                 'llama_memorizing_transformers/memorizing_block.py'),
                                                                 'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer.__init__': ( 'memorizing_block.html#memorizingllamadecoderlayer.__init__',
@@ -53,51 +171,611 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                                                                'llama_memorizing_transformers/memorizing_block.py'),
                                                                 'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._extract_from_memory': ( 'memorizing_block.html#memorizingllamadecoderlayer._extract_from_memory',
                                                                                                                                                                      'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._extract_row_from_memory': ( 'memorizing_block.html#memorizingllamadecoderlayer._extract_row_from_memory',
+                                                                                                                                                                         'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._gated_extract_from_memory': ( 'memorizing_block.html#memorizingllamadecoderlayer._gated_extract_from_memory',
+                                                                                                                                                                           'llama_memorizing_transformers/memorizing_block.py'),
                                                                 'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._normed': ( 'memorizing_block.html#memorizingllamadecoderlayer._normed',
                                                                                                                                                         'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._retrieval_mask': ( 'memorizing_block.html#memorizingllamadecoderlayer._retrieval_mask',
+                                                                                                                                                                'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer._take_prefetched': ( 'memorizing_block.html#memorizingllamadecoderlayer._take_prefetched',
+                                                                                                                                                                 'llama_memorizing_transformers/memorizing_block.py'),
                                                                 'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer.forward': ( 'memorizing_block.html#memorizingllamadecoderlayer.forward',
-                                                                                                                                                        'llama_memorizing_transformers/memorizing_block.py')},
-            'llama_memorizing_transformers.memory_collection': { 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection': ( 'memory_collection.html#basememorycollection',
+                                                                                                                                                        'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer.prefetch': ( 'memorizing_block.html#memorizingllamadecoderlayer.prefetch',
+                                                                                                                                                         'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.MemorizingLlamaDecoderLayer.retrieval_skip_rate': ( 'memorizing_block.html#memorizingllamadecoderlayer.retrieval_skip_rate',
+                                                                                                                                                                    'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache': ( 'memorizing_block.html#retrievalcache',
+                                                                                                                                   'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache.__init__': ( 'memorizing_block.html#retrievalcache.__init__',
+                                                                                                                                            'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache._entry': ( 'memorizing_block.html#retrievalcache._entry',
+                                                                                                                                          'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache._key': ( 'memorizing_block.html#retrievalcache._key',
+                                                                                                                                        'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache._memory_state': ( 'memorizing_block.html#retrievalcache._memory_state',
+                                                                                                                                                 'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache.clear': ( 'memorizing_block.html#retrievalcache.clear',
+                                                                                                                                         'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache.contains': ( 'memorizing_block.html#retrievalcache.contains',
+                                                                                                                                            'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache.get': ( 'memorizing_block.html#retrievalcache.get',
+                                                                                                                                       'llama_memorizing_transformers/memorizing_block.py'),
+                                                                'llama_memorizing_transformers.memorizing_block.RetrievalCache.remembered': ( 'memorizing_block.html#retrievalcache.remembered',
+                                                                                                                                              'llama_memorizing_transformers/memorizing_block.py')},
+            'llama_memorizing_transformers.memory_collection': { 'llama_memorizing_transformers.memory_collection.BaseEvictionPolicy': ( 'memory_collection.html#baseevictionpolicy',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseEvictionPolicy.choose': ( 'memory_collection.html#baseevictionpolicy.choose',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection': ( 'memory_collection.html#basememorycollection',
                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.__init__': ( 'memory_collection.html#basememorycollection.__init__',
                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection._add_batch': ( 'memory_collection.html#basememorycollection._add_batch',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection._add_filtered': ( 'memory_collection.html#basememorycollection._add_filtered',
                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection._check_position_ids_sequential': ( 'memory_collection.html#basememorycollection._check_position_ids_sequential',
                                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection._get_batch': ( 'memory_collection.html#basememorycollection._get_batch',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection._new_namespace': ( 'memory_collection.html#basememorycollection._new_namespace',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.add': ( 'memory_collection.html#basememorycollection.add',
                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.add_batch': ( 'memory_collection.html#basememorycollection.add_batch',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.fork': ( 'memory_collection.html#basememorycollection.fork',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.get': ( 'memory_collection.html#basememorycollection.get',
                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.get_batch': ( 'memory_collection.html#basememorycollection.get_batch',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.load': ( 'memory_collection.html#basememorycollection.load',
                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.mapped_bytes': ( 'memory_collection.html#basememorycollection.mapped_bytes',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.memory_bytes': ( 'memory_collection.html#basememorycollection.memory_bytes',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.metrics': ( 'memory_collection.html#basememorycollection.metrics',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.namespace': ( 'memory_collection.html#basememorycollection.namespace',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.position_offset': ( 'memory_collection.html#basememorycollection.position_offset',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.reset': ( 'memory_collection.html#basememorycollection.reset',
                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.save': ( 'memory_collection.html#basememorycollection.save',
                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.seek': ( 'memory_collection.html#basememorycollection.seek',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.set_row_remember_until_position': ( 'memory_collection.html#basememorycollection.set_row_remember_until_position',
+                                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.to': ( 'memory_collection.html#basememorycollection.to',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseMemoryCollection.version': ( 'memory_collection.html#basememorycollection.version',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec': ( 'memory_collection.html#basevectorcodec',
+                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.decode': ( 'memory_collection.html#basevectorcodec.decode',
+                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.encode': ( 'memory_collection.html#basevectorcodec.encode',
+                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.get_params': ( 'memory_collection.html#basevectorcodec.get_params',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.get_state': ( 'memory_collection.html#basevectorcodec.get_state',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.is_trained': ( 'memory_collection.html#basevectorcodec.is_trained',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.set_state': ( 'memory_collection.html#basevectorcodec.set_state',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.similarities': ( 'memory_collection.html#basevectorcodec.similarities',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.BaseVectorCodec.train': ( 'memory_collection.html#basevectorcodec.train',
+                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection': ( 'memory_collection.html#cosineknnmemorycollection',
                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.__getstate__': ( 'memory_collection.html#cosineknnmemorycollection.__getstate__',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.__init__': ( 'memory_collection.html#cosineknnmemorycollection.__init__',
                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.__setstate__': ( 'memory_collection.html#cosineknnmemorycollection.__setstate__',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._add_filtered': ( 'memory_collection.html#cosineknnmemorycollection._add_filtered',
                                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._bruteforce_kneighbors': ( 'memory_collection.html#cosineknnmemorycollection._bruteforce_kneighbors',
+                                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._bruteforce_knn': ( 'memory_collection.html#cosineknnmemorycollection._bruteforce_knn',
                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
-                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._embeddings_numpy': ( 'memory_collection.html#cosineknnmemorycollection._embeddings_numpy',
-                                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._buffer_start': ( 'memory_collection.html#cosineknnmemorycollection._buffer_start',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._collect_knns': ( 'memory_collection.html#cosineknnmemorycollection._collect_knns',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._compact': ( 'memory_collection.html#cosineknnmemorycollection._compact',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._evict': ( 'memory_collection.html#cosineknnmemorycollection._evict',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._get_buffer_knn': ( 'memory_collection.html#cosineknnmemorycollection._get_buffer_knn',
                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._get_index_executor': ( 'memory_collection.html#cosineknnmemorycollection._get_index_executor',
+                                                                                                                                                                    'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._get_search_executor': ( 'memory_collection.html#cosineknnmemorycollection._get_search_executor',
+                                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._init_slots': ( 'memory_collection.html#cosineknnmemorycollection._init_slots',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._install_knn': ( 'memory_collection.html#cosineknnmemorycollection._install_knn',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._knn': ( 'memory_collection.html#cosineknnmemorycollection._knn',
                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._new_buffer_slot': ( 'memory_collection.html#cosineknnmemorycollection._new_buffer_slot',
+                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._new_namespace': ( 'memory_collection.html#cosineknnmemorycollection._new_namespace',
+                                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._norm': ( 'memory_collection.html#cosineknnmemorycollection._norm',
                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._refit_knns': ( 'memory_collection.html#cosineknnmemorycollection._refit_knns',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._seal_buffer': ( 'memory_collection.html#cosineknnmemorycollection._seal_buffer',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._search_segment': ( 'memory_collection.html#cosineknnmemorycollection._search_segment',
+                                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._segment_kneighbors': ( 'memory_collection.html#cosineknnmemorycollection._segment_kneighbors',
+                                                                                                                                                                    'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._segment_normed': ( 'memory_collection.html#cosineknnmemorycollection._segment_normed',
+                                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._slots_normed': ( 'memory_collection.html#cosineknnmemorycollection._slots_normed',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._submit_knn': ( 'memory_collection.html#cosineknnmemorycollection._submit_knn',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection._track_retrievals': ( 'memory_collection.html#cosineknnmemorycollection._track_retrievals',
+                                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.build_knns': ( 'memory_collection.html#cosineknnmemorycollection.build_knns',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.fork': ( 'memory_collection.html#cosineknnmemorycollection.fork',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.get': ( 'memory_collection.html#cosineknnmemorycollection.get',
                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.load': ( 'memory_collection.html#cosineknnmemorycollection.load',
                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.mapped_bytes': ( 'memory_collection.html#cosineknnmemorycollection.mapped_bytes',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.max_segments': ( 'memory_collection.html#cosineknnmemorycollection.max_segments',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.memory_bytes': ( 'memory_collection.html#cosineknnmemorycollection.memory_bytes',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.metrics': ( 'memory_collection.html#cosineknnmemorycollection.metrics',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.reset': ( 'memory_collection.html#cosineknnmemorycollection.reset',
                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
                                                                  'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.save': ( 'memory_collection.html#cosineknnmemorycollection.save',
-                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py')},
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.segment_last_retrieved': ( 'memory_collection.html#cosineknnmemorycollection.segment_last_retrieved',
+                                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.segment_retrievals': ( 'memory_collection.html#cosineknnmemorycollection.segment_retrievals',
+                                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.segment_stats': ( 'memory_collection.html#cosineknnmemorycollection.segment_stats',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.CosineKnnMemoryCollection.wait_for_knns': ( 'memory_collection.html#cosineknnmemorycollection.wait_for_knns',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.FIFOEvictionPolicy': ( 'memory_collection.html#fifoevictionpolicy',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.FIFOEvictionPolicy.choose': ( 'memory_collection.html#fifoevictionpolicy.choose',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Float16Codec': ( 'memory_collection.html#float16codec',
+                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Float16Codec.decode': ( 'memory_collection.html#float16codec.decode',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Float16Codec.encode': ( 'memory_collection.html#float16codec.encode',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection': ( 'memory_collection.html#ivfmemorycollection',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.__init__': ( 'memory_collection.html#ivfmemorycollection.__init__',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.__len__': ( 'memory_collection.html#ivfmemorycollection.__len__',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._add_filtered': ( 'memory_collection.html#ivfmemorycollection._add_filtered',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._append_postings': ( 'memory_collection.html#ivfmemorycollection._append_postings',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._assign': ( 'memory_collection.html#ivfmemorycollection._assign',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._bruteforce_top': ( 'memory_collection.html#ivfmemorycollection._bruteforce_top',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._clear_lists': ( 'memory_collection.html#ivfmemorycollection._clear_lists',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._new_namespace': ( 'memory_collection.html#ivfmemorycollection._new_namespace',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._norm': ( 'memory_collection.html#ivfmemorycollection._norm',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._search': ( 'memory_collection.html#ivfmemorycollection._search',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection._train': ( 'memory_collection.html#ivfmemorycollection._train',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.assignments': ( 'memory_collection.html#ivfmemorycollection.assignments',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.get': ( 'memory_collection.html#ivfmemorycollection.get',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.is_trained': ( 'memory_collection.html#ivfmemorycollection.is_trained',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.load': ( 'memory_collection.html#ivfmemorycollection.load',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.mapped_bytes': ( 'memory_collection.html#ivfmemorycollection.mapped_bytes',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.memory_bytes': ( 'memory_collection.html#ivfmemorycollection.memory_bytes',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.posting_list': ( 'memory_collection.html#ivfmemorycollection.posting_list',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.recall': ( 'memory_collection.html#ivfmemorycollection.recall',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.reset': ( 'memory_collection.html#ivfmemorycollection.reset',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.IVFMemoryCollection.save': ( 'memory_collection.html#ivfmemorycollection.save',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec': ( 'memory_collection.html#int8scalarcodec',
+                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.__init__': ( 'memory_collection.html#int8scalarcodec.__init__',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.decode': ( 'memory_collection.html#int8scalarcodec.decode',
+                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.encode': ( 'memory_collection.html#int8scalarcodec.encode',
+                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.get_state': ( 'memory_collection.html#int8scalarcodec.get_state',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.is_trained': ( 'memory_collection.html#int8scalarcodec.is_trained',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.set_state': ( 'memory_collection.html#int8scalarcodec.set_state',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.similarities': ( 'memory_collection.html#int8scalarcodec.similarities',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.Int8ScalarCodec.train': ( 'memory_collection.html#int8scalarcodec.train',
+                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.LeastRecentlyRetrievedEvictionPolicy': ( 'memory_collection.html#leastrecentlyretrievedevictionpolicy',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.LeastRecentlyRetrievedEvictionPolicy.choose': ( 'memory_collection.html#leastrecentlyretrievedevictionpolicy.choose',
+                                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool': ( 'memory_collection.html#memorypool',
+                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.__init__': ( 'memory_collection.html#memorypool.__init__',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool._evict': ( 'memory_collection.html#memorypool._evict',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool._spill': ( 'memory_collection.html#memorypool._spill',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.activate': ( 'memory_collection.html#memorypool.activate',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.add': ( 'memory_collection.html#memorypool.add',
+                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.add_batch': ( 'memory_collection.html#memorypool.add_batch',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.drop': ( 'memory_collection.html#memorypool.drop',
+                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.fork': ( 'memory_collection.html#memorypool.fork',
+                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.get': ( 'memory_collection.html#memorypool.get',
+                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.get_batch': ( 'memory_collection.html#memorypool.get_batch',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.mapped_bytes': ( 'memory_collection.html#memorypool.mapped_bytes',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.memory': ( 'memory_collection.html#memorypool.memory',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.memory_bytes': ( 'memory_collection.html#memorypool.memory_bytes',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.metrics': ( 'memory_collection.html#memorypool.metrics',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.namespace': ( 'memory_collection.html#memorypool.namespace',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.position_offset': ( 'memory_collection.html#memorypool.position_offset',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.reset': ( 'memory_collection.html#memorypool.reset',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.seek': ( 'memory_collection.html#memorypool.seek',
+                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.set_row_remember_until_position': ( 'memory_collection.html#memorypool.set_row_remember_until_position',
+                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.stats': ( 'memory_collection.html#memorypool.stats',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.to': ( 'memory_collection.html#memorypool.to',
+                                                                                                                                    'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.top_k': ( 'memory_collection.html#memorypool.top_k',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MemoryPool.version': ( 'memory_collection.html#memorypool.version',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection': ( 'memory_collection.html#multilayermemorycollection',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.__init__': ( 'memory_collection.html#multilayermemorycollection.__init__',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection._not_a_layer_memory': ( 'memory_collection.html#multilayermemorycollection._not_a_layer_memory',
+                                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection._share_index_executor': ( 'memory_collection.html#multilayermemorycollection._share_index_executor',
+                                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.add': ( 'memory_collection.html#multilayermemorycollection.add',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.add_batch': ( 'memory_collection.html#multilayermemorycollection.add_batch',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.fork': ( 'memory_collection.html#multilayermemorycollection.fork',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.get': ( 'memory_collection.html#multilayermemorycollection.get',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.get_batch': ( 'memory_collection.html#multilayermemorycollection.get_batch',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.layer': ( 'memory_collection.html#multilayermemorycollection.layer',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.load': ( 'memory_collection.html#multilayermemorycollection.load',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.mapped_bytes': ( 'memory_collection.html#multilayermemorycollection.mapped_bytes',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.memory_bytes': ( 'memory_collection.html#multilayermemorycollection.memory_bytes',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.memory_bytes_per_layer': ( 'memory_collection.html#multilayermemorycollection.memory_bytes_per_layer',
+                                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.metrics': ( 'memory_collection.html#multilayermemorycollection.metrics',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.namespace': ( 'memory_collection.html#multilayermemorycollection.namespace',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.position_offset': ( 'memory_collection.html#multilayermemorycollection.position_offset',
+                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.remember_until_position': ( 'memory_collection.html#multilayermemorycollection.remember_until_position',
+                                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.reset': ( 'memory_collection.html#multilayermemorycollection.reset',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.save': ( 'memory_collection.html#multilayermemorycollection.save',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.seek': ( 'memory_collection.html#multilayermemorycollection.seek',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.set_row_remember_until_position': ( 'memory_collection.html#multilayermemorycollection.set_row_remember_until_position',
+                                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.stats': ( 'memory_collection.html#multilayermemorycollection.stats',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.to': ( 'memory_collection.html#multilayermemorycollection.to',
+                                                                                                                                                    'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.top_k': ( 'memory_collection.html#multilayermemorycollection.top_k',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.MultiLayerMemoryCollection.version': ( 'memory_collection.html#multilayermemorycollection.version',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec': ( 'memory_collection.html#productquantizationcodec',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.__init__': ( 'memory_collection.html#productquantizationcodec.__init__',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec._split': ( 'memory_collection.html#productquantizationcodec._split',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.decode': ( 'memory_collection.html#productquantizationcodec.decode',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.encode': ( 'memory_collection.html#productquantizationcodec.encode',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.get_params': ( 'memory_collection.html#productquantizationcodec.get_params',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.get_state': ( 'memory_collection.html#productquantizationcodec.get_state',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.is_trained': ( 'memory_collection.html#productquantizationcodec.is_trained',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.set_state': ( 'memory_collection.html#productquantizationcodec.set_state',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.similarities': ( 'memory_collection.html#productquantizationcodec.similarities',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ProductQuantizationCodec.train': ( 'memory_collection.html#productquantizationcodec.train',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection': ( 'memory_collection.html#quantizedmemorycollection',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.__init__': ( 'memory_collection.html#quantizedmemorycollection.__init__',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.__len__': ( 'memory_collection.html#quantizedmemorycollection.__len__',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._add_filtered': ( 'memory_collection.html#quantizedmemorycollection._add_filtered',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._append_codes': ( 'memory_collection.html#quantizedmemorycollection._append_codes',
+                                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._approximate_top': ( 'memory_collection.html#quantizedmemorycollection._approximate_top',
+                                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._new_namespace': ( 'memory_collection.html#quantizedmemorycollection._new_namespace',
+                                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._norm': ( 'memory_collection.html#quantizedmemorycollection._norm',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection._reconstruct': ( 'memory_collection.html#quantizedmemorycollection._reconstruct',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.codes': ( 'memory_collection.html#quantizedmemorycollection.codes',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.get': ( 'memory_collection.html#quantizedmemorycollection.get',
+                                                                                                                                                    'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.load': ( 'memory_collection.html#quantizedmemorycollection.load',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.mapped_bytes': ( 'memory_collection.html#quantizedmemorycollection.mapped_bytes',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.memory_bytes': ( 'memory_collection.html#quantizedmemorycollection.memory_bytes',
+                                                                                                                                                             'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.norms': ( 'memory_collection.html#quantizedmemorycollection.norms',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.reset': ( 'memory_collection.html#quantizedmemorycollection.reset',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.QuantizedMemoryCollection.save': ( 'memory_collection.html#quantizedmemorycollection.save',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ReservoirEvictionPolicy': ( 'memory_collection.html#reservoirevictionpolicy',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ReservoirEvictionPolicy.__init__': ( 'memory_collection.html#reservoirevictionpolicy.__init__',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.ReservoirEvictionPolicy.choose': ( 'memory_collection.html#reservoirevictionpolicy.choose',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection': ( 'memory_collection.html#torchmemorycollection',
+                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.__init__': ( 'memory_collection.html#torchmemorycollection.__init__',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection._add_filtered': ( 'memory_collection.html#torchmemorycollection._add_filtered',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection._get_batch': ( 'memory_collection.html#torchmemorycollection._get_batch',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection._new_namespace': ( 'memory_collection.html#torchmemorycollection._new_namespace',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection._norm': ( 'memory_collection.html#torchmemorycollection._norm',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection._reserve': ( 'memory_collection.html#torchmemorycollection._reserve',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.fork': ( 'memory_collection.html#torchmemorycollection.fork',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.get': ( 'memory_collection.html#torchmemorycollection.get',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.keys': ( 'memory_collection.html#torchmemorycollection.keys',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.load': ( 'memory_collection.html#torchmemorycollection.load',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.memory_bytes': ( 'memory_collection.html#torchmemorycollection.memory_bytes',
+                                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.reset': ( 'memory_collection.html#torchmemorycollection.reset',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.save': ( 'memory_collection.html#torchmemorycollection.save',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.to': ( 'memory_collection.html#torchmemorycollection.to',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.TorchMemoryCollection.values': ( 'memory_collection.html#torchmemorycollection.values',
+                                                                                                                                                   'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena': ( 'memory_collection.html#vectorarena',
+                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.__getstate__': ( 'memory_collection.html#vectorarena.__getstate__',
+                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.__init__': ( 'memory_collection.html#vectorarena.__init__',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.__len__': ( 'memory_collection.html#vectorarena.__len__',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena._reserve': ( 'memory_collection.html#vectorarena._reserve',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena._storage_file': ( 'memory_collection.html#vectorarena._storage_file',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.append': ( 'memory_collection.html#vectorarena.append',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.capacity': ( 'memory_collection.html#vectorarena.capacity',
+                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.clear': ( 'memory_collection.html#vectorarena.clear',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.fork': ( 'memory_collection.html#vectorarena.fork',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.from_arrays': ( 'memory_collection.html#vectorarena.from_arrays',
+                                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.load': ( 'memory_collection.html#vectorarena.load',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.mapped_nbytes': ( 'memory_collection.html#vectorarena.mapped_nbytes',
+                                                                                                                                                'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.nbytes': ( 'memory_collection.html#vectorarena.nbytes',
+                                                                                                                                         'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.read_only': ( 'memory_collection.html#vectorarena.read_only',
+                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.save': ( 'memory_collection.html#vectorarena.save',
+                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.vectors': ( 'memory_collection.html#vectorarena.vectors',
+                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.vectors_normed': ( 'memory_collection.html#vectorarena.vectors_normed',
+                                                                                                                                                 'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.VectorArena.write': ( 'memory_collection.html#vectorarena.write',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection': ( 'memory_collection.html#writebehindmemorycollection',
+                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.__init__': ( 'memory_collection.html#writebehindmemorycollection.__init__',
+                                                                                                                                                           'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.add': ( 'memory_collection.html#writebehindmemorycollection.add',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.add_batch': ( 'memory_collection.html#writebehindmemorycollection.add_batch',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.flush': ( 'memory_collection.html#writebehindmemorycollection.flush',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.fork': ( 'memory_collection.html#writebehindmemorycollection.fork',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.get': ( 'memory_collection.html#writebehindmemorycollection.get',
+                                                                                                                                                      'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.get_batch': ( 'memory_collection.html#writebehindmemorycollection.get_batch',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.mapped_bytes': ( 'memory_collection.html#writebehindmemorycollection.mapped_bytes',
+                                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.memory_bytes': ( 'memory_collection.html#writebehindmemorycollection.memory_bytes',
+                                                                                                                                                               'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.metrics': ( 'memory_collection.html#writebehindmemorycollection.metrics',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.namespace': ( 'memory_collection.html#writebehindmemorycollection.namespace',
+                                                                                                                                                            'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.position_offset': ( 'memory_collection.html#writebehindmemorycollection.position_offset',
+                                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.remember_until_position': ( 'memory_collection.html#writebehindmemorycollection.remember_until_position',
+                                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.reset': ( 'memory_collection.html#writebehindmemorycollection.reset',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.save': ( 'memory_collection.html#writebehindmemorycollection.save',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.seek': ( 'memory_collection.html#writebehindmemorycollection.seek',
+                                                                                                                                                       'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.set_row_remember_until_position': ( 'memory_collection.html#writebehindmemorycollection.set_row_remember_until_position',
+                                                                                                                                                                                  'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.to': ( 'memory_collection.html#writebehindmemorycollection.to',
+                                                                                                                                                     'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.top_k': ( 'memory_collection.html#writebehindmemorycollection.top_k',
+                                                                                                                                                        'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection.WriteBehindMemoryCollection.version': ( 'memory_collection.html#writebehindmemorycollection.version',
+                                                                                                                                                          'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection._kmeans': ( 'memory_collection.html#_kmeans',
+                                                                                                                              'llama_memorizing_transformers/memory_collection.py'),
+                                                                 'llama_memorizing_transformers.memory_collection._top_similarities': ( 'memory_collection.html#_top_similarities',
+                                                                                                                                        'llama_memorizing_transformers/memory_collection.py')},
             'llama_memorizing_transformers.model_wrapper': { 'llama_memorizing_transformers.model_wrapper.replace_llama_layer_with_memory': ( 'model_wrapper.html#replace_llama_layer_with_memory',
-                                                                                                                                              'llama_memorizing_transformers/model_wrapper.py')}}}
+                                                                                                                                              'llama_memorizing_transformers/model_wrapper.py'),
+                                                             'llama_memorizing_transformers.model_wrapper.replace_llama_layers_with_memory': ( 'model_wrapper.html#replace_llama_layers_with_memory',
+                                                                                                                                               'llama_memorizing_transformers/model_wrapper.py')},
+            'llama_memorizing_transformers.perplexity': { 'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator': ( 'perplexity.html#slidingwindowperplexityevaluator',
+                                                                                                                                         'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator.__init__': ( 'perplexity.html#slidingwindowperplexityevaluator.__init__',
+                                                                                                                                                  'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator._batch_results': ( 'perplexity.html#slidingwindowperplexityevaluator._batch_results',
+                                                                                                                                                        'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator._evaluate_batch': ( 'perplexity.html#slidingwindowperplexityevaluator._evaluate_batch',
+                                                                                                                                                         'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator._forward': ( 'perplexity.html#slidingwindowperplexityevaluator._forward',
+                                                                                                                                                  'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator._windows': ( 'perplexity.html#slidingwindowperplexityevaluator._windows',
+                                                                                                                                                  'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.SlidingWindowPerplexityEvaluator.evaluate': ( 'perplexity.html#slidingwindowperplexityevaluator.evaluate',
+                                                                                                                                                  'llama_memorizing_transformers/perplexity.py'),
+                                                          'llama_memorizing_transformers.perplexity.perplexity_summary': ( 'perplexity.html#perplexity_summary',
+                                                                                                                           'llama_memorizing_transformers/perplexity.py')},
+            'llama_memorizing_transformers.profiling': { 'llama_memorizing_transformers.profiling.StageTimer': ( 'profiling.html#stagetimer',
+                                                                                                                 'llama_memorizing_transformers/profiling.py'),
+                                                         'llama_memorizing_transformers.profiling.StageTimer.__init__': ( 'profiling.html#stagetimer.__init__',
+                                                                                                                          'llama_memorizing_transformers/profiling.py'),
+                                                         'llama_memorizing_transformers.profiling.StageTimer.measure': ( 'profiling.html#stagetimer.measure',
+                                                                                                                         'llama_memorizing_transformers/profiling.py'),
+                                                         'llama_memorizing_transformers.profiling.StageTimer.reset': ( 'profiling.html#stagetimer.reset',
+                                                                                                                       'llama_memorizing_transformers/profiling.py'),
+                                                         'llama_memorizing_transformers.profiling.StageTimer.totals': ( 'profiling.html#stagetimer.totals',
+                                                                                                                        'llama_memorizing_transformers/profiling.py'),
+                                                         'llama_memorizing_transformers.profiling.merge_totals': ( 'profiling.html#merge_totals',
+                                                                                                                   'llama_memorizing_transformers/profiling.py')},
+            'llama_memorizing_transformers.token_corpus': { 'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader': ( 'token_corpus.html#corpusdocumentloader',
+                                                                                                                                 'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader.__init__': ( 'token_corpus.html#corpusdocumentloader.__init__',
+                                                                                                                                          'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader.__iter__': ( 'token_corpus.html#corpusdocumentloader.__iter__',
+                                                                                                                                          'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader.__len__': ( 'token_corpus.html#corpusdocumentloader.__len__',
+                                                                                                                                         'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader._order': ( 'token_corpus.html#corpusdocumentloader._order',
+                                                                                                                                        'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader._read': ( 'token_corpus.html#corpusdocumentloader._read',
+                                                                                                                                       'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.CorpusDocumentLoader.batches': ( 'token_corpus.html#corpusdocumentloader.batches',
+                                                                                                                                         'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus': ( 'token_corpus.html#tokencorpus',
+                                                                                                                        'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.__init__': ( 'token_corpus.html#tokencorpus.__init__',
+                                                                                                                                 'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.__len__': ( 'token_corpus.html#tokencorpus.__len__',
+                                                                                                                                'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.session': ( 'token_corpus.html#tokencorpus.session',
+                                                                                                                                'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.session_count': ( 'token_corpus.html#tokencorpus.session_count',
+                                                                                                                                      'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.session_lengths': ( 'token_corpus.html#tokencorpus.session_lengths',
+                                                                                                                                        'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.session_names': ( 'token_corpus.html#tokencorpus.session_names',
+                                                                                                                                      'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.session_tokens': ( 'token_corpus.html#tokencorpus.session_tokens',
+                                                                                                                                       'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.text': ( 'token_corpus.html#tokencorpus.text',
+                                                                                                                             'llama_memorizing_transformers/token_corpus.py'),
+                                                            'llama_memorizing_transformers.token_corpus.TokenCorpus.write': ( 'token_corpus.html#tokencorpus.write',
+                                                                                                                              'llama_memorizing_transformers/token_corpus.py')}}}
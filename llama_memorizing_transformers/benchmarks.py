@@ -0,0 +1,431 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/13_benchmarks.ipynb.
+
+# %% auto 0
+__all__ = ['MEMORY_BACKENDS', 'synthetic_hidden_states', 'benchmark_memory', 'memory_benchmarks', 'tiny_llama_config',
+           'benchmark_layer', 'benchmark_trainer', 'model_benchmarks', 'run_benchmarks', 'compare_benchmarks', 'main']
+
+# %% ../nbs/13_benchmarks.ipynb 2
+import os
+import sys
+import gc
+import json
+import time
+import types
+import platform
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import torch
+from transformers.models.llama import LlamaConfig, LlamaForCausalLM
+from . import __version__
+from .memory_collection import BaseMemoryCollection, CosineKnnMemoryCollection, \
+    TorchMemoryCollection, QuantizedMemoryCollection, Int8ScalarCodec, IVFMemoryCollection
+from .context_choice import ContextChoiceLinear
+from .memorizing_block import MemorizingLlamaDecoderLayer
+from .model_wrapper import replace_llama_layer_with_memory
+from .document_trainer import MemorizingLlamaDocumentTrainer
+from .profiling import merge_totals
+
+# %% ../nbs/13_benchmarks.ipynb 4
+def synthetic_hidden_states(tokens: int, dim: int, clusters: int = 32, seed: int = 0) -> torch.FloatTensor:
+    """
+    Hidden states-like vectors: noisy points around the random cluster centers
+    (real hidden states are far from uniform, and the approximate search quality depends on it)
+    :returns: (tokens, dim) array
+    """
+    generator = torch.Generator().manual_seed(seed)
+    centers = torch.randn((clusters, dim), generator=generator) * 2.0
+    assignments = torch.randint(0, clusters, (tokens,), generator=generator)
+    return centers[assignments] + torch.randn((tokens, dim), generator=generator)
+
+
+def _rss_bytes() -> Optional[int]:
+    # Current resident set size (Linux only)
+    try:
+        with open("/proc/self/statm", "r") as src:
+            return int(src.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _reset_peak_rss() -> bool:
+    # Linux resets the process peak resident set size (VmHWM) to the current one on this write
+    try:
+        with open("/proc/self/clear_refs", "w") as dst:
+            dst.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    # Peak resident set size since the last `_reset_peak_rss`, or since the process start if it is not supported
+    try:
+        with open("/proc/self/status", "r") as src:
+            for line in src:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _peak_rss_growth(peak_reset: bool, rss_before: Optional[int], peak_before: Optional[int],
+                     peak_after: Optional[int]) -> Optional[int]:
+    # With the reset peak - how much the run peak exceeds the RSS at the run start,
+    # otherwise - how much the process high-water mark grew during the run
+    start = rss_before if peak_reset else peak_before
+    if peak_after is None or start is None:
+        return None
+    return peak_after - start
+
+
+def _exact_top_k(keys: torch.FloatTensor, queries: torch.FloatTensor, top_k: int) -> torch.LongTensor:
+    keys = keys / torch.linalg.vector_norm(keys, dim=-1, keepdim=True).clamp_min(1e-8)
+    queries = queries / torch.linalg.vector_norm(queries, dim=-1, keepdim=True).clamp_min(1e-8)
+    return torch.topk(queries @ keys.T, min(top_k, keys.shape[0]), dim=-1).indices
+
+
+def _memory_recall(keys: torch.FloatTensor, queries: torch.FloatTensor, memories: torch.FloatTensor) -> float:
+    """
+    Share of the exact top_k neighbours found.
+    Memories return the vectors, not their indices, so every returned vector is matched to the closest key
+    (which is the vector itself for the lossless memories).
+    """
+    top_k = memories.shape[1]
+    exact = _exact_top_k(keys, queries, top_k)
+    found = 0
+    for query in range(queries.shape[0]):
+        returned = _exact_top_k(keys, memories[query].float(), 1)[:, 0]
+        found += np.intersect1d(returned.numpy(), exact[query].numpy()).shape[0]
+    return found / (queries.shape[0] * exact.shape[1])
+
+
+MEMORY_BACKENDS: Dict[str, Tuple[Callable[[int, int], BaseMemoryCollection], bool]] = {
+    # name -> (factory of (top_k, max_temporary_buffer_size), whether max_temporary_buffer_size is used)
+    "cosine-knn": (lambda top_k, buffer_size: CosineKnnMemoryCollection(top_k, buffer_size), True),
+    "torch": (lambda top_k, buffer_size: TorchMemoryCollection(top_k), False),
+    "quantized-int8": (lambda top_k, buffer_size: QuantizedMemoryCollection(top_k, buffer_size, Int8ScalarCodec()), True),
+    "ivf": (lambda top_k, buffer_size: IVFMemoryCollection(top_k, lists=32), False),
+}
+
+
+def benchmark_memory(memory_factory: Callable[[], BaseMemoryCollection],
+                     memory_tokens: int,
+                     dim: int = 128,
+                     queries: int = 256,
+                     chunk_size: int = 512,
+                     repeats: int = 5,
+                     seed: int = 0) -> Dict[str, float]:
+    """
+    Fill the memory with synthetic hidden states chunk by chunk, then query it
+    :param memory_factory: creates an empty memory
+    :param memory_tokens: how much vectors to remember
+    :param dim: vectors dimension
+    :param queries: how much vectors to retrieve the memories for in every `get` call
+    :param chunk_size: how much vectors are given to every `add` call
+    :param repeats: how much times to repeat `get` (the median latency is reported)
+    :returns: add throughput, get latency, memory size, recall of the exact top_k neighbours and RSS changes:
+              `rss_growth_bytes` - RSS after the run minus RSS before it,
+              `peak_rss_growth_bytes` - peak RSS during the run minus RSS before it (where the peak can not be reset -
+              Linux only - it is the process high-water mark growth during the run, which is 0 if an earlier
+              benchmark reached a higher peak)
+    """
+    keys = synthetic_hidden_states(memory_tokens, dim, seed=seed)
+    query_vectors = synthetic_hidden_states(queries, dim, seed=seed + 1)
+    gc.collect()
+    peak_reset = _reset_peak_rss()
+    rss_before = _rss_bytes()
+    peak_before = _peak_rss_bytes()
+    memory = memory_factory()
+    memory.remember_until_position = memory_tokens
+    start = time.perf_counter()
+    for chunk_start in range(0, memory_tokens, chunk_size):
+        chunk = keys[chunk_start : chunk_start + chunk_size]
+        memory.add(chunk, torch.arange(chunk.shape[0]))
+    add_seconds = time.perf_counter() - start
+    get_seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        memories = memory.get(query_vectors)
+        get_seconds.append(time.perf_counter() - start)
+    rss_after = _rss_bytes()
+    peak_after = _peak_rss_bytes()
+    get_seconds = float(np.median(get_seconds))
+    return {
+        "add_tokens_per_second": memory_tokens / add_seconds,
+        "get_latency_ms": get_seconds * 1000.0,
+        "get_queries_per_second": queries / get_seconds,
+        "memory_bytes": memory.memory_bytes(),
+        "rss_growth_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "peak_rss_growth_bytes": _peak_rss_growth(peak_reset, rss_before, peak_before, peak_after),
+        "recall": _memory_recall(keys, query_vectors, memories),
+    }
+
+
+def memory_benchmarks(backends: Optional[Sequence[str]] = None,
+                      memory_sizes: Sequence[int] = (4096, 16384, 65536),
+                      top_ks: Sequence[int] = (8, 32),
+                      buffer_sizes: Sequence[int] = (512, 4096),
+                      dim: int = 128,
+                      queries: int = 256,
+                      repeats: int = 5,
+                      seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `benchmark_memory` over the grid of the backends (`MEMORY_BACKENDS` names), memory sizes, top_k
+    and max_temporary_buffer_size values (the last ones only for the backends which use it)
+    """
+    results = []
+    for backend in backends or list(MEMORY_BACKENDS):
+        factory, buffered = MEMORY_BACKENDS[backend]
+        for memory_tokens in memory_sizes:
+            for top_k in top_ks:
+                for buffer_size in buffer_sizes if buffered else [None]:
+                    params = {
+                        "backend": backend,
+                        "memory_tokens": memory_tokens,
+                        "top_k": top_k,
+                        "max_temporary_buffer_size": buffer_size,
+                        "dim": dim,
+                        "queries": queries,
+                    }
+                    metrics = benchmark_memory(lambda: factory(top_k, buffer_size), memory_tokens,
+                                               dim=dim, queries=queries, repeats=repeats, seed=seed)
+                    results.append({"benchmark": "memory", "params": params, "metrics": metrics})
+    return results
+
+# %% ../nbs/13_benchmarks.ipynb 6
+def tiny_llama_config(hidden_size: int = 128, layers: int = 4, heads: int = 4, vocab_size: int = 1000,
+                      max_position_embeddings: int = 4096) -> LlamaConfig:
+    return LlamaConfig(vocab_size=vocab_size,
+                       hidden_size=hidden_size,
+                       intermediate_size=hidden_size * 2,
+                       num_hidden_layers=layers,
+                       num_attention_heads=heads,
+                       max_position_embeddings=max_position_embeddings)
+
+
+def _tiny_memorizing_llama(config: LlamaConfig, memory: BaseMemoryCollection, layer_index: Optional[int],
+                           seed: int, **patch_kwargs) -> Tuple[LlamaForCausalLM, ContextChoiceLinear, MemorizingLlamaDecoderLayer]:
+    torch.manual_seed(seed)
+    model = LlamaForCausalLM(config)
+    context_choice = ContextChoiceLinear(config.num_attention_heads, config.hidden_size)
+    if layer_index is None:
+        layer_index = config.num_hidden_layers // 2
+    replace_llama_layer_with_memory(model.model, layer_index, context_choice, memory, **patch_kwargs)
+    return model, context_choice, model.model.layers[layer_index]
+
+
+def _tiny_tokenizer(config: LlamaConfig) -> types.SimpleNamespace:
+    # The trainer only needs the padding token and the vocabulary size, the last token id is the padding one
+    return types.SimpleNamespace(pad_token_id=config.vocab_size - 1, vocab_size=config.vocab_size - 1)
+
+
+def _stage_totals(callback_kwargs: List[Dict[str, Any]]) -> Dict[str, float]:
+    return merge_totals(*[
+        {key: value for key, value in kwargs.items() if key.endswith(("_seconds", "_calls"))}
+        for kwargs in callback_kwargs
+    ])
+
+
+def benchmark_layer(config: Optional[LlamaConfig] = None,
+                    memory_factory: Optional[Callable[[], BaseMemoryCollection]] = None,
+                    tokens_per_chunk: int = 256,
+                    chunks: int = 8,
+                    layer_index: Optional[int] = None,
+                    seed: int = 0,
+                    **patch_kwargs) -> Dict[str, float]:
+    """
+    Inference over the consecutive chunks of a random document, every chunk retrieves the memories of the previous ones
+    :param config: model config (`tiny_llama_config()` by default)
+    :param memory_factory: creates an empty memory with top_k = 1 (one memory embedding per token)
+                           (`CosineKnnMemoryCollection` with the tokens_per_chunk buffer by default)
+    :param patch_kwargs: `replace_llama_layer_with_memory` arguments (retrieval_threshold, mixing, ...)
+    :returns: tokens per second of the whole model and of the memorizing layer, and the layer stages times
+    """
+    config = config or tiny_llama_config()
+    memory = memory_factory() if memory_factory else CosineKnnMemoryCollection(1, tokens_per_chunk)
+    memory.remember_until_position = tokens_per_chunk * chunks
+    model, _, layer = _tiny_memorizing_llama(config, memory, layer_index, seed, **patch_kwargs)
+    model.eval()
+    tokens = torch.randint(0, config.vocab_size - 1, (1, tokens_per_chunk * chunks),
+                           generator=torch.Generator().manual_seed(seed))
+    start = time.perf_counter()
+    with torch.no_grad():
+        for chunk_start in range(0, tokens.shape[1], tokens_per_chunk):
+            model.model(input_ids=tokens[:, chunk_start : chunk_start + tokens_per_chunk])
+    seconds = time.perf_counter() - start
+    layer_totals = layer.timer.totals()
+    layer_seconds = sum(value for key, value in layer_totals.items() if key.endswith("_seconds"))
+    return dict(
+        {key: value for key, value in layer_totals.items() if key.endswith("_seconds")},
+        model_tokens_per_second=tokens.shape[1] / seconds,
+        layer_tokens_per_second=tokens.shape[1] / layer_seconds,
+    )
+
+
+def benchmark_trainer(config: Optional[LlamaConfig] = None,
+                      memory_factory: Optional[Callable[[], BaseMemoryCollection]] = None,
+                      document_tokens: int = 1024,
+                      prompts: int = 2,
+                      prompt_tokens: int = 64,
+                      tokens_per_chunk: int = 256,
+                      tokens_step: int = 128,
+                      seed: int = 0,
+                      **trainer_kwargs) -> Dict[str, Dict[str, float]]:
+    """
+    `train_document` and `eval_document` over a random document with random prompts
+    :param config: model config (`tiny_llama_config()` by default)
+    :param memory_factory: creates an empty memory with top_k = 1 (one memory embedding per token)
+                           (`CosineKnnMemoryCollection` with the tokens_step buffer by default)
+    :param trainer_kwargs: `MemorizingLlamaDocumentTrainer` optional arguments (fork_document_memory, eval_kv_cache, cleanup, ...)
+    :returns: "train_document" and "eval_document" tokens per second (of the document + prompt sequences)
+              and the stages times summed over the blocks
+    """
+    config = config or tiny_llama_config()
+    memory = memory_factory() if memory_factory else CosineKnnMemoryCollection(1, tokens_step)
+    model, context_choice, _ = _tiny_memorizing_llama(config, memory, None, seed)
+    generator = torch.Generator().manual_seed(seed)
+    document = torch.randint(0, config.vocab_size - 1, (document_tokens,), generator=generator)
+    prompt = torch.randint(0, config.vocab_size - 1, (prompts, prompt_tokens), generator=generator)
+    train_kwargs = []
+    eval_kwargs = []
+    trainer = MemorizingLlamaDocumentTrainer(model, context_choice, _tiny_tokenizer(config), memory,
+                                             tokens_per_chunk, tokens_step,
+                                             torch.optim.SGD(model.parameters(), lr=1e-4), None, 1, False,
+                                             lambda **kwargs: train_kwargs.append(kwargs),
+                                             lambda **kwargs: eval_kwargs.append(kwargs),
+                                             **trainer_kwargs)
+    sequence_tokens = prompts * (document_tokens + prompt_tokens)
+    results = {}
+    for kind, method, callback_kwargs in [("train_document", trainer.train_document, train_kwargs),
+                                          ("eval_document", trainer.eval_document, eval_kwargs)]:
+        start = time.perf_counter()
+        method(document, prompt, 1.0, {})
+        seconds = time.perf_counter() - start
+        results[kind] = dict(
+            {key: value for key, value in _stage_totals(callback_kwargs).items() if key.endswith("_seconds")},
+            tokens_per_second=sequence_tokens / seconds,
+            blocks=len(callback_kwargs),
+        )
+    return results
+
+
+def model_benchmarks(config: Optional[LlamaConfig] = None, seed: int = 0, quick: bool = False) -> List[Dict[str, Any]]:
+    """
+    `benchmark_layer` with every context mixing path and `benchmark_trainer` with and without the eval keys / values cache
+    """
+    config = config or tiny_llama_config()
+    config_params = {
+        "hidden_size": config.hidden_size,
+        "layers": config.num_hidden_layers,
+        "heads": config.num_attention_heads,
+        "vocab_size": config.vocab_size,
+    }
+    results = []
+    chunks = 4 if quick else 8
+    for mixing in ["unfused", "fused"]:
+        params = dict(config_params, tokens_per_chunk=256, chunks=chunks, mixing=mixing)
+        metrics = benchmark_layer(config, tokens_per_chunk=256, chunks=chunks, seed=seed, mixing=mixing)
+        results.append({"benchmark": "layer", "params": params, "metrics": metrics})
+    document_tokens = 512 if quick else 1024
+    for eval_kv_cache in [False, True]:
+        params = dict(config_params, document_tokens=document_tokens, prompts=2, prompt_tokens=64,
+                      tokens_per_chunk=256, tokens_step=128, eval_kv_cache=eval_kv_cache, cleanup="never")
+        metrics = benchmark_trainer(config, document_tokens=document_tokens, seed=seed,
+                                    eval_kv_cache=eval_kv_cache, cleanup="never")
+        for kind, kind_metrics in metrics.items():
+            results.append({"benchmark": kind, "params": params, "metrics": kind_metrics})
+    return results
+
+# %% ../nbs/13_benchmarks.ipynb 8
+def _environment() -> Dict[str, Any]:
+    return {
+        "package_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "numpy": np.__version__,
+    }
+
+
+def run_benchmarks(quick: bool = False, seed: int = 0) -> Dict[str, Any]:
+    """
+    Run the memory and the model benchmarks on CPU
+    :param quick: smaller memory sizes / documents and less parameter combinations
+    :returns: JSON-serializable results with the environment description
+    """
+    if quick:
+        memory_results = memory_benchmarks(memory_sizes=(4096,), top_ks=(8,), buffer_sizes=(512,), seed=seed)
+    else:
+        memory_results = memory_benchmarks(seed=seed)
+    return {
+        "format": "memorizing-benchmarks",
+        "version": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "quick": quick,
+        "environment": _environment(),
+        "results": memory_results + model_benchmarks(seed=seed, quick=quick),
+    }
+
+
+def _result_key(result: Dict[str, Any]) -> str:
+    return json.dumps([result["benchmark"], result["params"]], sort_keys=True)
+
+
+def compare_benchmarks(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Current / baseline ratio of every metric of the benchmarks (with the same parameters) found in both runs
+    :param baseline: `run_benchmarks` results of the previous run
+    :param current: `run_benchmarks` results of the new run
+    """
+    baseline_results = {_result_key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        baseline_result = baseline_results.get(_result_key(result))
+        if baseline_result is None:
+            continue
+        ratios = {}
+        for metric, value in result["metrics"].items():
+            baseline_value = baseline_result["metrics"].get(metric)
+            if value is not None and baseline_value:
+                ratios[metric] = value / baseline_value
+        comparison.append({"benchmark": result["benchmark"], "params": result["params"], "ratios": ratios})
+    return comparison
+
+# %% ../nbs/13_benchmarks.ipynb 9
+#| eval: false
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="CPU benchmarks of the memory collections and the memorizing layer")
+    parser.add_argument("--output", help="where to save the results JSON")
+    parser.add_argument("--quick", action="store_true", help="smaller and fewer benchmarks")
+    parser.add_argument("--threads", type=int, help="torch CPU threads")
+    parser.add_argument("--compare", help="previous results JSON to compare the new results with")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(args)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    results = run_benchmarks(quick=args.quick, seed=args.seed)
+    if args.output:
+        with open(args.output, "w") as dst:
+            json.dump(results, dst, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, "r") as src:
+            baseline = json.load(src)
+        for item in compare_benchmarks(baseline, results):
+            ratios = ", ".join(f"{metric}: x{ratio:.2f}" for metric, ratio in item["ratios"].items())
+            print(item["benchmark"], json.dumps(item["params"], sort_keys=True), ratios, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,75 @@
-# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/00_context_choice.ipynb.
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/01_context_choice.ipynb.
 
 # %% auto 0
-__all__ = ['LOCAL_LOSS_K', 'local_score_loss', 'BaseContextChoice', 'ContextChoiceLinear', 'ContextChoiceConstant']
+__all__ = ['LOCAL_LOSS_K', 'local_score_loss', 'fused_context_mix', 'compiled_fused_context_mix', 'BaseContextChoice',
+           'ContextChoiceLinear', 'ContextChoiceConstant']
 
-# %% ../nbs/00_context_choice.ipynb 2
+# %% ../nbs/01_context_choice.ipynb 2
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Union
+from typing import Union, Optional, Tuple
 
-# %% ../nbs/00_context_choice.ipynb 3
+# %% ../nbs/01_context_choice.ipynb 3
 LOCAL_LOSS_K = 1.0
 
-# %% ../nbs/00_context_choice.ipynb 4
+# %% ../nbs/01_context_choice.ipynb 4
 def local_score_loss(local_score: torch.FloatTensor) -> torch.FloatTensor:
     targets = torch.zeros(local_score.shape, dtype=local_score.dtype, device=local_score.device)
     return F.binary_cross_entropy_with_logits(local_score, targets)
 
-# %% ../nbs/00_context_choice.ipynb 5
+# %% ../nbs/01_context_choice.ipynb 5
+def fused_context_mix(hidden_states_local: torch.FloatTensor,
+                      hidden_states_global: torch.FloatTensor,
+                      weights: Optional[torch.FloatTensor],
+                      biases: torch.FloatTensor,
+                      attention_heads: int,
+                      eps: float = 1e-4) -> Tuple[torch.FloatTensor, torch.FloatTensor]:
+    """
+    Normalize, gate, blend and rescale in one pass:
+    `context_choice(local / local_norm, global / global_norm) * local_norm` without the normalized copies.
+    The local part is rescaled back to itself, so only the global part is scaled by `local_norm / global_norm`,
+    and the gate logits of the normalized local embeddings are the raw ones divided by the norm.
+    :param hidden_states_local: batch_size x sequence_length x embedding_dim, not normalized
+    :param hidden_states_global: batch_size x sequence_length x embedding_dim, not normalized
+    :param weights: attention_heads x head_dim x 1 gate weights (None - constant gate)
+    :param biases: attention_heads gate biases
+    :returns: batch_size x sequence_length x embedding_dim mixed embeddings and the local logits
+    """
+    batch_size, sequence_length, embedding_dim = hidden_states_local.shape
+    # batch_size x sequence_length x attention_heads x head_dim
+    embeddings_local = hidden_states_local.view((batch_size, sequence_length, attention_heads, -1))
+    embeddings_global = hidden_states_global.view((batch_size, sequence_length, attention_heads, -1))
+    # batch_size x sequence_length x 1 x 1
+    norm_local = torch.linalg.vector_norm(hidden_states_local, dim=-1)[..., None, None] + eps
+    norm_global = torch.linalg.vector_norm(hidden_states_global, dim=-1)[..., None, None] + eps
+    local_logits = biases.view((1, 1, attention_heads, 1))
+    if weights is not None:
+        local_logits = torch.einsum("bshd,hda->bsha", embeddings_local, weights) / norm_local + local_logits
+    local_score = torch.sigmoid(local_logits)
+    embeddings_result = torch.addcmul(embeddings_local * local_score,
+                                      embeddings_global,
+                                      (1 - local_score) * (norm_local / norm_global))
+    return embeddings_result.view((batch_size, sequence_length, embedding_dim)), local_logits
+
+# %% ../nbs/01_context_choice.ipynb 6
+_compiled_fused_context_mix = None
+
+
+def compiled_fused_context_mix(*args, **kwargs) -> Tuple[torch.FloatTensor, torch.FloatTensor]:
+    """
+    `fused_context_mix` compiled by `torch.compile` into a single kernel (compiled on the first call),
+    the eager `fused_context_mix` is used when `torch.compile` is not available
+    """
+    global _compiled_fused_context_mix
+    if _compiled_fused_context_mix is None:
+        if hasattr(torch, "compile"):
+            _compiled_fused_context_mix = torch.compile(fused_context_mix, dynamic=True)
+        else:
+            _compiled_fused_context_mix = fused_context_mix
+    return _compiled_fused_context_mix(*args, **kwargs)
+
+# %% ../nbs/01_context_choice.ipynb 7
 class BaseContextChoice(nn.Module):
     """
     Base class for every context choice method.
@@ -44,19 +96,69 @@ class BaseContextChoice(nn.Module):
         self._loss_component = None
         return result
     
+    def local_logits(self, embeddings_local: torch.FloatTensor) -> torch.FloatTensor:
+        """
+        Local context choice logits, which depend on the local embeddings only - so they are known before the memory lookup.
+        :param embeddings_local: batch_size x sequence_length x embedding_dim
+        :returns: batch_size x sequence_length x attention_heads x 1
+        """
+        raise NotImplementedError("Each BaseContextChoice subclass must define their own local_logits method")
+
+    def global_scores(self, embeddings_local: torch.FloatTensor) -> torch.FloatTensor:
+        """
+        Weights of the global (memory) embeddings.
+        :param embeddings_local: batch_size x sequence_length x embedding_dim
+        :returns: batch_size x sequence_length x attention_heads
+        """
+        return 1 - F.sigmoid(self.local_logits(embeddings_local))[..., 0]
+    
     def forward(self, embeddings_local: torch.FloatTensor, embeddings_global: torch.FloatTensor) -> torch.FloatTensor:
         """
         Apply the weighted average between embeddings_local and embeddings_global.
         """
         raise NotImplementedError("Each BaseContextChoice subclass must define their own forward method")
 
-# %% ../nbs/00_context_choice.ipynb 6
+    def _fused_mix_parameters(self) -> Optional[Tuple[Optional[torch.FloatTensor], torch.FloatTensor]]:
+        """
+        (weights, biases) of the linear gate for `fused_context_mix`, None if the gate is not the linear one
+        """
+        return None
+
+    def mix(self, hidden_states_local: torch.FloatTensor, hidden_states_global: torch.FloatTensor,
+            compiled: bool = False) -> torch.FloatTensor:
+        """
+        Weighted average of the not normalized embeddings, rescaled to the local embeddings norm:
+        same as `forward(local / local_norm, global / global_norm) * local_norm`,
+        but fused (see `fused_context_mix`) for the context choices supporting it.
+        :param compiled: use the `torch.compile`-d fused kernel
+        """
+        parameters = self._fused_mix_parameters()
+        if parameters is None:
+            norm_local = torch.linalg.vector_norm(hidden_states_local, dim=-1, keepdim=True) + 1e-4
+            norm_global = torch.linalg.vector_norm(hidden_states_global, dim=-1, keepdim=True) + 1e-4
+            return self(hidden_states_local / norm_local, hidden_states_global / norm_global) * norm_local
+        weights, biases = parameters
+        mix_function = compiled_fused_context_mix if compiled else fused_context_mix
+        embeddings_result, local_logits = mix_function(hidden_states_local, hidden_states_global, weights, biases,
+                                                       self.attention_heads)
+        self._loss_component = local_score_loss(local_logits)
+        return embeddings_result
+
+# %% ../nbs/01_context_choice.ipynb 8
 class ContextChoiceLinear(BaseContextChoice):
     def __init__(self, attention_heads: int, embedding_dim: int, loss_k: float = LOCAL_LOSS_K) -> None:
         super(ContextChoiceLinear, self).__init__(attention_heads, embedding_dim, loss_k)
         self.weights = nn.Parameter(torch.randn((self.attention_heads, self.head_dim, 1)))
         self.biases = nn.Parameter(torch.randn((self.attention_heads,)))
 
+    def local_logits(self, embeddings_local: torch.FloatTensor) -> torch.FloatTensor:
+        batch_size, sequence_length, _ = embeddings_local.shape
+        embeddings_local = embeddings_local.view((batch_size, sequence_length, self.attention_heads, -1))
+        return torch.einsum("bshd,hda->bsha", embeddings_local, self.weights) + self.biases.view((1, 1, self.attention_heads, 1))
+
+    def _fused_mix_parameters(self) -> Optional[Tuple[Optional[torch.FloatTensor], torch.FloatTensor]]:
+        return self.weights, self.biases
+
     def forward(self, embeddings_local: torch.FloatTensor, embeddings_global: torch.FloatTensor) -> torch.FloatTensor:
         batch_size, sequence_length, _ = embeddings_local.shape
         # batch_size x sequence_length x attention_heads x head_dim
@@ -81,12 +183,19 @@ class ContextChoiceLinear(BaseContextChoice):
         # batch_size x sequence_length x attention_heads * head_dim
         return embeddings_result.view((batch_size, sequence_length, self.attention_heads * self.head_dim))
 
-# %% ../nbs/00_context_choice.ipynb 7
+# %% ../nbs/01_context_choice.ipynb 9
 class ContextChoiceConstant(BaseContextChoice):
     def __init__(self, attention_heads: int, embedding_dim: int, loss_k: float = LOCAL_LOSS_K) -> None:
         super().__init__(attention_heads, embedding_dim, loss_k)
         self.bias = nn.Parameter(torch.randn((self.attention_heads)))
 
+    def local_logits(self, embeddings_local: torch.FloatTensor) -> torch.FloatTensor:
+        batch_size, sequence_length, _ = embeddings_local.shape
+        return self.bias.view((1, 1, self.attention_heads, 1)).expand((batch_size, sequence_length, -1, -1))
+
+    def _fused_mix_parameters(self) -> Optional[Tuple[Optional[torch.FloatTensor], torch.FloatTensor]]:
+        return None, self.bias
+
     def forward(self, embeddings_local: torch.FloatTensor, embeddings_global: torch.FloatTensor) -> torch.FloatTensor:
         batch_size, sequence_length, _ = embeddings_local.shape
         # batch_size x sequence_length x attention_heads x head_dim
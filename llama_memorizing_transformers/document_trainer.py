@@ -1,11 +1,13 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/04_document_trainer.ipynb.
 
 # %% auto 0
-__all__ = ['MemorizingLlamaDocumentTrainer']
+__all__ = ['sliding_windows', 'MemorizingLlamaDocumentTrainer']
 
 # %% ../nbs/04_document_trainer.ipynb 1
 from math import ceil
-from typing import List, Union, Tuple, Iterable, Any, Dict, Callable
+import os
+from contextlib import contextmanager
+from typing import List, Union, Tuple, Iterable, Iterator, Any, Dict, Callable, Optional
 import torch
 from torch.nn.functional import cross_entropy
 from torch.optim import Optimizer
@@ -14,9 +16,20 @@ from peft import PeftModelForCausalLM
 from transformers.models.llama import LlamaForCausalLM, LlamaTokenizer, LlamaTokenizerFast
 from .memory_collection import BaseMemoryCollection
 from .context_choice import BaseContextChoice
+from .memorizing_block import MemorizingLlamaDecoderLayer
+from .generation import shift_past_key_values
+from .profiling import StageTimer, merge_totals
 import gc
 
 # %% ../nbs/04_document_trainer.ipynb 2
+def sliding_windows(length: int, tokens_per_chunk: int, tokens_step: int) -> List[Tuple[int, int]]:
+    """
+    (start, end) of every block over the length tokens sequence: tokens_per_chunk tokens windows every tokens_step tokens
+    (so the last ones may be shorter). Shared by the trainer and the perplexity evaluator, so they see the same blocks.
+    """
+    return [(start, min(start + tokens_per_chunk, length)) for start in range(0, length, tokens_step)]
+
+# %% ../nbs/04_document_trainer.ipynb 3
 class MemorizingLlamaDocumentTrainer:
     def __init__(self, model: Union[LlamaForCausalLM, PeftModelForCausalLM],
                  context_choice: BaseContextChoice,
@@ -29,7 +42,24 @@ class MemorizingLlamaDocumentTrainer:
                  accumulate_gradients: int,
                  float16: bool,
                  train_callback: Union[callable, None],
-                 eval_callback: Union[callable, None]):
+                 eval_callback: Union[callable, None],
+                 fork_document_memory: bool = False,
+                 eval_kv_cache: bool = False,
+                 cleanup: str = "block",
+                 profile_directory: Optional[str] = None):
+        """
+        :param fork_document_memory: process the document blocks (the ones which do not reach the prompt) once,
+                                     and run only the rest blocks of every prompt against a fork of the resulting memory,
+                                     instead of re-encoding and re-remembering the document for every prompt.
+                                     So the document-only blocks are trained on once per document, not once per prompt.
+        :param eval_kv_cache: in `eval_document` carry the keys / values of the last tokens_per_chunk - tokens_step tokens
+                              from block to block, so only tokens_step new tokens are computed per block
+                              (and the block losses are calculated over the new tokens only)
+        :param cleanup: when to run the garbage collection and release the cached CUDA memory -
+                        "block" (after every block), "document" (after every document / documents batch) or "never"
+        :param profile_directory: if set - every `train_document` / `train_documents` batch / `eval_document` call
+                                  is profiled with `torch.profiler`, and it's Chrome trace is saved there
+        """
         if isinstance(model, LlamaForCausalLM):
             assert hasattr(model.model, "_memorizing_patch")
         elif isinstance(model, PeftModelForCausalLM):
@@ -48,6 +78,14 @@ class MemorizingLlamaDocumentTrainer:
         self.float16 = float16
         self.train_callback = train_callback
         self.eval_callback = eval_callback
+        self.fork_document_memory = fork_document_memory
+        self.eval_kv_cache = eval_kv_cache
+        assert not eval_kv_cache or tokens_step <= tokens_per_chunk
+        assert cleanup in {"block", "document", "never"}
+        self.cleanup = cleanup
+        self.profile_directory = profile_directory
+        self.timer = StageTimer()
+        self._profiled_calls = 0
 
     def _rearrange_tokens(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor) -> Iterable[torch.LongTensor]:
         for i in range(prompt_tokens.shape[0]):
@@ -55,26 +93,120 @@ class MemorizingLlamaDocumentTrainer:
             yield prompt_tokens_processed
 
     def _split_token_sequences(self, token_sequence: torch.LongTensor) -> List[torch.LongTensor]:
-        _, seq_len = token_sequence.shape
-        start_index = 0
-        sub_sequences = []
-        while start_index < seq_len:
-            sub_sequence = token_sequence[:, start_index : start_index + self.tokens_per_chunk]
-            if sub_sequence.shape[1] > 0:
-                sub_sequences.append(sub_sequence)
-            start_index += self.tokens_step
-        return sub_sequences
+        return [token_sequence[:, start:end]
+                for start, end in sliding_windows(token_sequence.shape[1], self.tokens_per_chunk, self.tokens_step)]
     
     def _get_train_block_tokens(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor) -> Iterable[Tuple[torch.LongTensor, torch.LongTensor]]:
         assert len(document_tokens.shape) == 1, "document tokens should be 1d array"
         assert len(prompt_tokens.shape) == 2, "prompt tokens should be 2d array"
         self.memory.remember_until_position = document_tokens.shape[0]
+        if self.fork_document_memory:
+            yield from self._get_forked_train_block_tokens(document_tokens, prompt_tokens)
+            return
         for item_tokens in self._rearrange_tokens(document_tokens, prompt_tokens):
             item_prompt_tokens = self._split_token_sequences(item_tokens[:, :-1])
             item_labels_tokens = self._split_token_sequences(item_tokens[:, 1:])
             self.memory.reset()
-            for block_prompt_tokens, block_label_tokens in zip(item_prompt_tokens, item_labels_tokens):
-                 yield block_prompt_tokens, block_label_tokens
+            yield from zip(item_prompt_tokens, item_labels_tokens)
+
+    def _document_blocks(self, document_tokens: torch.LongTensor) -> int:
+        # Blocks whose inputs and labels are all document tokens are the same for every prompt
+        document_blocks = 0
+        while document_blocks * self.tokens_step + self.tokens_per_chunk < document_tokens.shape[0]:
+            document_blocks += 1
+        return document_blocks
+
+    def _get_forked_train_block_tokens(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor) -> Iterable[Tuple[torch.LongTensor, torch.LongTensor]]:
+        document_blocks = self._document_blocks(document_tokens)
+        items = [
+            (self._split_token_sequences(item_tokens[:, :-1]), self._split_token_sequences(item_tokens[:, 1:]))
+            for item_tokens in self._rearrange_tokens(document_tokens, prompt_tokens)
+        ]
+        if not items:
+            return
+        self.memory.reset()
+        item_prompt_tokens, item_labels_tokens = items[0]
+        yield from zip(item_prompt_tokens[:document_blocks], item_labels_tokens[:document_blocks])
+        layers = self._memorizing_layers()
+        try:
+            for item_prompt_tokens, item_labels_tokens in items:
+                # Every prompt continues it's own copy-on-write fork of the document memory
+                memory = self.memory.fork()
+                self._set_layers_memory(layers, memory)
+                yield from zip(item_prompt_tokens[document_blocks:], item_labels_tokens[document_blocks:])
+        finally:
+            self._set_layers_memory(layers, self.memory)
+
+    def _memorizing_layers(self) -> List[MemorizingLlamaDecoderLayer]:
+        return [module for module in self.llama.modules() if isinstance(module, MemorizingLlamaDecoderLayer)]
+
+    def _set_layers_memory(self, layers: List[MemorizingLlamaDecoderLayer], memory: BaseMemoryCollection) -> None:
+        for layer in layers:
+            # Layers patched with the multi-layer store use their own namespaces of it
+            layer.memory = memory if layer.memory_layer is None else memory.layer(layer.memory_layer)
+
+    def _context_choices(self) -> List[BaseContextChoice]:
+        context_choices = [self.context_choice]
+        for layer in self._memorizing_layers():
+            if all(layer.context_choice is not context_choice for context_choice in context_choices):
+                context_choices.append(layer.context_choice)
+        return context_choices
+
+    def _retrieval_counters(self) -> Tuple[int, int, int, int]:
+        hits = 0
+        misses = 0
+        retrieved = 0
+        skipped = 0
+        for module in self._memorizing_layers():
+            if module.retrieval_cache is not None:
+                hits += module.retrieval_cache.hits
+                misses += module.retrieval_cache.misses
+            retrieved += module.retrieved_tokens
+            skipped += module.skipped_tokens
+        return hits, misses, retrieved, skipped
+
+    def _retrieval_callback_kwargs(self, counters_before: Tuple[int, int, int, int]) -> Dict[str, Any]:
+        hits, misses, retrieved, skipped = [
+            counter - counter_before for counter, counter_before in zip(self._retrieval_counters(), counters_before)
+        ]
+        return {
+            "retrieval_cache_hits": hits,
+            "retrieval_cache_misses": misses,
+            "retrieval_cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "retrieval_skipped_tokens": skipped,
+            "retrieval_skip_rate": skipped / (retrieved + skipped) if retrieved + skipped else 0.0,
+        }
+
+    def _timing_counters(self) -> Dict[str, float]:
+        return merge_totals(self.timer.totals(),
+                            *[module.timer.totals() for module in self._memorizing_layers()],
+                            self.memory.metrics())
+
+    def _timing_callback_kwargs(self, counters_before: Dict[str, float]) -> Dict[str, float]:
+        # Stage times / calls are reported for the current block, memory sizes - as they are now
+        return {
+            key: value - counters_before.get(key, 0) if key.endswith(("_seconds", "_calls")) else value
+            for key, value in self._timing_counters().items()
+        }
+
+    def _cleanup(self) -> None:
+        with self.timer.measure("cleanup"):
+            gc.collect()
+            torch.cuda.empty_cache()
+
+    @contextmanager
+    def _profile(self, kind: str) -> Iterator[None]:
+        if self.profile_directory is None:
+            yield
+            return
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        with torch.profiler.profile(activities=activities) as profiler:
+            yield
+        os.makedirs(self.profile_directory, exist_ok=True)
+        profiler.export_chrome_trace(os.path.join(self.profile_directory, f"{kind}-{self._profiled_calls}.json"))
+        self._profiled_calls += 1
 
     @property
     def _vocab_size(self) -> int:
@@ -84,6 +216,11 @@ class MemorizingLlamaDocumentTrainer:
 
     def _get_losses(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor, sample_weight: float) -> \
         Iterable[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor]]:
+        yield from self._get_block_losses(self._get_train_block_tokens(document_tokens, prompt_tokens), sample_weight)
+
+    def _get_block_losses(self, block_tokens: Iterable[Tuple[torch.LongTensor, torch.LongTensor]],
+                          sample_weight: Union[float, torch.FloatTensor]) -> \
+        Iterable[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor]]:
         def _inner(block_prompt_tokens: torch.LongTensor, block_label_tokens: torch.LongTensor) -> torch.FloatTensor:
             block_prompt_tokens = block_prompt_tokens.to(self.llama.device)
             block_label_tokens = block_label_tokens.to(self.llama.device)
@@ -97,66 +234,227 @@ class MemorizingLlamaDocumentTrainer:
                 labels=block_label_tokens,
                 return_dict=True
             )
-            logits = model_forward_pass.logits
-
-            logits_flatten = logits.view((-1, self._vocab_size))
-            labels_flatten = block_label_tokens.view((-1,))
-            lm_loss = cross_entropy(input=logits_flatten, target=labels_flatten) * sample_weight
-            context_choice_loss = self.context_choice.get_loss_component() * sample_weight
-            loss = lm_loss + context_choice_loss
-            return loss, context_choice_loss, lm_loss
+            return self._block_losses(model_forward_pass.logits, block_label_tokens, sample_weight)
 
         loss = 0
         loss_context = 0
         loss_lm = 0
-        for block_prompt_tokens, block_label_tokens in self._get_train_block_tokens(document_tokens, prompt_tokens):
+        for block_prompt_tokens, block_label_tokens in block_tokens:
             del loss, loss_context, loss_lm
-            gc.collect()
-            torch.cuda.empty_cache()
-            if self.float16:
-                with torch.cuda.amp.autocast():
+            if self.cleanup == "block":
+                self._cleanup()
+            with self.timer.measure("forward"):
+                if self.float16:
+                    with torch.cuda.amp.autocast():
+                        loss, loss_context, loss_lm = _inner(block_prompt_tokens, block_label_tokens)
+                else:
                     loss, loss_context, loss_lm = _inner(block_prompt_tokens, block_label_tokens)
-            else:
-                loss, loss_context, loss_lm = _inner(block_prompt_tokens, block_label_tokens)
             yield loss, loss_context, loss_lm
 
+    def _block_losses(self, logits: torch.FloatTensor, block_label_tokens: torch.LongTensor,
+                      sample_weight: Union[float, torch.FloatTensor]) -> \
+        Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor]:
+        logits_flatten = logits.view((-1, self._vocab_size))
+        labels_flatten = block_label_tokens.view((-1,))
+        if not isinstance(sample_weight, torch.Tensor):
+            sample_weight = torch.full((block_label_tokens.shape[0],), float(sample_weight))
+        # Every batch row loss is averaged over it's own not padded tokens, and then the weighted rows losses
+        # are averaged over the rows having such tokens (so a fully padded block gives zero loss, not NaN)
+        token_losses = cross_entropy(input=logits_flatten, target=labels_flatten, reduction="none") \
+            .view(block_label_tokens.shape)
+        label_mask = (block_label_tokens != -100).float()
+        row_tokens = label_mask.sum(dim=1)
+        row_losses = (token_losses * label_mask).sum(dim=1) / row_tokens.clamp(min=1)
+        row_weights = sample_weight.to(logits.device) * (row_tokens > 0).float()
+        lm_loss = (row_losses * row_weights).sum() / (row_tokens > 0).sum().clamp(min=1)
+        sample_weight = sample_weight.mean()
+        context_choice_loss = sum(context_choice.get_loss_component() for context_choice in self._context_choices()) \
+            * sample_weight
+        loss = lm_loss + context_choice_loss
+        return loss, context_choice_loss, lm_loss
+
+    def _kv_cached_block_losses(self, item_tokens: torch.LongTensor, memory: BaseMemoryCollection, block: int,
+                                past_key_values: Union[Tuple[Tuple[torch.FloatTensor, torch.FloatTensor]], None],
+                                sample_weight: float) -> \
+        Tuple[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor], Tuple[Tuple[torch.FloatTensor, torch.FloatTensor]]]:
+        """
+        Compute the new tokens of the block (all the block tokens for the first one) over the cached ones
+        :returns: block losses and the keys / values cache
+        """
+        start = self._kv_cached_block_start(block)
+        end = self._kv_cached_block_start(block + 1)
+        keep = 0
+        if past_key_values is not None:
+            keep = min(past_key_values[0][0].shape[2], self.tokens_per_chunk - self.tokens_step)
+            past_key_values = shift_past_key_values(self.llama, past_key_values, keep) if keep else None
+        block_prompt_tokens = item_tokens[:, :-1][:, start - keep : end].to(self.llama.device)
+        block_label_tokens = item_tokens[:, 1:][:, start : end].to(self.llama.device)
+        block_attention_mask = (block_prompt_tokens != self.tokenizer.pad_token_id).float()
+        block_label_mask = (block_label_tokens != self.tokenizer.pad_token_id).float()
+        block_label_tokens = ((block_label_mask * block_label_tokens) + (1.0 - block_label_mask) * (-100)).long()
+        # The memory remembers (and counts positions) from the first new token
+        memory.seek(min(start, memory.remember_until_position))
+        def _inner() -> Tuple[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor], Tuple[Tuple[torch.FloatTensor, torch.FloatTensor]]]:
+            model_forward_pass = self.llama(
+                input_ids=block_prompt_tokens[:, keep:],
+                attention_mask=block_attention_mask,
+                past_key_values=past_key_values,
+                use_cache=True,
+                return_dict=True
+            )
+            losses = self._block_losses(model_forward_pass.logits, block_label_tokens, sample_weight)
+            return losses, model_forward_pass.past_key_values
+
+        with self.timer.measure("forward"):
+            if self.float16:
+                with torch.cuda.amp.autocast():
+                    return _inner()
+            return _inner()
+
+    def _kv_cached_block_start(self, block: int) -> int:
+        # The first block is computed as a whole, every next one adds tokens_step new tokens to it's window end
+        if block == 0:
+            return 0
+        return self.tokens_per_chunk + (block - 1) * self.tokens_step
+
+    def _get_kv_cached_losses(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor, sample_weight: float) -> \
+        Iterable[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor]]:
+        assert len(document_tokens.shape) == 1, "document tokens should be 1d array"
+        assert len(prompt_tokens.shape) == 2, "prompt tokens should be 2d array"
+        self.memory.remember_until_position = document_tokens.shape[0]
+        self.memory.reset()
+        document_blocks = self._document_blocks(document_tokens) if self.fork_document_memory else 0
+        document_past_key_values = None
+        layers = self._memorizing_layers()
+        try:
+            for item_index, item_tokens in enumerate(self._rearrange_tokens(document_tokens, prompt_tokens)):
+                if self.fork_document_memory:
+                    if item_index == 0:
+                        for block in range(document_blocks):
+                            losses, document_past_key_values = self._kv_cached_block_losses(
+                                item_tokens, self.memory, block, document_past_key_values, sample_weight)
+                            yield losses
+                    # Cached keys / values are never changed in-place, so they are shared by the prompts as well
+                    memory = self.memory.fork()
+                    self._set_layers_memory(layers, memory)
+                    past_key_values = document_past_key_values
+                else:
+                    memory = self.memory
+                    memory.reset()
+                    past_key_values = None
+                block = document_blocks
+                # Labels are the next tokens, so the last token is never an input
+                while self._kv_cached_block_start(block) < item_tokens.shape[1] - 1:
+                    losses, past_key_values = self._kv_cached_block_losses(
+                        item_tokens, memory, block, past_key_values, sample_weight)
+                    yield losses
+                    block += 1
+        finally:
+            self._set_layers_memory(layers, self.memory)
+
     def train_document(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor, sample_weight: float, callback_kwargs: Dict[str, Any]):
+        with self._profile("train"):
+            self._train_on_losses(self._get_losses(document_tokens, prompt_tokens, sample_weight), callback_kwargs)
+
+    def train_documents(self, documents_tokens: List[torch.LongTensor], prompts_tokens: List[torch.LongTensor],
+                        sample_weights: List[float], batch_size: int, callback_kwargs: Dict[str, Any]):
+        """
+        Train on several documents at once: every (document, prompt) pair is a batch row with it's own memory namespace,
+        the rows of the batch are processed chunk by chunk in lockstep.
+        Rows are padded (and their padding is excluded from the loss) to the longest row of the batch,
+        so the pairs are bucketed by length first. Document memories are not forked here.
+        :param documents_tokens: 1d document tokens arrays
+        :param prompts_tokens: 2d prompt tokens arrays, one per document
+        :param sample_weights: weight of every document
+        :param batch_size: how much (document, prompt) pairs to process at once
+        """
+        assert len(documents_tokens) == len(prompts_tokens) == len(sample_weights)
+        for documents_batch, batch_items in enumerate(self._length_buckets(documents_tokens, prompts_tokens, sample_weights, batch_size)):
+            row_sample_weights = torch.tensor([sample_weight for _, _, sample_weight in batch_items])
+            with self._profile("train"):
+                self._train_on_losses(self._get_block_losses(self._get_batch_block_tokens(batch_items), row_sample_weights),
+                                      dict(callback_kwargs, documents_batch=documents_batch, batch_rows=len(batch_items)))
+
+    def _length_buckets(self, documents_tokens: List[torch.LongTensor], prompts_tokens: List[torch.LongTensor],
+                        sample_weights: List[float], batch_size: int) -> Iterable[List[Tuple[int, torch.LongTensor, float]]]:
+        """
+        Batches of (document length, document + prompt tokens, sample weight) items of the close lengths
+        """
+        items = []
+        for document_tokens, prompt_tokens, sample_weight in zip(documents_tokens, prompts_tokens, sample_weights):
+            assert len(document_tokens.shape) == 1, "document tokens should be 1d array"
+            assert len(prompt_tokens.shape) == 2, "prompt tokens should be 2d array"
+            for item_tokens in self._rearrange_tokens(document_tokens, prompt_tokens):
+                items.append((document_tokens.shape[0], item_tokens[0], sample_weight))
+        items.sort(key=lambda item: item[1].shape[0], reverse=True)
+        for start in range(0, len(items), batch_size):
+            yield items[start : start + batch_size]
+
+    def _get_batch_block_tokens(self, batch_items: List[Tuple[int, torch.LongTensor, float]]) -> \
+        Iterable[Tuple[torch.LongTensor, torch.LongTensor]]:
+        batch_tokens = torch.full((len(batch_items), max(item_tokens.shape[0] for _, item_tokens, _ in batch_items)),
+                                  self.tokenizer.pad_token_id, dtype=torch.long)
+        self.memory.reset()
+        for row, (document_length, item_tokens, _) in enumerate(batch_items):
+            batch_tokens[row, :item_tokens.shape[0]] = item_tokens
+            self.memory.set_row_remember_until_position(row, document_length)
+        yield from zip(self._split_token_sequences(batch_tokens[:, :-1]), self._split_token_sequences(batch_tokens[:, 1:]))
+
+    def _train_on_losses(self, block_losses: Iterable[Tuple[torch.FloatTensor, torch.FloatTensor, torch.FloatTensor]],
+                         callback_kwargs: Dict[str, Any]):
         self.llama.train()
         self.optimizer.zero_grad(set_to_none=True)
         if self.float16:
             scaler = torch.cuda.amp.grad_scaler.GradScaler()
         else:
             scaler = None
-        for batch, losses in enumerate(self._get_losses(document_tokens, prompt_tokens, sample_weight)):
+        retrieval_counters = self._retrieval_counters()
+        timing_counters = self._timing_counters()
+        for batch, losses in enumerate(block_losses):
             loss, loss_context, loss_lm = losses
-            if self.float16:
-                scaler.scale(loss).backward()
-            else:
-                loss.backward()
-            if batch % self.accumulate_gradients == 0:
+            with self.timer.measure("backward"):
                 if self.float16:
-                    scaler.step(self.optimizer)
+                    scaler.scale(loss).backward()
                 else:
-                    self.optimizer.step()
-                if self.scheduler:
-                    self.scheduler.step()
-                self.optimizer.zero_grad(set_to_none=True)
-                if self.float16:
-                    scaler.update()
+                    loss.backward()
+            if batch % self.accumulate_gradients == 0:
+                with self.timer.measure("optimizer_step"):
+                    if self.float16:
+                        scaler.step(self.optimizer)
+                    else:
+                        self.optimizer.step()
+                    if self.scheduler:
+                        self.scheduler.step()
+                    self.optimizer.zero_grad(set_to_none=True)
+                    if self.float16:
+                        scaler.update()
             batch_callback_kwargs = dict(callback_kwargs, document_batch=batch,
                                          loss=loss.item(),
                                          loss_lm=loss_lm.item(),
-                                         loss_context=loss_context.item())
+                                         loss_context=loss_context.item(),
+                                         **self._retrieval_callback_kwargs(retrieval_counters))
+            # Backward pass recomputations (gradient checkpointing) are counted for the same batch
+            retrieval_counters = self._retrieval_counters()
             del loss, loss_context, loss_lm
-            gc.collect()
-            torch.cuda.empty_cache()
+            if self.cleanup == "block":
+                self._cleanup()
+            batch_callback_kwargs.update(self._timing_callback_kwargs(timing_counters))
+            timing_counters = self._timing_counters()
             if self.train_callback:
                 self.train_callback(**batch_callback_kwargs)
+        if self.cleanup == "document":
+            self._cleanup()
 
     def eval_document(self, document_tokens: torch.LongTensor, prompt_tokens: torch.LongTensor, sample_weight: float, callback_kwargs: Dict[str, Any]):
         self.llama.eval()
-        with torch.no_grad():
-            for batch, losses in enumerate(self._get_losses(document_tokens, prompt_tokens, sample_weight)):
+        with torch.no_grad(), self._profile("eval"):
+            retrieval_counters = self._retrieval_counters()
+            timing_counters = self._timing_counters()
+            if self.eval_kv_cache:
+                block_losses = self._get_kv_cached_losses(document_tokens, prompt_tokens, sample_weight)
+            else:
+                block_losses = self._get_losses(document_tokens, prompt_tokens, sample_weight)
+            for batch, losses in enumerate(block_losses):
                 loss, loss_context, loss_lm = losses
                 loss = loss.item()
                 loss_context = loss_context.item()
@@ -164,6 +462,12 @@ class MemorizingLlamaDocumentTrainer:
                 batch_callback_kwargs = dict(callback_kwargs, document_batch=batch,
                                              loss=loss,
                                              loss_lm=loss_lm,
-                                             loss_context=loss_context)
+                                             loss_context=loss_context,
+                                             **self._retrieval_callback_kwargs(retrieval_counters),
+                                             **self._timing_callback_kwargs(timing_counters))
+                retrieval_counters = self._retrieval_counters()
+                timing_counters = self._timing_counters()
                 if self.eval_callback:
                     self.eval_callback(**batch_callback_kwargs)
+            if self.cleanup == "document":
+                self._cleanup()
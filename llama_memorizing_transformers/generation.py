@@ -0,0 +1,160 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/10_generation.ipynb.
+
+# %% auto 0
+__all__ = ['PastKeyValues', 'shift_past_key_values', 'MemorizingLlamaStreamingGenerator']
+
+# %% ../nbs/10_generation.ipynb 2
+from typing import Iterable, Optional, Tuple, Union
+import torch
+import torch.nn as nn
+from peft import PeftModelForCausalLM
+from transformers.models.llama import LlamaForCausalLM
+from transformers.models.llama.modeling_llama import LlamaAttention, rotate_half
+from .memory_collection import BaseMemoryCollection
+
+# %% ../nbs/10_generation.ipynb 3
+PastKeyValues = Tuple[Tuple[torch.FloatTensor, torch.FloatTensor], ...]
+
+
+def shift_past_key_values(model: nn.Module, past_key_values: PastKeyValues, keep: int) -> PastKeyValues:
+    """
+    Keep the keys / values of the last `keep` cached tokens, moving them to the positions starting from 0.
+    Cached keys are rotary-embedded, so rotating them back by the dropped tokens count is the same
+    as if they were computed at the new positions - this way positions never exceed the cache window.
+    :param model: llama model (rotary embedding frequencies are taken from it's attention layers)
+    :param past_key_values: per-layer (keys, values) of shape (batch, heads, cached tokens, head dim)
+    :param keep: how much last cached tokens to keep
+    """
+    cached = past_key_values[0][0].shape[2]
+    shift = cached - keep
+    if shift == 0:
+        return past_key_values
+    attention = next(module for module in model.modules() if isinstance(module, LlamaAttention))
+    freqs = shift * attention.rotary_emb.inv_freq.float()
+    angles = torch.cat((freqs, freqs), dim=-1)
+    cos = angles.cos()
+    sin = angles.sin()
+    shifted = []
+    for keys, values in past_key_values:
+        keys = keys[:, :, shift:].float()
+        keys = (keys * cos - rotate_half(keys) * sin).to(values.dtype)
+        shifted.append((keys, values[:, :, shift:]))
+    return tuple(shifted)
+
+# %% ../nbs/10_generation.ipynb 4
+class MemorizingLlamaStreamingGenerator:
+    """
+    Generation with the memorizing model which yields the tokens as soon as they are decoded.
+    The prompt is prefilled in blocks: the first one is tokens_per_chunk tokens, every next one is tokens_step tokens
+    computed over the keys / values of the previous ones. Then the tokens are decoded one by one over the cache.
+    The cache keeps from tokens_per_chunk - tokens_step to tokens_per_chunk last tokens (like the training blocks),
+    the older ones are available through the memory only.
+    Every fed token is remembered once, at it's global position. Batch rows are remembered in their own memories.
+    """
+    def __init__(self, model: Union[LlamaForCausalLM, PeftModelForCausalLM],
+                 memory: BaseMemoryCollection,
+                 tokens_per_chunk: int,
+                 tokens_step: int) -> None:
+        """
+        :param model: model patched by `replace_llama_layer_with_memory`
+        :param memory: memory used by the patched layers (or their `MultiLayerMemoryCollection` store)
+        :param tokens_per_chunk: keys / values cache window size
+        :param tokens_step: how much oldest tokens are dropped from the cache at once (and the prefill block size)
+        """
+        if isinstance(model, LlamaForCausalLM):
+            assert hasattr(model.model, "_memorizing_patch")
+        elif isinstance(model, PeftModelForCausalLM):
+            assert hasattr(model.base_model.model.model, "_memorizing_patch")
+        else:
+            raise TypeError("Unknown model type")
+        assert 0 < tokens_step <= tokens_per_chunk
+        self.llama = model
+        self.memory = memory
+        self.tokens_per_chunk = tokens_per_chunk
+        self.tokens_step = tokens_step
+
+    def _forward(self, tokens: torch.LongTensor, position: int,
+                 past_key_values: Optional[PastKeyValues]) -> Tuple[torch.FloatTensor, PastKeyValues]:
+        """
+        :param tokens: (batch, new tokens) ids, not more than tokens_step of them if there is a cache
+        :param position: global position of the first new token
+        :returns: (batch, vocab) logits of the last token and the updated cache
+        """
+        cached = 0
+        if past_key_values is not None:
+            cached = past_key_values[0][0].shape[2]
+            if cached + tokens.shape[1] > self.tokens_per_chunk:
+                cached = min(cached, self.tokens_per_chunk - self.tokens_step)
+                past_key_values = shift_past_key_values(self.llama, past_key_values, cached) if cached else None
+        # The memory remembers (and counts positions) from the first new token
+        self.memory.seek(min(position, self.memory.remember_until_position))
+        tokens = tokens.to(self.llama.device)
+        model_forward_pass = self.llama(
+            input_ids=tokens,
+            attention_mask=torch.ones((tokens.shape[0], cached + tokens.shape[1]), device=tokens.device),
+            past_key_values=past_key_values,
+            use_cache=True,
+            return_dict=True
+        )
+        return model_forward_pass.logits[:, -1], model_forward_pass.past_key_values
+
+    def _next_tokens(self, logits: torch.FloatTensor, temperature: float,
+                     generator: Optional[torch.Generator]) -> torch.LongTensor:
+        if temperature == 0:
+            return logits.argmax(dim=-1)
+        probabilities = torch.softmax(logits.float() / temperature, dim=-1)
+        return torch.multinomial(probabilities, 1, generator=generator)[:, 0]
+
+    def stream(self, prompt_tokens: torch.LongTensor,
+               max_new_tokens: int,
+               temperature: float = 0.0,
+               eos_token_id: Optional[int] = None,
+               remember_generated: bool = True,
+               reset_memory: bool = True,
+               generator: Optional[torch.Generator] = None) -> Iterable[torch.LongTensor]:
+        """
+        Generate tokens continuing the prompts
+        :param prompt_tokens: (batch, seq) prompt ids (no padding, so the rows positions are the same)
+        :param max_new_tokens: how much tokens to generate at most
+        :param temperature: sampling temperature (0 - greedy decoding)
+        :param eos_token_id: rows which generated it are finished (and keep producing it),
+                             generation stops once every row is finished
+        :param remember_generated: remember the generated tokens too, not only the prompt ones
+        :param reset_memory: start from an empty memory, otherwise the prompt continues the remembered tokens
+        :param generator: random generator for sampling
+        :returns: (batch,) ids of every generated token
+        """
+        assert len(prompt_tokens.shape) == 2, "prompt tokens should be 2d array"
+        self.llama.eval()
+        if reset_memory:
+            self.memory.reset()
+        start = self.memory.position_offset
+        prompt_length = prompt_tokens.shape[1]
+        self.memory.remember_until_position = start + prompt_length + (max_new_tokens if remember_generated else 0)
+        finished = torch.zeros((prompt_tokens.shape[0],), dtype=torch.bool, device=self.llama.device)
+        with torch.no_grad():
+            past_key_values = None
+            block_start = 0
+            while block_start < prompt_length:
+                block_end = min(prompt_length, block_start + (self.tokens_per_chunk if block_start == 0 else self.tokens_step))
+                logits, past_key_values = self._forward(prompt_tokens[:, block_start:block_end], start + block_start,
+                                                        past_key_values)
+                block_start = block_end
+            for i in range(max_new_tokens):
+                tokens = self._next_tokens(logits, temperature, generator)
+                if eos_token_id is not None:
+                    tokens = tokens.masked_fill(finished, eos_token_id)
+                    finished |= tokens == eos_token_id
+                yield tokens
+                if finished.all() or i == max_new_tokens - 1:
+                    break
+                logits, past_key_values = self._forward(tokens.unsqueeze(1), start + prompt_length + i, past_key_values)
+
+    def generate(self, prompt_tokens: torch.LongTensor, max_new_tokens: int, **kwargs) -> torch.LongTensor:
+        """
+        Same as `stream`, but returns (batch, seq + generated) prompt and generated ids at once
+        """
+        generated = [tokens.to(prompt_tokens.device) for tokens in self.stream(prompt_tokens, max_new_tokens, **kwargs)]
+        if not generated:
+            return prompt_tokens
+        return torch.cat((prompt_tokens, torch.stack(generated, dim=1)), dim=1)
@@ -1,55 +1,270 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/02_memorizing_block.ipynb.
 
 # %% auto 0
-__all__ = ['MemorizingLlamaDecoderLayer']
+__all__ = ['RetrievalCache', 'MemorizingLlamaDecoderLayer']
 
 # %% ../nbs/02_memorizing_block.ipynb 1
-from typing import Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
 import torch
 import torch.nn as nn
 from transformers.models.llama.modeling_llama import LlamaDecoderLayer
 from .context_choice import BaseContextChoice
 from .memory_collection import BaseMemoryCollection
+from .profiling import StageTimer
 
 # %% ../nbs/02_memorizing_block.ipynb 2
+class RetrievalCache:
+    """
+    Bounded (least recently used entries are dropped) cache of the memory lookups of the whole chunks.
+    A lookup is reused only if the chunk embeddings (and the retrieval mask) are exactly the same,
+    and the memory of every batch row is in the same state (version and position) as it was at the lookup,
+    or as it was right after the layer remembered this very chunk.
+    The latter is the recomputation of the chunk during the backward pass (gradient checkpointing):
+    it gets the lookups of the original forward pass (not the ones which see the chunk itself),
+    and the layer does not remember the chunk twice.
+    Overlapping chunks do not hit: the embeddings of the shared tokens depend on the rest of the chunk.
+    """
+    def __init__(self, max_entries: int) -> None:
+        """
+        :param max_entries: how much chunk lookups to keep
+        """
+        assert max_entries > 0
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._last_key = None
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._last_key = None
+
+    @staticmethod
+    def _memory_state(memory: BaseMemoryCollection, rows: int) -> Tuple[Tuple[Any, int], ...]:
+        return tuple((memory.namespace(row).version, memory.namespace(row).position_offset) for row in range(rows))
+
+    @staticmethod
+    def _key(hidden_states: torch.Tensor) -> Tuple[Tuple[int, ...], float]:
+        # Cheap key, the entries are compared exactly
+        return tuple(hidden_states.shape), float(hidden_states.detach().float().sum())
+
+    def _entry(self, key: Tuple[Tuple[int, ...], float], state: Tuple[Tuple[Any, int], ...],
+               hidden_states: torch.Tensor) -> Optional[dict]:
+        entry = self.entries.get(key)
+        if entry is None or state not in entry["states"] or not torch.equal(entry["hidden_states"], hidden_states):
+            return None
+        return entry
+
+    def contains(self, memory: BaseMemoryCollection, hidden_states: torch.Tensor) -> bool:
+        """
+        Is the lookup of the chunk cached for the current memory state (whatever the retrieval mask is).
+        Does not count as a hit or a miss.
+        """
+        state = self._memory_state(memory, hidden_states.shape[0])
+        return self._entry(self._key(hidden_states), state, hidden_states) is not None
+
+    def get(self, memory: BaseMemoryCollection, hidden_states: torch.Tensor, retrieval_mask: Optional[torch.Tensor],
+            lookup: Callable[[], torch.Tensor]) -> Tuple[torch.Tensor, bool]:
+        """
+        :param memory: memory used by the layer
+        :param hidden_states: (batch, seq, dim) chunk embeddings
+        :param retrieval_mask: (batch, seq) mask of the tokens which need the lookup (None - all of them)
+        :param lookup: chunk lookup itself, called on a miss
+        :returns: (batch, seq, dim) memory embeddings, and whether the chunk was already remembered by the layer
+        """
+        tokens = hidden_states.shape[0] * hidden_states.shape[1]
+        key = self._key(hidden_states)
+        state = self._memory_state(memory, hidden_states.shape[0])
+        entry = self._entry(key, state, hidden_states)
+        if entry is not None \
+                and ((retrieval_mask is None and entry["retrieval_mask"] is None) or
+                     (retrieval_mask is not None and entry["retrieval_mask"] is not None and
+                      torch.equal(entry["retrieval_mask"], retrieval_mask))):
+            self.entries.move_to_end(key)
+            self.hits += tokens
+            self._last_key = None
+            return entry["memories"], state != entry["states"][0]
+        self.misses += tokens
+        memories = lookup()
+        self.entries[key] = {
+            "hidden_states": hidden_states.detach().clone(),
+            "retrieval_mask": retrieval_mask,
+            "memories": memories,
+            "states": [state],
+        }
+        self.entries.move_to_end(key)
+        self._last_key = key
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return memories, False
+
+    def remembered(self, memory: BaseMemoryCollection, rows: int) -> None:
+        """
+        The layer remembered the chunk of the last missed lookup, so the lookup stays valid for the new memory state
+        """
+        if self._last_key in self.entries:
+            self.entries[self._last_key]["states"].append(self._memory_state(memory, rows))
+        self._last_key = None
+
+# %% ../nbs/02_memorizing_block.ipynb 3
 class MemorizingLlamaDecoderLayer(nn.Module):
     def __init__(self,
                  module: LlamaDecoderLayer,
                  context_choice: BaseContextChoice,
                  memory: BaseMemoryCollection,
-                 device: torch.device) -> None:
+                 device: torch.device,
+                 retrieval_cache_size: int = 0,
+                 retrieval_threshold: Optional[float] = None,
+                 retrieval_granularity: str = "token",
+                 memory_layer: Optional[int] = None,
+                 mixing: str = "unfused") -> None:
         """
         Module wraps original LlamaDecoderLayer to add memorizing stuff
         :param module: original decoder layer
         :param context_choice: local vs memory context mixer
-        :param memory: memory implementation itself
+        :param memory: memory implementation itself (chunks are added synchronously,
+                       wrap it with `WriteBehindMemoryCollection` to add them in the background)
+        :param retrieval_cache_size: how much chunk lookups to cache (0 - no cache), see `RetrievalCache`
+        :param retrieval_threshold: if set - the context choice gate is evaluated first and the memory is searched
+                                    only for the tokens with the global (memory) weight of some head above it,
+                                    memory embeddings of the rest tokens are zeros
+        :param retrieval_granularity: "token" - skip the lookup of the individual tokens,
+                                      "chunk" - search for every token of the batch row chunk if any token needs it
+        :param memory_layer: if set - the memory is this layer namespace of the `MultiLayerMemoryCollection` store
+        :param mixing: "unfused" - normalize, mix with the context choice and rescale step by step,
+                       "fused" - do it in one pass, without the intermediate tensors (see `BaseContextChoice.mix`),
+                       "compiled" - same with the `torch.compile`-d kernel
         """
         super(MemorizingLlamaDecoderLayer, self).__init__()
         self.module = module
         self.context_choice = context_choice
         self.memory = memory
+        self.memory_layer = memory_layer
+        self.retrieval_cache = RetrievalCache(retrieval_cache_size) if retrieval_cache_size else None
+        self._prefetch_executor = None
+        self._prefetched = None
+        assert retrieval_granularity in {"token", "chunk"}
+        self.retrieval_threshold = retrieval_threshold
+        self.retrieval_granularity = retrieval_granularity
+        assert mixing in {"unfused", "fused", "compiled"}
+        self.mixing = mixing
+        self.retrieved_tokens = 0
+        self.skipped_tokens = 0
+        # layer_retrieval / layer_mixing / layer_memory_add / layer_decoder stages
+        self.timer = StageTimer()
 
-    def _extract_from_memory(self, hidden_states: torch.Tensor) -> torch.Tensor:
+    @property
+    def retrieval_skip_rate(self) -> float:
+        """
+        Share of the tokens whose memory lookup was skipped by the gate
+        """
+        total = self.retrieved_tokens + self.skipped_tokens
+        return self.skipped_tokens / total if total else 0.0
+
+    def _retrieval_mask(self, hidden_states: torch.Tensor) -> Optional[torch.Tensor]:
+        """
+        (batch, seq) mask of the tokens which need the memory lookup (None - all of them)
+        """
+        if self.retrieval_threshold is None:
+            return None
         with torch.no_grad():
-            batch_size, seq_length, embeddings_dim = hidden_states.shape
-            hidden_states_memory = []
-            for i in range(batch_size):
-                hidden_states_memory.append(
-                    self.memory.get(hidden_states[i]).view((1, seq_length, embeddings_dim))
-                )
-            hidden_states_memory = torch.cat(hidden_states_memory)
+            hidden_states_normed, _ = self._normed(hidden_states)
+            global_scores = self.context_choice.global_scores(hidden_states_normed)
+            retrieval_mask = global_scores.max(dim=-1).values > self.retrieval_threshold
+            if self.retrieval_granularity == "chunk":
+                retrieval_mask = retrieval_mask.any(dim=1, keepdim=True).expand(retrieval_mask.shape)
+        return retrieval_mask
+
+    def _extract_row_from_memory(self, row: int, hidden_states: torch.Tensor) -> torch.Tensor:
+        hidden_states_memory = self.memory.namespace(row).get(hidden_states)
+        if len(hidden_states_memory.shape) == 2:
+            # Empty memory returns the inputs themselves
+            hidden_states_memory = hidden_states_memory.unsqueeze(1)
         return hidden_states_memory
+
+    def _extract_from_memory(self, hidden_states: torch.Tensor,
+                             retrieval_mask: Optional[torch.Tensor] = None) -> torch.Tensor:
+        with torch.no_grad():
+            if retrieval_mask is not None and not retrieval_mask.all():
+                # Only the chosen tokens are searched, the rest get zero memory embeddings
+                hidden_states_memory = torch.zeros_like(hidden_states)
+                for row in range(hidden_states.shape[0]):
+                    tokens = retrieval_mask[row].nonzero()[:, 0]
+                    if tokens.shape[0]:
+                        hidden_states_memory[row, tokens] = self._extract_row_from_memory(
+                            row, hidden_states[row, tokens]
+                        ).view((tokens.shape[0], -1)).to(hidden_states.dtype)
+                return hidden_states_memory
+            # Every batch row is searched in it's own memory namespace
+            hidden_states_memory = self.memory.get_batch(hidden_states)
+        return hidden_states_memory.view(hidden_states.shape)
     
+    def _gated_extract_from_memory(self, hidden_states: torch.Tensor) -> Tuple[Optional[torch.Tensor], torch.Tensor]:
+        retrieval_mask = self._retrieval_mask(hidden_states)
+        return retrieval_mask, self._extract_from_memory(hidden_states, retrieval_mask)
+
+    def prefetch(self, hidden_states: torch.Tensor, exact: bool = True) -> None:
+        """
+        Start the memory retrieval for the next forward call in a background thread.
+        Called by the hook on a preceding layer output (see `replace_llama_layer_with_memory`).
+        :param hidden_states: (batch, seq, dim) query embeddings
+        :param exact: is it the previous layer output, so the very query of the next forward call.
+                      Then the gate and the lookup are the same as without the prefetch (so are the outputs),
+                      but they overlap only with the work of the forward call not depending on the memory.
+                      Otherwise the query is an approximation of the layer input: the lookup overlaps with
+                      the layers in between, but the retrieved memories (so the outputs) differ from the exact ones,
+                      and every token is searched - the gate is applied to the lookup result.
+        """
+        if self._prefetched is not None:
+            # Not taken by a forward call (e.g. the prefetch of the recomputed previous layer), still waited for,
+            # so the memory is never used by two threads at once
+            self._prefetched[2].result()
+            self._prefetched = None
+        hidden_states = hidden_states.detach()
+        if exact and self.retrieval_cache is not None and self.retrieval_cache.contains(self.memory, hidden_states):
+            # The forward call will hit the cache (e.g. it is the recomputation of the chunk)
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        if exact:
+            future = self._prefetch_executor.submit(self._gated_extract_from_memory, hidden_states)
+        else:
+            future = self._prefetch_executor.submit(lambda: (None, self._extract_from_memory(hidden_states)))
+        self._prefetched = (hidden_states.shape, exact, future)
+
+    def _take_prefetched(self, hidden_states: torch.Tensor) -> Optional[Tuple[Optional[torch.Tensor], torch.Tensor, int]]:
+        """
+        Prefetched retrieval mask, memory embeddings and how much tokens were searched (None if nothing fits the inputs)
+        """
+        if self._prefetched is None:
+            return None
+        prefetched_shape, exact, future = self._prefetched
+        self._prefetched = None
+        # The gate of the approximate prefetch is evaluated on the exact query while the lookup is running
+        retrieval_mask = None if exact else self._retrieval_mask(hidden_states)
+        # Waited for even if it does not fit, so the memory is never used by two threads at once
+        prefetched_mask, hidden_states_memory = future.result()
+        if prefetched_shape != hidden_states.shape:
+            return None
+        if exact:
+            retrieval_mask = prefetched_mask
+            searched_tokens = hidden_states.shape[0] * hidden_states.shape[1] if retrieval_mask is None \
+                else int(retrieval_mask.sum())
+        else:
+            searched_tokens = hidden_states.shape[0] * hidden_states.shape[1]
+            if retrieval_mask is not None:
+                hidden_states_memory = hidden_states_memory * retrieval_mask.unsqueeze(-1)
+        return retrieval_mask, hidden_states_memory, searched_tokens
+
     def _add_to_memory(self, hidden_states: torch.Tensor, position_ids: torch.LongTensor) -> None:
         with torch.no_grad():
-            batch_size, _, _ = hidden_states.shape
-            for i in range(batch_size):
-                sample_hidden_states = hidden_states[i]
-                sample_memory_position_ids = position_ids[i]
-                self.memory.add(sample_hidden_states, sample_memory_position_ids)
+            self.memory.add_batch(hidden_states, position_ids)
 
     def _normed(self, hidden_states: torch.Tensor) -> torch.Tensor:
-        norm = torch.sqrt((hidden_states ** 2).sum(dim=-1, keepdim=True)) + 1e-4
+        # vector_norm has zero (not NaN) gradient for the zero vectors, e.g. the zero padding token embeddings
+        norm = torch.linalg.vector_norm(hidden_states, dim=-1, keepdim=True) + 1e-4
         return hidden_states / norm, norm
 
     def forward(
@@ -61,17 +276,52 @@ class MemorizingLlamaDecoderLayer(nn.Module):
         output_attentions: Optional[bool] = False,
         use_cache: Optional[bool] = False,
     ) -> Tuple[torch.FloatTensor, Optional[Tuple[torch.FloatTensor, torch.FloatTensor]]]:
-        hidden_states_memory = self._extract_from_memory(hidden_states)
-        hidden_states_normed, hidden_states_norm = self._normed(hidden_states)
-        hidden_states_memory_normed, _ = self._normed(hidden_states_memory)
-        hidden_states_merged = self.context_choice(hidden_states_normed, hidden_states_memory_normed)
-        
-        hidden_states_merged_rescaled = hidden_states_merged * hidden_states_norm
-
-        self._add_to_memory(hidden_states, position_ids)
-        return self.module(hidden_states_merged_rescaled,
-                           attention_mask,
-                           position_ids,
-                           past_key_value,
-                           output_attentions,
-                           use_cache)
+        # With the cached keys / values (past_key_value) the chunk positions start after the cached tokens,
+        # while the memory positions are counted from the first new token (the caller seeks the memory to it)
+        memory_position_ids = position_ids - position_ids[..., :1]
+        with self.timer.measure("layer_retrieval"):
+            if self.mixing == "unfused":
+                # Does not depend on the memory, so it overlaps with the prefetched lookup
+                hidden_states_normed, hidden_states_norm = self._normed(hidden_states)
+            prefetched = self._take_prefetched(hidden_states)
+            remembered = False
+            if prefetched is not None:
+                retrieval_mask, prefetched_memory, searched_tokens = prefetched
+                lookup = lambda: prefetched_memory
+            else:
+                retrieval_mask = self._retrieval_mask(hidden_states)
+                searched_tokens = hidden_states.shape[0] * hidden_states.shape[1] if retrieval_mask is None \
+                    else int(retrieval_mask.sum())
+                lookup = lambda: self._extract_from_memory(hidden_states, retrieval_mask)
+            if self.retrieval_cache is not None:
+                # The prefetched lookups are cached as well, so the recomputed chunks are not remembered twice
+                hidden_states_memory, remembered = self.retrieval_cache.get(
+                    self.memory, hidden_states, retrieval_mask, lookup
+                )
+            else:
+                hidden_states_memory = lookup()
+        self.retrieved_tokens += searched_tokens
+        self.skipped_tokens += hidden_states.shape[0] * hidden_states.shape[1] - searched_tokens
+        with self.timer.measure("layer_mixing"):
+            if self.mixing == "unfused":
+                hidden_states_memory_normed, _ = self._normed(hidden_states_memory)
+                hidden_states_merged = self.context_choice(hidden_states_normed, hidden_states_memory_normed)
+
+                hidden_states_merged_rescaled = hidden_states_merged * hidden_states_norm
+            else:
+                hidden_states_merged_rescaled = self.context_choice.mix(hidden_states, hidden_states_memory,
+                                                                        compiled=self.mixing == "compiled")
+
+        with self.timer.measure("layer_memory_add"):
+            # Recomputed chunks (gradient checkpointing) are remembered already
+            if not remembered:
+                self._add_to_memory(hidden_states, memory_position_ids)
+                if self.retrieval_cache is not None:
+                    self.retrieval_cache.remembered(self.memory, hidden_states.shape[0])
+        with self.timer.measure("layer_decoder"):
+            return self.module(hidden_states_merged_rescaled,
+                               attention_mask,
+                               position_ids,
+                               past_key_value,
+                               output_attentions,
+                               use_cache)
@@ -1,32 +1,60 @@
-# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/01_memory_collection.ipynb.
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/00_memory_collection.ipynb.
 
-# %% ../nbs/01_memory_collection.ipynb 4
+# %% ../nbs/00_memory_collection.ipynb 4
 from __future__ import annotations
 import os
-from typing import Union, List
+import copy
+import json
+import shutil
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Union, List, Optional, Tuple, Dict, Any, Callable
 import pickle
 import numpy as np
 import pandas as pd
 import torch
 from sklearn.neighbors import NearestNeighbors
+from .profiling import StageTimer, merge_totals
 
 # %% auto 0
-__all__ = ['BaseMemoryCollection', 'CosineKnnMemoryCollection']
+__all__ = ['BaseMemoryCollection', 'VectorArena', 'BaseEvictionPolicy', 'FIFOEvictionPolicy',
+           'LeastRecentlyRetrievedEvictionPolicy', 'ReservoirEvictionPolicy', 'CosineKnnMemoryCollection',
+           'TorchMemoryCollection', 'BaseVectorCodec', 'Float16Codec', 'Int8ScalarCodec', 'ProductQuantizationCodec',
+           'QuantizedMemoryCollection', 'IVFMemoryCollection', 'MemoryPool', 'WriteBehindMemoryCollection',
+           'MultiLayerMemoryCollection']
 
-# %% ../nbs/01_memory_collection.ipynb 5
+# %% ../nbs/00_memory_collection.ipynb 5
 class BaseMemoryCollection:
+    # Versions are unique among all the memories, so (memory, version) pairs never repeat
+    _versions = itertools.count()
+
     def __init__(self, top_k: int, remember_until_position: int = 0):
         self.top_k = top_k
         self.remember_until_position = remember_until_position
         self._local2global_position_offset = 0
         self._remembered_tokens = 0
+        self._namespaces = {}
+        self._row_remember_until_positions = {}
+        self._version = next(BaseMemoryCollection._versions)
+        self.timer = StageTimer()
+
+    @property
+    def version(self) -> Any:
+        """
+        Changes every time the memory content is changed (by `add` or `reset`)
+        """
+        return self._version
 
     def reset(self) -> None:
         """
-        Reset memory
+        Reset memory (including the memories of every batch row)
         """
         self._local2global_position_offset = 0
         self._remembered_tokens = 0
+        self._namespaces = {}
+        self._row_remember_until_positions = {}
+        self._version = next(BaseMemoryCollection._versions)
     
     def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
         """
@@ -68,6 +96,103 @@ class BaseMemoryCollection:
         self._add_filtered(remember_inputs)
         self._remembered_tokens += tokens_to_remember
         self._local2global_position_offset += tokens_to_remember
+        if tokens_to_remember:
+            self._version = next(BaseMemoryCollection._versions)
+    
+    @property
+    def position_offset(self) -> int:
+        """
+        Global position of the first token of the next chunk given to `add`
+        """
+        return self._local2global_position_offset
+    
+    def seek(self, global_position: int) -> None:
+        """
+        Set the global position of the first token of the next chunk (for this memory and every batch row memory).
+        With overlapping chunks it keeps global positions right, so already remembered tokens are not remembered twice.
+        :param global_position: position, not greater than the remembered tokens count
+        """
+        assert 0 <= global_position <= self._remembered_tokens
+        self._local2global_position_offset = global_position
+        for namespace in self._namespaces.values():
+            namespace.seek(min(global_position, namespace._remembered_tokens))
+    
+    def namespace(self, row: int) -> BaseMemoryCollection:
+        """
+        Memory of the given batch row.
+        Row 0 is this memory itself, other rows get their own (initially empty) memories,
+        so batch rows are independent documents rather than a shared memory.
+        Row memories are dropped by `reset` and are not saved.
+        :param row: batch row index
+        """
+        if row == 0:
+            return self
+        if row not in self._namespaces:
+            self._namespaces[row] = self._new_namespace(row)
+        namespace = self._namespaces[row]
+        namespace.remember_until_position = self._row_remember_until_positions.get(row, self.remember_until_position)
+        return namespace
+
+    def set_row_remember_until_position(self, row: int, remember_until_position: int) -> None:
+        """
+        Remember only tokens with (global) position less than it in the given batch row memory,
+        instead of `remember_until_position` - so the batch rows may be the documents of different lengths.
+        Row 0 is this memory itself. Row values are dropped by `reset`.
+        """
+        if row == 0:
+            self.remember_until_position = remember_until_position
+        else:
+            # Replaced, not changed in-place: forks may share it
+            self._row_remember_until_positions = {**self._row_remember_until_positions, row: remember_until_position}
+    
+    def _new_namespace(self, row: int) -> BaseMemoryCollection:
+        """
+        Create an empty memory with the same settings for the given batch row
+        """
+        raise NotImplementedError()
+    
+    def fork(self) -> BaseMemoryCollection:
+        """
+        Independent copy of the memory (including the memories of every batch row),
+        to continue the same document in different ways - for instance with different prompts.
+        Implementations may share the content remembered so far with the fork (copy-on-write),
+        so this memory should not be changed while it's forks are used (resetting it is fine).
+        """
+        return copy.deepcopy(self)
+    
+    def get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        """
+        Get relevant "memories" of every batch row from it's own namespace.
+        :param inputs: (batch, seq, dim) embeddings
+        :returns: (batch, seq, top_k, dim) memories
+        """
+        with self.timer.measure("memory_get"):
+            return self._get_batch(inputs)
+
+    def _get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        memories = []
+        for row in range(inputs.shape[0]):
+            row_memories = self.namespace(row).get(inputs[row])
+            if len(row_memories.shape) == 2:
+                # Empty memory returns the inputs themselves
+                row_memories = row_memories.unsqueeze(1).expand(-1, self.top_k, -1)
+            memories.append(row_memories)
+        return torch.stack(memories)
+    
+    def add_batch(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        """
+        Remember every batch row in it's own namespace.
+        :param inputs: (batch, seq, dim) embeddings
+        :param local_position_ids: (batch, seq) or (1, seq) token ids inside the chunk processed by transformer
+        """
+        with self.timer.measure("memory_add"):
+            self._add_batch(inputs, local_position_ids)
+
+    def _add_batch(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        assert len(inputs.shape) == 3
+        local_position_ids = local_position_ids.expand(inputs.shape[:2])
+        for row in range(inputs.shape[0]):
+            self.namespace(row).add(inputs[row], local_position_ids[row])
     
     def _add_filtered(self, inputs: torch.FloatTensor) -> None:
         """
@@ -76,6 +201,36 @@ class BaseMemoryCollection:
         """
         raise NotImplementedError()
     
+    def to(self, device: torch.device) -> BaseMemoryCollection:
+        """
+        Move memory storage to the device.
+        Does nothing unless the implementation keeps it's storage as torch tensors.
+        """
+        return self
+    
+    def memory_bytes(self) -> int:
+        """
+        RAM taken by the remembered vectors, including the memories of every batch row.
+        Memory-mapped storage is not counted.
+        """
+        return sum(namespace.memory_bytes() for namespace in self._namespaces.values())
+
+    def mapped_bytes(self) -> int:
+        """
+        Size of the memory-mapped storage (not counted by `memory_bytes`), including the memories of every batch row.
+        It is paged into RAM as soon as it is accessed.
+        """
+        return sum(namespace.mapped_bytes() for namespace in self._namespaces.values())
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Cumulative timings of the memory (`memory_get_seconds`, `memory_add_calls`, ...) and it's current size,
+        including the memories of every batch row
+        """
+        metrics = merge_totals(self.timer.totals(), *[namespace.timer.totals() for namespace in self._namespaces.values()])
+        metrics["memory_bytes"] = self.memory_bytes()
+        return metrics
+    
     def save(self, directory: str) -> None:
         """
         Save memory state
@@ -89,28 +244,416 @@ class BaseMemoryCollection:
         """
         raise NotImplementedError()
 
-# %% ../nbs/01_memory_collection.ipynb 6
+# %% ../nbs/00_memory_collection.ipynb 6
+class VectorArena:
+    """
+    Contiguous storage for the remembered embeddings.
+    Keeps two preallocated float32 matrices - raw vectors and their normed versions.
+    When the capacity is exhausted it is doubled, so appends are amortized O(1) per vector.
+    If the directory is given - the matrices are memory-mapped files inside it, so they can outgrow RAM.
+    """
+    def __init__(self, initial_capacity: int = 1024, directory: Optional[str] = None) -> None:
+        """
+        :param initial_capacity: how much vectors to preallocate place for once the dimension is known
+        :param directory: where to keep memory-mapped storage files (in-RAM storage if None)
+        """
+        assert initial_capacity > 0
+        self.initial_capacity = initial_capacity
+        self.directory = directory
+        self._vectors = None
+        self._vectors_normed = None
+        self._length = 0
+        self._file_backed = False
+
+    @staticmethod
+    def from_arrays(vectors: np.ndarray, vectors_normed: np.ndarray, initial_capacity: int = 1024,
+                    directory: Optional[str] = None) -> VectorArena:
+        """
+        Wrap existing (for instance memory-mapped read-only) arrays without copying them.
+        They are copied into the own storage only once something is appended.
+        """
+        assert vectors.shape == vectors_normed.shape
+        arena = VectorArena(initial_capacity, directory)
+        arena._vectors = vectors
+        arena._vectors_normed = vectors_normed
+        arena._length = vectors.shape[0]
+        return arena
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        if self._vectors is None:
+            return 0
+        return self._vectors.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        RAM taken by the storage (memory-mapped files are not counted)
+        """
+        if self._vectors is None or self._file_backed or isinstance(self._vectors, np.memmap):
+            return 0
+        return self._vectors.nbytes + self._vectors_normed.nbytes
+
+    @property
+    def mapped_nbytes(self) -> int:
+        """
+        Size of the memory-mapped storage files
+        """
+        if self._vectors is None or not (self._file_backed or isinstance(self._vectors, np.memmap)):
+            return 0
+        return self._vectors.nbytes + self._vectors_normed.nbytes
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        Raw vectors, (length, dim) view of the storage
+        """
+        return self._vectors[:self._length]
+
+    @property
+    def vectors_normed(self) -> np.ndarray:
+        """
+        Normed vectors, (length, dim) view of the storage
+        """
+        return self._vectors_normed[:self._length]
+
+    def _storage_file(self, name: str, capacity: int, dim: int, extend: bool) -> np.memmap:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.bin")
+        with open(path, "r+b" if extend else "wb") as dst:
+            dst.truncate(capacity * dim * np.dtype(np.float32).itemsize)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+
+    def _reserve(self, capacity: int, dim: int, copy: bool = False) -> bool:
+        """
+        Make sure the storage can keep `capacity` vectors.
+        :param copy: reallocate even if the capacity is enough (to copy read-only storage into the own one)
+        :returns: was the storage reallocated (so previously returned views are not backed by it anymore)
+        """
+        if capacity <= self.capacity and not copy:
+            return False
+        new_capacity = max(self.capacity, self.initial_capacity)
+        while new_capacity < capacity:
+            new_capacity *= 2
+        if self._file_backed:
+            # Storage files are just extended, the content stays in place
+            self._vectors = self._storage_file("vectors", new_capacity, dim, extend=True)
+            self._vectors_normed = self._storage_file("vectors-normed", new_capacity, dim, extend=True)
+            return True
+        if self.directory is None:
+            vectors = np.empty((new_capacity, dim), dtype=np.float32)
+            vectors_normed = np.empty((new_capacity, dim), dtype=np.float32)
+        else:
+            vectors = self._storage_file("vectors", new_capacity, dim, extend=False)
+            vectors_normed = self._storage_file("vectors-normed", new_capacity, dim, extend=False)
+            self._file_backed = True
+        if self._length:
+            vectors[:self._length] = self._vectors[:self._length]
+            vectors_normed[:self._length] = self._vectors_normed[:self._length]
+        self._vectors = vectors
+        self._vectors_normed = vectors_normed
+        return True
+
+    def append(self, vectors: np.ndarray, vectors_normed: np.ndarray) -> bool:
+        """
+        Append vectors to the storage.
+        :param vectors: raw vectors (2d array)
+        :param vectors_normed: normed vectors (2d array)
+        :returns: was the storage reallocated
+        """
+        return self.write(self._length, vectors, vectors_normed)
+
+    def write(self, start: int, vectors: np.ndarray, vectors_normed: np.ndarray) -> bool:
+        """
+        Write vectors to the storage rows starting from `start` (overwriting the previous content),
+        the storage length is extended if needed.
+        :param start: first row to write, should not be greater than the current length
+        :param vectors: raw vectors (2d array)
+        :param vectors_normed: normed vectors (2d array)
+        :returns: was the storage reallocated
+        """
+        assert vectors.shape == vectors_normed.shape
+        assert start <= self._length
+        count = vectors.shape[0]
+        # Memory-mapped (read-only) content of the loaded arena, as well as the forked arena content,
+        # is copied into the own storage before the first write
+        reallocated = self._reserve(start + count, vectors.shape[1], copy=self.read_only)
+        self._vectors[start : start + count] = vectors
+        self._vectors_normed[start : start + count] = vectors_normed
+        self._length = max(self._length, start + count)
+        return reallocated
+
+    def fork(self) -> VectorArena:
+        """
+        Arena sharing the current content with this one (kept in RAM if this one is memory-mapped).
+        The content is copied into the own storage only before the first write to the fork.
+        """
+        if self._vectors is None:
+            return VectorArena(self.initial_capacity)
+        vectors = self.vectors.view()
+        vectors_normed = self.vectors_normed.view()
+        # Read-only views, so the first write copies them
+        vectors.flags.writeable = False
+        vectors_normed.flags.writeable = False
+        return VectorArena.from_arrays(vectors, vectors_normed, self.initial_capacity)
+
+    @property
+    def read_only(self) -> bool:
+        """
+        Is the storage shared with another arena or loaded from the disk (so it is copied before the next write)
+        """
+        return self._vectors is not None and not self._vectors.flags.writeable
+
+    def clear(self) -> None:
+        self._vectors = None
+        self._vectors_normed = None
+        self._length = 0
+        self._file_backed = False
+
+    def save(self, directory: str) -> None:
+        """
+        Save the content as (raw) .npy files, which could be memory-mapped back by `load`
+        """
+        os.makedirs(directory, exist_ok=True)
+        if self._vectors is None:
+            return
+        for name, array in [("vectors", self.vectors), ("vectors-normed", self.vectors_normed)]:
+            # Written aside and then renamed, since the arena itself may be memory-mapped from the same path
+            path = os.path.join(directory, f"{name}.npy")
+            stored = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=np.float32, shape=array.shape)
+            stored[:] = array
+            stored.flush()
+            del stored
+            os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(directory: str, initial_capacity: int = 1024, storage_directory: Optional[str] = None) -> VectorArena:
+        """
+        Memory-map the saved content (read-only), nothing is read from the disk until it is accessed
+        """
+        vectors_path = os.path.join(directory, "vectors.npy")
+        if not os.path.exists(vectors_path):
+            return VectorArena(initial_capacity, storage_directory)
+        return VectorArena.from_arrays(
+            np.load(vectors_path, mmap_mode="r"),
+            np.load(os.path.join(directory, "vectors-normed.npy"), mmap_mode="r"),
+            initial_capacity,
+            storage_directory,
+        )
+
+    def __getstate__(self) -> dict:
+        # Do not serialize the unused preallocated tail
+        state = self.__dict__.copy()
+        if self._vectors is not None:
+            state["_vectors"] = np.array(self.vectors)
+            state["_vectors_normed"] = np.array(self.vectors_normed)
+        # Unpickled copies keep their storage in RAM, so they never write into the original storage files
+        state["directory"] = None
+        state["_file_backed"] = False
+        return state
+
+# %% ../nbs/00_memory_collection.ipynb 7
+class BaseEvictionPolicy:
+    """
+    Chooses which sealed segment of a bounded CosineKnnMemoryCollection to drop
+    """
+    name = None
+
+    def choose(self, memory: CosineKnnMemoryCollection) -> int:
+        """
+        :param memory: memory with one sealed segment more than it's capacity allows (the newest segment is the last)
+        :returns: index of the segment to evict
+        """
+        raise NotImplementedError()
+
+# %% ../nbs/00_memory_collection.ipynb 8
+class FIFOEvictionPolicy(BaseEvictionPolicy):
+    """
+    Drop the oldest segment (the original Memorizing Transformers behaviour)
+    """
+    name = "fifo"
+
+    def choose(self, memory: CosineKnnMemoryCollection) -> int:
+        return 0
+
+# %% ../nbs/00_memory_collection.ipynb 9
+class LeastRecentlyRetrievedEvictionPolicy(BaseEvictionPolicy):
+    """
+    Drop the segment whose vectors were retrieved by `get` least recently
+    (sealing counts as a retrieval, so new segments are not dropped right away).
+    Ties are broken by the retrievals count, then by the age.
+    """
+    name = "least-recently-retrieved"
+
+    def choose(self, memory: CosineKnnMemoryCollection) -> int:
+        # np.lexsort sorts by the last key first
+        return int(np.lexsort((memory.segment_retrievals, memory.segment_last_retrieved))[0])
+
+# %% ../nbs/00_memory_collection.ipynb 10
+class ReservoirEvictionPolicy(BaseEvictionPolicy):
+    """
+    Reservoir sampling of the segments: every segment sealed so far stays in memory with the same probability
+    """
+    name = "reservoir"
+
+    def __init__(self, seed: int = 0) -> None:
+        self.random = np.random.RandomState(seed)
+
+    def choose(self, memory: CosineKnnMemoryCollection) -> int:
+        reservoir_size = len(memory.knns) - 1
+        # Algorithm R: the newest (n-th sealed) segment replaces a random one with reservoir_size / n probability
+        return min(self.random.randint(memory.sealed_segments), reservoir_size)
+
+# %% ../nbs/00_memory_collection.ipynb 11
 class CosineKnnMemoryCollection(BaseMemoryCollection):
-    def __init__(self, top_k: int, max_temporary_buffer_size: int, remember_until_position: int = 0) -> None:
+    def __init__(self, top_k: int, max_temporary_buffer_size: int, remember_until_position: int = 0,
+                 storage_directory: Optional[str] = None,
+                 capacity: Optional[int] = None,
+                 eviction_policy: Optional[BaseEvictionPolicy] = None,
+                 index_workers: int = 0,
+                 compaction_factor: Optional[int] = None,
+                 search_workers: int = 0) -> None:
+        """
+        :param top_k: how much memories to extract for each input
+        :param max_temporary_buffer_size: how much vectors each sealed knn index covers
+        :param remember_until_position: remember only tokens with (global) position less than it
+        :param storage_directory: keep vectors in memory-mapped files inside this directory instead of RAM
+        :param capacity: how much tokens the sealed segments may keep (rounded down to whole segments),
+                         unlimited if None. The temporary buffer is kept on top of it.
+        :param eviction_policy: which segment to drop once the capacity is exceeded (FIFO by default)
+        :param index_workers: how much background threads fit the knn indices of the sealed segments
+                              (0 - fit them synchronously). Until the index is ready the segment is searched by brute force.
+        :param compaction_factor: merge this much adjacent segments of the same size into a single one
+                                  (tiered compaction, so the segments count grows logarithmically), no merges if None.
+                                  Merges are done by the index_workers threads if there are any.
+        :param search_workers: how much threads search the segments in parallel in `get`
+                               (0 - one after another in the calling thread), independent of torch threads
+        """
         super().__init__(top_k, remember_until_position)
+        assert capacity is None or capacity >= max_temporary_buffer_size
+        assert compaction_factor is None or compaction_factor >= 2
         self.max_temporary_buffer_size = max_temporary_buffer_size
+        self.capacity = capacity
+        self.eviction_policy = eviction_policy if eviction_policy is not None else FIFOEvictionPolicy()
+        self.index_workers = index_workers
+        self.compaction_factor = compaction_factor
+        self.search_workers = search_workers
         self.knns = []
-        self.temporary_buffer = []
-        self.vectors = []
+        self.arena = VectorArena(max_temporary_buffer_size, storage_directory)
         self._buffer_knn = None
+        self._index_executor = None
+        self._search_executor = None
+        # Incremented on every arena reallocation, background indices fitted before it are outdated
+        self._arena_generation = 0
+        self._init_slots(0, 0)
+
+    def _init_slots(self, segments: int, buffer_length: int) -> None:
+        # The arena is split into max_temporary_buffer_size-rows slots, the buffer takes one of them,
+        # every sealed segment - one or more (after merges) contiguous slots starting from it's segment_slots item.
+        # Slots of the evicted segments are reused, so a bounded memory arena never grows past capacity + buffer.
+        self.segment_slots = list(range(segments))
+        self.segment_lengths = [1] * segments
+        self._buffer_slot = segments
+        self._buffer_length = buffer_length
+        self._free_slots = []
+        # (first slot, slots count) -> (background knn fitting future, arena generation)
+        self._pending_knns = {}
+        self.sealed_segments = segments
+        self.evicted_segments = 0
+        self.merges = 0
+        self.merged_vectors = 0
+        # Retrieval statistics of every slot, used by the eviction policies
+        self._retrieval_step = 0
+        self._slot_retrievals = np.zeros((segments + 1,), dtype=np.int64)
+        self._slot_last_retrieved = np.zeros((segments + 1,), dtype=np.int64)
 
     def reset(self) -> None:
         super().reset()
         self.knns = []
-        self.temporary_buffer = []
-        self.vectors = []
+        self.arena.clear()
         self._buffer_knn = None
+        self._init_slots(0, 0)
+
+    def _new_namespace(self, row: int) -> BaseMemoryCollection:
+        storage_directory = None if self.arena.directory is None else os.path.join(self.arena.directory, f"row-{row}")
+        return CosineKnnMemoryCollection(self.top_k, self.max_temporary_buffer_size, self.remember_until_position,
+                                         storage_directory, self.capacity, copy.deepcopy(self.eviction_policy),
+                                         self.index_workers, self.compaction_factor, self.search_workers)
+
+    def fork(self) -> BaseMemoryCollection:
+        """
+        Copy-on-write fork: sealed segments (their vectors and knn indices) are shared with this memory,
+        the arena is copied only once the fork remembers something, so the following vectors are it's private tail.
+        """
+        memory = object.__new__(CosineKnnMemoryCollection)
+        memory.__dict__.update(self.__dict__)
+        memory.arena = self.arena.fork()
+        memory.knns = list(self.knns)
+        memory.eviction_policy = copy.deepcopy(self.eviction_policy)
+        memory.segment_slots = list(self.segment_slots)
+        memory.segment_lengths = list(self.segment_lengths)
+        memory._free_slots = list(self._free_slots)
+        # Background fits are over the shared content, so they are installed by both memories
+        memory._pending_knns = dict(self._pending_knns)
+        memory._slot_retrievals = self._slot_retrievals.copy()
+        memory._slot_last_retrieved = self._slot_last_retrieved.copy()
+        memory._namespaces = {row: namespace.fork() for row, namespace in self._namespaces.items()}
+        return memory
+
+    def memory_bytes(self) -> int:
+        return super().memory_bytes() + self.arena.nbytes
+
+    def mapped_bytes(self) -> int:
+        return super().mapped_bytes() + self.arena.mapped_nbytes
+
+    @property
+    def _buffer_start(self) -> int:
+        return self._buffer_slot * self.max_temporary_buffer_size
+
+    @property
+    def max_segments(self) -> Optional[int]:
+        if self.capacity is None:
+            return None
+        return self.capacity // self.max_temporary_buffer_size
+
+    @property
+    def segment_retrievals(self) -> np.ndarray:
+        """
+        How much vectors of every sealed segment were returned by `get`
+        """
+        return np.array([self._slot_retrievals[slot : slot + length].sum()
+                         for slot, length in zip(self.segment_slots, self.segment_lengths)], dtype=np.int64)
+
+    @property
+    def segment_last_retrieved(self) -> np.ndarray:
+        """
+        Number of the last `get` call which returned vectors of the segment (or the one before the segment sealing)
+        """
+        return np.array([self._slot_last_retrieved[slot : slot + length].max()
+                         for slot, length in zip(self.segment_slots, self.segment_lengths)], dtype=np.int64)
+
+    def metrics(self) -> Dict[str, float]:
+        metrics = super().metrics()
+        metrics["memory_segments"] = len(self.knns) + sum(len(namespace.knns) for namespace in self._namespaces.values())
+        return metrics
+
+    def segment_stats(self) -> Dict[str, Any]:
+        """
+        Segments and compaction counters
+        """
+        return {
+            "segments": len(self.knns),
+            "segment_sizes": [length * self.max_temporary_buffer_size for length in self.segment_lengths],
+            "sealed_segments": self.sealed_segments,
+            "evicted_segments": self.evicted_segments,
+            "merges": self.merges,
+            "merged_vectors": self.merged_vectors,
+            "pending_indices": len(self._pending_knns),
+        }
 
-    def _embeddings_numpy(self, embeddings: Union[np.ndarray, List[np.ndarray]]) -> np.ndarray:
-        if isinstance(embeddings, list):
-            return np.array(embeddings)
-        return embeddings
-    
     def _norm(self, inputs: np.ndarray) -> np.ndarray:
         embedding_dim = inputs.shape[-1]
         
@@ -127,96 +670,1824 @@ class CosineKnnMemoryCollection(BaseMemoryCollection):
         
         return inputs_normed
 
-    def _bruteforce_knn(self, embeddings, n_jobs=1) -> NearestNeighbors:
+    def _bruteforce_knn(self, embeddings_normed: np.ndarray, n_jobs=1) -> NearestNeighbors:
         # Cosine similarity and L2 distance on normed vectors have 1.0 corellation
         # Minkowski metric with p=2 is same as L2
         nn = NearestNeighbors(n_neighbors=self.top_k, algorithm="brute", metric="minkowski", p=2, n_jobs=n_jobs)
-        nn.fit(self._norm(self._embeddings_numpy(embeddings)))
+        nn.fit(embeddings_normed)
         return nn
     
-    def _knn(self, embeddings, n_jobs=-1) -> NearestNeighbors:
+    def _knn(self, embeddings_normed: np.ndarray, n_jobs=-1) -> NearestNeighbors:
         # Cosine similarity and L2 distance on normed vectors have 1.0 corellation (spearman)
         # Minkowski metric with p=2 is same as L2
         nn = NearestNeighbors(n_neighbors=self.top_k, algorithm="auto", metric="minkowski", p=2, n_jobs=n_jobs)
-        nn.fit(self._norm(self._embeddings_numpy(embeddings)))
+        nn.fit(embeddings_normed)
         return nn
     
+    def _slots_normed(self, slot: int, length: int) -> np.ndarray:
+        start = slot * self.max_temporary_buffer_size
+        return self.arena.vectors_normed[start : start + length * self.max_temporary_buffer_size]
+
+    def _segment_normed(self, i: int) -> np.ndarray:
+        return self._slots_normed(self.segment_slots[i], self.segment_lengths[i])
+
+    def _refit_knns(self) -> None:
+        # Knn indices are fitted on arena views (so normed vectors are not duplicated inside them),
+        # after arena reallocation they should be rebound to the new storage
+        self._arena_generation += 1
+        if self.index_workers:
+            # Sealed rows never change and the outdated indices keep the previous storage alive, so they stay valid
+            # until the background ones fitted over the new storage replace them
+            for slot, length, nn in zip(self.segment_slots, self.segment_lengths, self.knns):
+                if nn is not None and (slot, length) not in self._pending_knns:
+                    self._submit_knn(slot, length)
+            return
+        self.knns = [
+            self._knn(self._segment_normed(i)) if nn is not None else None
+            for i, nn in enumerate(self.knns)
+        ]
+
+    def build_knns(self) -> None:
+        """
+        Fit knn indices for the segments which are searched by brute force (for instance right after loading)
+        """
+        self.knns = [
+            self._knn(self._segment_normed(i)) if nn is None else nn
+            for i, nn in enumerate(self.knns)
+        ]
+
+    def _get_index_executor(self) -> ThreadPoolExecutor:
+        if self._index_executor is None:
+            self._index_executor = ThreadPoolExecutor(max_workers=self.index_workers)
+        return self._index_executor
+
+    def _get_search_executor(self) -> ThreadPoolExecutor:
+        if self._search_executor is None or self._search_executor._max_workers != self.search_workers:
+            self._search_executor = ThreadPoolExecutor(max_workers=self.search_workers)
+        return self._search_executor
+
+    def _submit_knn(self, slot: int, length: int) -> None:
+        future = self._get_index_executor().submit(self._knn, self._slots_normed(slot, length))
+        self._pending_knns[(slot, length)] = (future, self._arena_generation)
+
+    def _install_knn(self, slot: int, length: int, nn: NearestNeighbors) -> bool:
+        """
+        Use the index fitted on the given slots: for the segment covering them,
+        or instead of the adjacent segments covering them (merge)
+        :returns: were segments merged
+        """
+        if slot not in self.segment_slots:
+            return False
+        first = self.segment_slots.index(slot)
+        last = first
+        covered = 0
+        while last < len(self.segment_slots) and covered < length and self.segment_slots[last] == slot + covered:
+            covered += self.segment_lengths[last]
+            last += 1
+        if covered != length:
+            # The segments were evicted / merged differently since
+            return False
+        if last - first == 1:
+            self.knns[first] = nn
+            return False
+        self.knns[first:last] = [nn]
+        self.segment_slots[first:last] = [slot]
+        self.segment_lengths[first:last] = [length]
+        self.merges += 1
+        self.merged_vectors += length * self.max_temporary_buffer_size
+        return True
+
+    def _collect_knns(self) -> None:
+        """
+        Switch the segments whose background knn indices are ready from brute force to them
+        (or replace the merged segments by the new one)
+        """
+        merged = False
+        for (slot, length), (future, generation) in list(self._pending_knns.items()):
+            if not future.done():
+                continue
+            del self._pending_knns[(slot, length)]
+            nn = future.result()
+            if generation == self._arena_generation:
+                merged = self._install_knn(slot, length, nn) or merged
+            else:
+                # Fitted on the storage which was reallocated since
+                self._submit_knn(slot, length)
+        if merged:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Tiered compaction: merge compaction_factor adjacent segments of the same size, contiguous in the arena,
+        into a single one. Merged vectors are not moved, only the bigger knn index is fitted over their arena rows.
+        """
+        if self.compaction_factor is None:
+            return
+        i = 0
+        while i + self.compaction_factor <= len(self.segment_slots):
+            slot = self.segment_slots[i]
+            length = self.segment_lengths[i]
+            mergeable = all(
+                self.segment_lengths[i + j] == length and self.segment_slots[i + j] == slot + j * length
+                for j in range(1, self.compaction_factor)
+            )
+            merged_length = length * self.compaction_factor
+            # Segments which are already being merged are skipped
+            busy = any(pending_length > 1 and pending_slot < slot + merged_length and slot < pending_slot + pending_length
+                       for pending_slot, pending_length in self._pending_knns)
+            if not mergeable or busy:
+                i += 1
+            elif self.index_workers:
+                self._submit_knn(slot, merged_length)
+                i += self.compaction_factor
+            else:
+                self._install_knn(slot, merged_length, self._knn(self._slots_normed(slot, merged_length)))
+                # Merged segment may be mergeable with the previous ones now
+                i = 0
+
+    def wait_for_knns(self) -> None:
+        """
+        Block until every background knn index is ready
+        """
+        while self._pending_knns:
+            wait([future for future, _ in self._pending_knns.values()])
+            self._collect_knns()
+
+    def _bruteforce_kneighbors(self, embeddings_normed: np.ndarray, vectors_normed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Same output as NearestNeighbors.kneighbors, but works directly on (possibly memory-mapped) arena rows.
+        # L2 distance between normed vectors is sqrt(2 - 2 * cosine similarity)
+        similarities = vectors_normed @ embeddings_normed.T
+        top_k = min(self.top_k, embeddings_normed.shape[0])
+        indices = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+        similarities = np.take_along_axis(similarities, indices, axis=1)
+        order = np.argsort(-similarities, axis=1, kind="stable")
+        indices = np.take_along_axis(indices, order, axis=1)
+        similarities = np.take_along_axis(similarities, order, axis=1)
+        distances = np.sqrt(np.maximum(2.0 - 2.0 * similarities, 0.0))
+        return distances, indices
+
+    def _segment_kneighbors(self, i: int, vectors_normed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        nn = self.knns[i]
+        if nn is None:
+            return self._bruteforce_kneighbors(self._segment_normed(i), vectors_normed)
+        return nn.kneighbors(vectors_normed, return_distance=True)
+
+    def _search_segment(self, i: int, vectors_normed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # i-th sealed segment (or the buffer after them) top_k distances and arena indices
+        if i < len(self.knns):
+            distances, indices_local = self._segment_kneighbors(i, vectors_normed)
+            return distances, indices_local + self.segment_slots[i] * self.max_temporary_buffer_size
+        distances, indices_local = self._get_buffer_knn().kneighbors(vectors_normed, return_distance=True)
+        return distances, indices_local + self._buffer_start
+
     def _get_buffer_knn(self) -> NearestNeighbors:
         if self._buffer_knn is None:
-            self._buffer_knn = self._bruteforce_knn(self.temporary_buffer)
+            self._buffer_knn = self._bruteforce_knn(
+                self.arena.vectors_normed[self._buffer_start : self._buffer_start + self._buffer_length]
+            )
         return self._buffer_knn
     
     def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
         with torch.no_grad():
             vectors = inputs.detach().cpu().float().numpy()
         vectors_normed = self._norm(vectors)
-        nn: NearestNeighbors
-        knns = self.knns
-        if self.temporary_buffer:
-            knns = knns + [self._get_buffer_knn()]
-        if len(knns) == 0:
+        self._collect_knns()
+        knns_count = len(self.knns)
+        if self._buffer_length > 0:
+            knns_count += 1
+        if knns_count == 0:
             return inputs
-        vectors_found = np.zeros(
-            (inputs.shape[0], len(knns), self.top_k, inputs.shape[1]),
-            dtype=np.float32
+        indices_found = np.zeros(
+            (inputs.shape[0], knns_count, self.top_k),
+            dtype=np.int64
         )
         distances_found = np.zeros(
-            (inputs.shape[0], len(knns), self.top_k)
+            (inputs.shape[0], knns_count, self.top_k),
+            dtype=np.float32
         )
-        for i, nn in enumerate(knns):
-            distances, indices_local = nn.kneighbors(vectors_normed, return_distance=True)
-            indices = indices_local + i * self.max_temporary_buffer_size
-            for j in range(self.top_k):
-                jth_vectors = [
-                    self.vectors[index]
-                    for index in indices[:, j]
-                ]
-                jth_distances = distances[:, j]
-                vectors_found[:, i, j, :] = jth_vectors
-                distances_found[:, i, j] = jth_distances
-        vectors_found = vectors_found.reshape((inputs.shape[0], len(knns) * self.top_k, inputs.shape[1]))
-        distances_found = distances_found.reshape((inputs.shape[0], len(knns) * self.top_k))
-
-        vectors_chosen = np.zeros((inputs.shape[0], self.top_k, inputs.shape[1]))
-        for i in range(inputs.shape[0]):
-            item_vectors = vectors_found[i]
-            item_distances = distances_found[i]
-            item_distances_min = item_distances.argsort()[:self.top_k]
-            item_vectors_chosen = [item_vectors[j] for j in item_distances_min]
-            for j, vector in enumerate(item_vectors_chosen):
-                vectors_chosen[i, j, :] = vector
+        if self._buffer_length > 0:
+            # Fitted here, so the search threads never race for it
+            self._get_buffer_knn()
+        if self.search_workers and knns_count > 1:
+            # sklearn / numpy kernels release the GIL, so the segments are really searched in parallel
+            results = self._get_search_executor().map(self._search_segment, range(knns_count),
+                                                      [vectors_normed] * knns_count)
+        else:
+            results = (self._search_segment(i, vectors_normed) for i in range(knns_count))
+        for i, (distances, indices) in enumerate(results):
+            indices_found[:, i, :] = indices
+            distances_found[:, i, :] = distances
+        indices_found = indices_found.reshape((inputs.shape[0], knns_count * self.top_k))
+        distances_found = distances_found.reshape((inputs.shape[0], knns_count * self.top_k))
+        
+        # Batched top_k merge of all the knns candidates: (seq, top_k)
+        if knns_count > 1:
+            candidates = np.argpartition(distances_found, self.top_k - 1, axis=1)[:, :self.top_k]
+            candidates_order = np.take_along_axis(distances_found, candidates, axis=1).argsort(axis=1, kind="stable")
+            candidates = np.take_along_axis(candidates, candidates_order, axis=1)
+            indices_found = np.take_along_axis(indices_found, candidates, axis=1)
+        self._track_retrievals(indices_found)
+        # Single gather from the arena: (seq, top_k, dim)
+        vectors_chosen = self.arena.vectors[indices_found]
         
         with torch.no_grad():
-            vectors_chosen_torch = torch.tensor(vectors_chosen, dtype=inputs.dtype, device=inputs.device)
+            vectors_chosen_torch = torch.from_numpy(vectors_chosen).to(dtype=inputs.dtype, device=inputs.device)
         return vectors_chosen_torch
     
+    def _track_retrievals(self, indices_found: np.ndarray) -> None:
+        self._retrieval_step += 1
+        slots_found = np.unique(indices_found // self.max_temporary_buffer_size)
+        self._slot_retrievals += np.bincount(indices_found.reshape(-1) // self.max_temporary_buffer_size,
+                                             minlength=self._slot_retrievals.shape[0])
+        self._slot_last_retrieved[slots_found] = self._retrieval_step
+
+    def _new_buffer_slot(self) -> int:
+        if self._free_slots:
+            # The lowest free slot first, so the new segments stay contiguous (and mergeable) where possible
+            self._free_slots.sort()
+            slot = self._free_slots.pop(0)
+        else:
+            slot = self._slot_retrievals.shape[0]
+            self._slot_retrievals = np.concatenate((self._slot_retrievals, [0]))
+            self._slot_last_retrieved = np.concatenate((self._slot_last_retrieved, [0]))
+        self._slot_retrievals[slot] = 0
+        return slot
+
+    def _seal_buffer(self) -> None:
+        with self.timer.measure("memory_seal"):
+            self.segment_slots.append(self._buffer_slot)
+            self.segment_lengths.append(1)
+            self._slot_last_retrieved[self._buffer_slot] = self._retrieval_step
+            if self.index_workers:
+                self.knns.append(None)
+                self._submit_knn(self._buffer_slot, 1)
+            else:
+                self.knns.append(self._knn(self._segment_normed(len(self.knns))))
+            self.sealed_segments += 1
+            while self.max_segments is not None and sum(self.segment_lengths) > self.max_segments:
+                self._evict(self.eviction_policy.choose(self))
+            self._buffer_slot = self._new_buffer_slot()
+            self._buffer_length = 0
+            self._compact()
+
+    def _evict(self, i: int) -> None:
+        self.knns.pop(i)
+        slot = self.segment_slots.pop(i)
+        length = self.segment_lengths.pop(i)
+        # Pending indices over the evicted slots should never be installed, since the slots are reused
+        for pending_slot, pending_length in list(self._pending_knns):
+            if pending_slot < slot + length and slot < pending_slot + pending_length:
+                del self._pending_knns[(pending_slot, pending_length)]
+        self._free_slots.extend(range(slot, slot + length))
+        self.evicted_segments += 1
+
     def _add_filtered(self, inputs: torch.FloatTensor) -> None:
         with torch.no_grad():
             vectors = inputs.detach().cpu().float().numpy()
-        vectors_list = list(vectors)
-        if len(vectors_list):
-            self._buffer_knn = None
-        self.temporary_buffer += vectors_list
-        self.vectors += vectors_list
-        if len(self.temporary_buffer) >= self.max_temporary_buffer_size:
-            knn_count = len(self.temporary_buffer) // self.max_temporary_buffer_size
-            rest_buffer_length = len(self.temporary_buffer) % self.max_temporary_buffer_size
-            for i in range(knn_count):
-                embeddings = self.temporary_buffer[i * self.max_temporary_buffer_size : (i + 1) * self.max_temporary_buffer_size]
-                self.knns.append(self._knn(embeddings))
-            if rest_buffer_length == 0:
-                self.temporary_buffer = []
-            else:
-                self.temporary_buffer = self.temporary_buffer[-rest_buffer_length:]
+        if vectors.shape[0] == 0:
+            return
+        self._buffer_knn = None
+        self._collect_knns()
+        vectors_normed = self._norm(vectors)
+        start = 0
+        while start < vectors.shape[0]:
+            end = min(vectors.shape[0], start + self.max_temporary_buffer_size - self._buffer_length)
+            # Read-only (shared or loaded) storage is never changed, so the indices fitted over it stay valid after the copy
+            read_only = self.arena.read_only
+            if self.arena.write(self._buffer_start + self._buffer_length, vectors[start:end], vectors_normed[start:end]) \
+                    and not read_only:
+                self._refit_knns()
+            self._buffer_length += end - start
+            start = end
+            if self._buffer_length == self.max_temporary_buffer_size:
+                self._seal_buffer()
+
+    def __getstate__(self) -> dict:
+        # Fitted knn indices would duplicate the arena content, so they are not pickled
+        # (segments are searched by brute force until build_knns is called)
+        state = self.__dict__.copy()
+        state["knns"] = len(self.knns)
+        state["_buffer_knn"] = None
+        state["_index_executor"] = None
+        state["_search_executor"] = None
+        state["_pending_knns"] = {}
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        knn_count = state.pop("knns")
+        self.__dict__.update(state)
+        self.knns = [None] * knn_count
+        # Memories pickled before batch row namespaces / bounded capacity were introduced
+        self.__dict__.setdefault("_namespaces", {})
+        self.__dict__.setdefault("_row_remember_until_positions", {})
+        self.__dict__.setdefault("timer", StageTimer())
+        if "_version" not in state:
+            self._version = next(BaseMemoryCollection._versions)
+        self.__dict__.setdefault("index_workers", 0)
+        self.__dict__.setdefault("_index_executor", None)
+        self.__dict__.setdefault("search_workers", 0)
+        self.__dict__.setdefault("_search_executor", None)
+        self.__dict__.setdefault("_arena_generation", 0)
+        self.__dict__.setdefault("compaction_factor", None)
+        if "segment_slots" in state and "segment_lengths" not in state:
+            self.segment_lengths = [1] * len(self.segment_slots)
+            self.merges = 0
+            self.merged_vectors = 0
+        if "segment_slots" not in state:
+            self.capacity = None
+            self.eviction_policy = FIFOEvictionPolicy()
+            self._init_slots(knn_count, len(self.arena) - knn_count * self.max_temporary_buffer_size)
+
+    def save(self, directory: str) -> None:
+        """
+        Save memory as raw .npy vector files + small json manifest (no pickles)
+        """
+        self.arena.save(directory)
+        manifest = {
+            "format": "cosine-knn-memory",
+            "version": 2,
+            "top_k": self.top_k,
+            "max_temporary_buffer_size": self.max_temporary_buffer_size,
+            "remember_until_position": self.remember_until_position,
+            "local2global_position_offset": self._local2global_position_offset,
+            "remembered_tokens": self._remembered_tokens,
+            "knns": len(self.knns),
+            "vectors": len(self.arena),
+            "capacity": self.capacity,
+            "eviction_policy": self.eviction_policy.name,
+            "index_workers": self.index_workers,
+            "search_workers": self.search_workers,
+            "compaction_factor": self.compaction_factor,
+            "segment_slots": self.segment_slots,
+            "segment_lengths": self.segment_lengths,
+            "merges": self.merges,
+            "merged_vectors": self.merged_vectors,
+            "buffer_slot": self._buffer_slot,
+            "buffer_length": self._buffer_length,
+            "free_slots": self._free_slots,
+            "sealed_segments": self.sealed_segments,
+            "evicted_segments": self.evicted_segments,
+            "retrieval_step": self._retrieval_step,
+            "slot_retrievals": self._slot_retrievals.tolist(),
+            "slot_last_retrieved": self._slot_last_retrieved.tolist(),
+        }
+        with open(os.path.join(directory, "manifest.json"), "w") as dst:
+            json.dump(manifest, dst, indent=2)
+
+    @staticmethod
+    def load(directory: str, storage_directory: Optional[str] = None,
+             eviction_policy: Optional[BaseEvictionPolicy] = None) -> BaseMemoryCollection:
+        """
+        Load memory saved by `save`.
+        Vectors are memory-mapped, so the memory is queryable right away and read from disk lazily.
+        The eviction policy is restored by it's name (with the default parameters) unless it is given.
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            # Memory saved before the manifest format was introduced
+            with open(os.path.join(directory, "cosine-knn-memory.pkl"), "rb") as src:
+                memory = pickle.load(src)
+                assert isinstance(memory, CosineKnnMemoryCollection)
+                return memory
+        with open(manifest_path, "r") as src:
+            manifest = json.load(src)
+        assert manifest["format"] == "cosine-knn-memory"
+        memory = CosineKnnMemoryCollection(
+            top_k=manifest["top_k"],
+            max_temporary_buffer_size=manifest["max_temporary_buffer_size"],
+            remember_until_position=manifest["remember_until_position"],
+            storage_directory=storage_directory,
+            capacity=manifest.get("capacity"),
+            eviction_policy=eviction_policy,
+            index_workers=manifest.get("index_workers", 0),
+            compaction_factor=manifest.get("compaction_factor"),
+            search_workers=manifest.get("search_workers", 0),
+        )
+        memory._local2global_position_offset = manifest["local2global_position_offset"]
+        memory._remembered_tokens = manifest["remembered_tokens"]
+        memory.arena = VectorArena.load(directory, memory.max_temporary_buffer_size, storage_directory)
+        assert len(memory.arena) == manifest["vectors"]
+        memory.knns = [None] * manifest["knns"]
+        memory._init_slots(manifest["knns"], manifest["vectors"] - manifest["knns"] * memory.max_temporary_buffer_size)
+        if "segment_slots" in manifest:
+            if eviction_policy is None:
+                policy_classes = {policy_class.name: policy_class for policy_class in
+                                  [FIFOEvictionPolicy, LeastRecentlyRetrievedEvictionPolicy, ReservoirEvictionPolicy]}
+                memory.eviction_policy = policy_classes[manifest["eviction_policy"]]()
+            memory.segment_slots = manifest["segment_slots"]
+            memory.segment_lengths = manifest.get("segment_lengths", [1] * len(memory.segment_slots))
+            memory.merges = manifest.get("merges", 0)
+            memory.merged_vectors = manifest.get("merged_vectors", 0)
+            memory._buffer_slot = manifest["buffer_slot"]
+            memory._buffer_length = manifest["buffer_length"]
+            memory._free_slots = manifest["free_slots"]
+            memory.sealed_segments = manifest["sealed_segments"]
+            memory.evicted_segments = manifest["evicted_segments"]
+            memory._retrieval_step = manifest["retrieval_step"]
+            memory._slot_retrievals = np.array(manifest["slot_retrievals"], dtype=np.int64)
+            memory._slot_last_retrieved = np.array(manifest["slot_last_retrieved"], dtype=np.int64)
+        return memory
+
+# %% ../nbs/00_memory_collection.ipynb 12
+class TorchMemoryCollection(BaseMemoryCollection):
+    """
+    Brute-force cosine similarity memory which keeps everything as torch tensors.
+    Normed vectors (keys) and raw vectors (values) are stored in preallocated tensors on the memory device,
+    so the retrieval is a chunked matmul + topk without numpy / sklearn and host round trips.
+    """
+    def __init__(self, top_k: int,
+                 remember_until_position: int = 0,
+                 initial_capacity: int = 1024,
+                 chunk_size: int = 65536,
+                 device: Union[torch.device, str, None] = None,
+                 dtype: Union[torch.dtype, None] = None) -> None:
+        """
+        :param top_k: how much memories to extract for each input
+        :param remember_until_position: remember only tokens with (global) position less than it
+        :param initial_capacity: how much vectors to preallocate place for, capacity is doubled when exhausted
+        :param chunk_size: how much stored vectors are compared with the inputs at once
+        :param device: storage device, the device of the first remembered inputs by default
+        :param dtype: storage dtype, the dtype of the first remembered inputs by default
+        """
+        super().__init__(top_k, remember_until_position)
+        assert initial_capacity > 0
+        assert chunk_size > 0
+        self.initial_capacity = initial_capacity
+        self.chunk_size = chunk_size
+        self.device = torch.device(device) if device is not None else None
+        self.dtype = dtype
+        self._keys = None
+        self._values = None
+        self._length = 0
+        # Storage is shared with the memory this one is forked from (so it is copied before the next write)
+        self._shared = False
+
+    def reset(self) -> None:
+        super().reset()
+        self._keys = None
+        self._values = None
+        self._length = 0
+        self._shared = False
+
+    def fork(self) -> BaseMemoryCollection:
+        memory = copy.copy(self)
+        memory._shared = True
+        memory._namespaces = {row: namespace.fork() for row, namespace in self._namespaces.items()}
+        return memory
+
+    def _new_namespace(self, row: int) -> BaseMemoryCollection:
+        return TorchMemoryCollection(self.top_k, self.remember_until_position, self.initial_capacity, self.chunk_size,
+                                     self.device, self.dtype)
+
+    def memory_bytes(self) -> int:
+        if self._keys is None:
+            return super().memory_bytes()
+        return super().memory_bytes() + self._keys.nelement() * self._keys.element_size() * 2
+
+    @property
+    def keys(self) -> torch.Tensor:
+        return self._keys[:self._length]
+
+    @property
+    def values(self) -> torch.Tensor:
+        return self._values[:self._length]
+
+    def _norm(self, inputs: torch.Tensor) -> torch.Tensor:
+        # Same as CosineKnnMemoryCollection._norm: zero vectors become vectors filled with 1/sqrt(embedding_dim).
+        # Norm is calculated in float32 since sum of squares easily overflows float16.
+        inputs_float = inputs.float()
+        norm = inputs_float.norm(dim=-1, keepdim=True)
+        filler_dim_value = 1 / np.sqrt(inputs.shape[-1])
+        inputs_normed = torch.where(norm == 0, torch.full_like(inputs_float, filler_dim_value), inputs_float / norm)
+        return inputs_normed.to(inputs.dtype)
+
+    def _reserve(self, capacity: int, dim: int) -> None:
+        current_capacity = 0 if self._keys is None else self._keys.shape[0]
+        if capacity <= current_capacity and not self._shared:
+            return
+        new_capacity = max(current_capacity, self.initial_capacity)
+        while new_capacity < capacity:
+            new_capacity *= 2
+        keys = torch.empty((new_capacity, dim), dtype=self.dtype, device=self.device)
+        values = torch.empty((new_capacity, dim), dtype=self.dtype, device=self.device)
+        if self._length:
+            keys[:self._length] = self.keys
+            values[:self._length] = self.values
+        self._keys = keys
+        self._values = values
+        self._shared = False
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        if self._length == 0:
+            return inputs
+        with torch.no_grad():
+            queries = self._norm(inputs.detach().to(device=self.device, dtype=self.dtype))
+            top_k = min(self.top_k, self._length)
+            best_scores = None
+            best_indices = None
+            for start in range(0, self._length, self.chunk_size):
+                end = min(start + self.chunk_size, self._length)
+                # (seq, chunk) cosine similarities
+                scores = queries @ self._keys[start:end].T
+                chunk_scores, chunk_indices = scores.topk(min(top_k, end - start), dim=-1)
+                chunk_indices += start
+                if best_scores is None:
+                    best_scores, best_indices = chunk_scores, chunk_indices
+                else:
+                    candidate_scores = torch.cat((best_scores, chunk_scores), dim=-1)
+                    candidate_indices = torch.cat((best_indices, chunk_indices), dim=-1)
+                    best_scores, order = candidate_scores.topk(top_k, dim=-1)
+                    best_indices = candidate_indices.gather(-1, order)
+            # (seq, top_k, dim)
+            return self._values[best_indices].to(dtype=inputs.dtype, device=inputs.device)
+
+    def _get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        namespaces = [self.namespace(row) for row in range(inputs.shape[0])]
+        lengths = [namespace._length for namespace in namespaces]
+        if len(namespaces) == 1 or min(lengths) < self.top_k:
+            return super()._get_batch(inputs)
+        with torch.no_grad():
+            # (batch, seq, dim)
+            queries = self._norm(inputs.detach().to(device=self.device, dtype=self.dtype))
+            batch_size, _, dim = queries.shape
+            max_length = max(lengths)
+            lengths = torch.tensor(lengths, device=self.device)
+            best_scores = None
+            best_indices = None
+            for start in range(0, max_length, self.chunk_size):
+                end = min(start + self.chunk_size, max_length)
+                # Rows keys are padded to the same length, padding is masked out of the search
+                keys = torch.zeros((batch_size, end - start, dim), dtype=self.dtype, device=self.device)
+                for row, namespace in enumerate(namespaces):
+                    row_end = min(end, namespace._length)
+                    if row_end > start:
+                        keys[row, :row_end - start] = namespace._keys[start:row_end]
+                # (batch, seq, chunk) cosine similarities
+                scores = torch.bmm(queries, keys.transpose(1, 2))
+                padding = torch.arange(start, end, device=self.device).unsqueeze(0) >= lengths.unsqueeze(1)
+                scores.masked_fill_(padding.unsqueeze(1), -torch.inf)
+                chunk_scores, chunk_indices = scores.topk(min(self.top_k, end - start), dim=-1)
+                chunk_indices += start
+                if best_scores is None:
+                    best_scores, best_indices = chunk_scores, chunk_indices
+                else:
+                    candidate_scores = torch.cat((best_scores, chunk_scores), dim=-1)
+                    candidate_indices = torch.cat((best_indices, chunk_indices), dim=-1)
+                    best_scores, order = candidate_scores.topk(self.top_k, dim=-1)
+                    best_indices = candidate_indices.gather(-1, order)
+            # (batch, seq, top_k, dim)
+            memories = torch.stack([namespace._values[best_indices[row]] for row, namespace in enumerate(namespaces)])
+            return memories.to(dtype=inputs.dtype, device=inputs.device)
+
+    def _add_filtered(self, inputs: torch.FloatTensor) -> None:
+        if inputs.shape[0] == 0:
+            return
+        with torch.no_grad():
+            if self.device is None:
+                self.device = inputs.device
+            if self.dtype is None:
+                self.dtype = inputs.dtype
+            vectors = inputs.detach().to(device=self.device, dtype=self.dtype)
+            count = vectors.shape[0]
+            self._reserve(self._length + count, vectors.shape[1])
+            self._keys[self._length : self._length + count] = self._norm(vectors)
+            self._values[self._length : self._length + count] = vectors
+            self._length += count
+
+    def to(self, device: torch.device) -> BaseMemoryCollection:
+        self.device = torch.device(device)
+        if self._keys is not None:
+            self._keys = self._keys.to(self.device)
+            self._values = self._values.to(self.device)
+        for namespace in self._namespaces.values():
+            namespace.to(self.device)
+        return self
 
     def save(self, directory: str) -> None:
         os.makedirs(directory, exist_ok=True)
-        with open(os.path.join(directory, "cosine-knn-memory.pkl"), "wb") as dst:
-            pickle.dump(self, dst)
+        state = {
+            "top_k": self.top_k,
+            "remember_until_position": self.remember_until_position,
+            "initial_capacity": self.initial_capacity,
+            "chunk_size": self.chunk_size,
+            "local2global_position_offset": self._local2global_position_offset,
+            "remembered_tokens": self._remembered_tokens,
+            "keys": self.keys.cpu() if self._keys is not None else None,
+            "values": self.values.cpu() if self._values is not None else None,
+        }
+        torch.save(state, os.path.join(directory, "torch-memory.pt"))
 
     @staticmethod
     def load(directory: str) -> BaseMemoryCollection:
-        with open(os.path.join(directory, "cosine-knn-memory.pkl"), "rb") as src:
-            memory = pickle.load(src)
-            assert isinstance(memory, CosineKnnMemoryCollection)
-            return memory
+        state = torch.load(os.path.join(directory, "torch-memory.pt"), map_location="cpu")
+        memory = TorchMemoryCollection(
+            top_k=state["top_k"],
+            remember_until_position=state["remember_until_position"],
+            initial_capacity=state["initial_capacity"],
+            chunk_size=state["chunk_size"],
+        )
+        memory._local2global_position_offset = state["local2global_position_offset"]
+        memory._remembered_tokens = state["remembered_tokens"]
+        if state["keys"] is not None:
+            memory.device = state["keys"].device
+            memory.dtype = state["keys"].dtype
+            memory._keys = state["keys"]
+            memory._values = state["values"]
+            memory._length = state["keys"].shape[0]
+        return memory
+
+# %% ../nbs/00_memory_collection.ipynb 13
+def _kmeans(vectors: np.ndarray, clusters: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Plain Lloyd's k-means (L2), returns (clusters, dim) centroids
+    """
+    random = np.random.RandomState(seed)
+    clusters = min(clusters, vectors.shape[0])
+    centroids = vectors[random.choice(vectors.shape[0], clusters, replace=False)].astype(np.float32)
+    vectors_sq = (vectors ** 2).sum(axis=1, keepdims=True)
+    for _ in range(iterations):
+        distances = vectors_sq - 2 * vectors @ centroids.T + (centroids ** 2).sum(axis=1)
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+    return centroids
+
+# %% ../nbs/00_memory_collection.ipynb 14
+class BaseVectorCodec:
+    """
+    Compression of (normed) vectors used by QuantizedMemoryCollection
+    """
+    name = None
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Fit codec parameters
+        :param vectors: normed vectors sample (2d float32 array)
+        """
+        pass
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        :param vectors: normed vectors (2d float32 array)
+        :returns: codes (2d array, one row per vector)
+        """
+        raise NotImplementedError()
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """
+        :param codes: codes (2d array, one row per vector)
+        :returns: approximately restored vectors (2d float32 array)
+        """
+        raise NotImplementedError()
+
+    def similarities(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products between the queries and the encoded vectors, (queries, codes) matrix
+        """
+        return queries @ self.decode(codes).T
+
+    def get_params(self) -> Dict[str, Any]:
+        """
+        Constructor arguments to save (json-serializable)
+        """
+        return {}
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """
+        Trained codec parameters to save
+        """
+        return {}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        pass
+
+# %% ../nbs/00_memory_collection.ipynb 15
+class Float16Codec(BaseVectorCodec):
+    name = "fp16"
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+# %% ../nbs/00_memory_collection.ipynb 16
+class Int8ScalarCodec(BaseVectorCodec):
+    """
+    Per-dimension scalar quantization into 256 levels between the (trained) per-dimension min and max
+    """
+    name = "int8"
+
+    def __init__(self) -> None:
+        self.minimum = None
+        self.scale = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.minimum is not None
+
+    def train(self, vectors: np.ndarray) -> None:
+        self.minimum = vectors.min(axis=0)
+        self.scale = np.maximum(vectors.max(axis=0) - self.minimum, 1e-8) / 255.0
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint((vectors - self.minimum) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes * self.scale + self.minimum).astype(np.float32)
+
+    def similarities(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # q . (minimum + scale * code) = q . minimum + (q * scale) . code, without decoding the codes
+        return (queries * self.scale) @ codes.T.astype(np.float32) + (queries @ self.minimum)[:, None]
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"minimum": self.minimum, "scale": self.scale}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.minimum = state["minimum"]
+        self.scale = state["scale"]
+
+# %% ../nbs/00_memory_collection.ipynb 17
+class ProductQuantizationCodec(BaseVectorCodec):
+    """
+    Product quantization: vector is split into `subvectors` parts,
+    each part is replaced with the id of the nearest of 256 (trained by k-means) centroids of it's subspace
+    """
+    name = "pq"
+
+    def __init__(self, subvectors: int, kmeans_iterations: int = 20, seed: int = 0) -> None:
+        assert subvectors > 0
+        self.subvectors = subvectors
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.codebooks = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        # (count, subvectors, subvector_dim)
+        assert vectors.shape[1] % self.subvectors == 0, "Embedding dim should be divisible by the subvector count"
+        return vectors.reshape((vectors.shape[0], self.subvectors, -1))
+
+    def train(self, vectors: np.ndarray) -> None:
+        parts = self._split(vectors)
+        codebooks = np.zeros((self.subvectors, 256, parts.shape[2]), dtype=np.float32)
+        for i in range(self.subvectors):
+            centroids = _kmeans(np.ascontiguousarray(parts[:, i, :]), 256, self.kmeans_iterations, self.seed + i)
+            codebooks[i, :centroids.shape[0]] = centroids
+            # Not enough training vectors - rest of the codes duplicate the first centroid and are never assigned
+            codebooks[i, centroids.shape[0]:] = centroids[0]
+        self.codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.zeros((vectors.shape[0], self.subvectors), dtype=np.uint8)
+        for i in range(self.subvectors):
+            codebook = self.codebooks[i]
+            distances = -2 * parts[:, i, :] @ codebook.T + (codebook ** 2).sum(axis=1)
+            codes[:, i] = distances.argmin(axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        # (count, subvectors, subvector_dim) -> (count, dim)
+        return self.codebooks[np.arange(self.subvectors), codes].reshape((codes.shape[0], -1))
+
+    def similarities(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Lookup table of (queries, subvectors, 256) partial dot products, summed over the subvectors
+        table = np.einsum("qsd,scd->qsc", self._split(queries), self.codebooks)
+        result = np.zeros((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for i in range(self.subvectors):
+            result += table[:, i, codes[:, i]]
+        return result
+
+    def get_params(self) -> Dict[str, Any]:
+        return {"subvectors": self.subvectors, "kmeans_iterations": self.kmeans_iterations, "seed": self.seed}
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def set_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.codebooks = state["codebooks"]
+
+# %% ../nbs/00_memory_collection.ipynb 18
+def _top_similarities(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Choose (and sort) k highest scores of every row
+    :param scores: (rows, candidates) similarities
+    :param indices: (rows, candidates) ids of the candidates
+    :returns: (rows, k) scores and ids
+    """
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        chosen = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, chosen, axis=1)
+        indices = np.take_along_axis(indices, chosen, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+# %% ../nbs/00_memory_collection.ipynb 19
+class QuantizedMemoryCollection(BaseMemoryCollection):
+    """
+    Brute-force cosine similarity memory over compressed vectors.
+    Every vector is kept as it's norm (float32) and the codec-compressed normed vector.
+    The codec is trained on the first `max_temporary_buffer_size` remembered vectors (the first sealed segment),
+    until then they are kept uncompressed. It stays trained after `reset`.
+    If `rerank_candidates` is set - this much approximate matches are re-ranked exactly
+    using full-precision vectors, which are kept in memory-mapped files if `storage_directory` is given.
+    """
+    def __init__(self, top_k: int,
+                 max_temporary_buffer_size: int,
+                 codec: BaseVectorCodec,
+                 remember_until_position: int = 0,
+                 rerank_candidates: int = 0,
+                 storage_directory: Optional[str] = None,
+                 chunk_size: int = 65536) -> None:
+        """
+        :param top_k: how much memories to extract for each input
+        :param max_temporary_buffer_size: how much vectors to collect before training the codec
+        :param codec: vector compression method
+        :param remember_until_position: remember only tokens with (global) position less than it
+        :param rerank_candidates: how much approximate matches to re-rank exactly (0 - no re-ranking)
+        :param storage_directory: where to keep full-precision vectors for re-ranking (RAM if None)
+        :param chunk_size: how much stored vectors are compared with the inputs at once
+        """
+        super().__init__(top_k, remember_until_position)
+        assert rerank_candidates == 0 or rerank_candidates >= top_k
+        self.max_temporary_buffer_size = max_temporary_buffer_size
+        self.codec = codec
+        self.rerank_candidates = rerank_candidates
+        self.chunk_size = chunk_size
+        self.pending = VectorArena(max_temporary_buffer_size)
+        self.exact = VectorArena(max_temporary_buffer_size, storage_directory) if rerank_candidates else None
+        self._codes = None
+        self._norms = None
+        self._length = 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.pending.clear()
+        if self.exact is not None:
+            self.exact.clear()
+        self._codes = None
+        self._norms = None
+        self._length = 0
+
+    def _new_namespace(self, row: int) -> BaseMemoryCollection:
+        storage_directory = None
+        if self.exact is not None and self.exact.directory is not None:
+            storage_directory = os.path.join(self.exact.directory, f"row-{row}")
+        # Trained codec is reused, an untrained one is trained by each row on it's own
+        return QuantizedMemoryCollection(self.top_k, self.max_temporary_buffer_size, copy.deepcopy(self.codec),
+                                         self.remember_until_position, self.rerank_candidates,
+                                         storage_directory, self.chunk_size)
+
+    def memory_bytes(self) -> int:
+        result = super().memory_bytes() + self.pending.nbytes
+        if self.exact is not None:
+            result += self.exact.nbytes
+        if self._codes is not None and not isinstance(self._codes, np.memmap):
+            result += self._codes.nbytes + self._norms.nbytes
+        return result
+
+    def mapped_bytes(self) -> int:
+        result = super().mapped_bytes()
+        if self.exact is not None:
+            result += self.exact.mapped_nbytes
+        if isinstance(self._codes, np.memmap):
+            result += self._codes.nbytes + self._norms.nbytes
+        return result
+
+    def __len__(self) -> int:
+        return self._length + len(self.pending)
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._codes[:self._length]
+
+    @property
+    def norms(self) -> np.ndarray:
+        return self._norms[:self._length]
+
+    def _norm(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Same as CosineKnnMemoryCollection._norm, but also returns the norms
+        norms = np.sqrt((vectors ** 2).sum(axis=-1))
+        filler_dim_value = 1 / np.sqrt(vectors.shape[-1])
+        vectors_normed = vectors / np.where(norms == 0, 1.0, norms)[:, None]
+        vectors_normed[norms == 0] = filler_dim_value
+        return vectors_normed, norms.astype(np.float32)
+
+    def _append_codes(self, codes: np.ndarray, norms: np.ndarray) -> None:
+        count = codes.shape[0]
+        capacity = 0 if self._codes is None else self._codes.shape[0]
+        if self._length + count > capacity:
+            new_capacity = max(capacity, self.max_temporary_buffer_size)
+            while new_capacity < self._length + count:
+                new_capacity *= 2
+            new_codes = np.empty((new_capacity, codes.shape[1]), dtype=codes.dtype)
+            new_norms = np.empty((new_capacity,), dtype=np.float32)
+            if self._length:
+                new_codes[:self._length] = self.codes
+                new_norms[:self._length] = self.norms
+            self._codes = new_codes
+            self._norms = new_norms
+        self._codes[self._length : self._length + count] = codes
+        self._norms[self._length : self._length + count] = norms
+        self._length += count
+
+    def _add_filtered(self, inputs: torch.FloatTensor) -> None:
+        with torch.no_grad():
+            vectors = inputs.detach().cpu().float().numpy()
+        if vectors.shape[0] == 0:
+            return
+        vectors_normed, norms = self._norm(vectors)
+        if self.exact is not None:
+            self.exact.append(vectors, vectors_normed)
+        if self.codec.is_trained:
+            self._append_codes(self.codec.encode(vectors_normed), norms)
+            return
+        self.pending.append(vectors, vectors_normed)
+        if len(self.pending) >= self.max_temporary_buffer_size:
+            self.codec.train(self.pending.vectors_normed)
+            _, pending_norms = self._norm(self.pending.vectors)
+            self._append_codes(self.codec.encode(self.pending.vectors_normed), pending_norms)
+            self.pending.clear()
+
+    def _approximate_top(self, queries: np.ndarray, k: int) -> np.ndarray:
+        # (seq, k) ids of the best approximate matches: encoded vectors first, then the pending ones
+        best_scores = np.zeros((queries.shape[0], 0), dtype=np.float32)
+        best_indices = np.zeros((queries.shape[0], 0), dtype=np.int64)
+        for start in range(0, self._length, self.chunk_size):
+            end = min(start + self.chunk_size, self._length)
+            scores = self.codec.similarities(queries, self._codes[start:end])
+            best_scores, best_indices = _top_similarities(
+                np.concatenate((best_scores, scores), axis=1),
+                np.concatenate((best_indices, np.broadcast_to(np.arange(start, end), scores.shape)), axis=1),
+                k,
+            )
+        if len(self.pending):
+            scores = queries @ self.pending.vectors_normed.T
+            best_scores, best_indices = _top_similarities(
+                np.concatenate((best_scores, scores), axis=1),
+                np.concatenate((best_indices, np.broadcast_to(np.arange(len(self.pending)) + self._length, scores.shape)), axis=1),
+                k,
+            )
+        return best_indices
+
+    def _reconstruct(self, indices: np.ndarray, dim: int) -> np.ndarray:
+        indices_flat = indices.reshape(-1)
+        vectors = np.zeros((indices_flat.shape[0], dim), dtype=np.float32)
+        encoded = indices_flat < self._length
+        if encoded.any():
+            encoded_indices = indices_flat[encoded]
+            vectors[encoded] = self.codec.decode(self._codes[encoded_indices]) * self._norms[encoded_indices, None]
+        if not encoded.all():
+            vectors[~encoded] = self.pending.vectors[indices_flat[~encoded] - self._length]
+        return vectors.reshape(indices.shape + (-1,))
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        if len(self) == 0:
+            return inputs
+        with torch.no_grad():
+            vectors = inputs.detach().cpu().float().numpy()
+        queries, _ = self._norm(vectors)
+        if self.exact is None:
+            vectors_chosen = self._reconstruct(self._approximate_top(queries, self.top_k), vectors.shape[1])
+        else:
+            # Exact re-ranking of the approximate candidates: (seq, rerank_candidates) -> (seq, top_k)
+            candidates = self._approximate_top(queries, self.rerank_candidates)
+            scores = np.einsum("sd,scd->sc", queries, self.exact.vectors_normed[candidates])
+            _, indices = _top_similarities(scores, candidates, self.top_k)
+            vectors_chosen = self.exact.vectors[indices]
+        with torch.no_grad():
+            return torch.from_numpy(vectors_chosen).to(dtype=inputs.dtype, device=inputs.device)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            "format": "quantized-memory",
+            "version": 1,
+            "top_k": self.top_k,
+            "max_temporary_buffer_size": self.max_temporary_buffer_size,
+            "remember_until_position": self.remember_until_position,
+            "rerank_candidates": self.rerank_candidates,
+            "chunk_size": self.chunk_size,
+            "local2global_position_offset": self._local2global_position_offset,
+            "remembered_tokens": self._remembered_tokens,
+            "codec": self.codec.name,
+            "codec_params": self.codec.get_params(),
+            "codec_trained": self.codec.is_trained,
+            "vectors": self._length,
+        }
+        if self.codec.is_trained:
+            np.savez(os.path.join(directory, "codec.npz"), **self.codec.get_state())
+        if self._length:
+            np.save(os.path.join(directory, "codes.npy"), self.codes)
+            np.save(os.path.join(directory, "norms.npy"), self.norms)
+        self.pending.save(os.path.join(directory, "pending"))
+        if self.exact is not None:
+            self.exact.save(os.path.join(directory, "exact"))
+        with open(os.path.join(directory, "manifest.json"), "w") as dst:
+            json.dump(manifest, dst, indent=2)
+
+    @staticmethod
+    def load(directory: str, storage_directory: Optional[str] = None) -> BaseMemoryCollection:
+        with open(os.path.join(directory, "manifest.json"), "r") as src:
+            manifest = json.load(src)
+        assert manifest["format"] == "quantized-memory"
+        codec_classes = {codec_class.name: codec_class
+                         for codec_class in [Float16Codec, Int8ScalarCodec, ProductQuantizationCodec]}
+        codec = codec_classes[manifest["codec"]](**manifest["codec_params"])
+        if manifest["codec_trained"]:
+            with np.load(os.path.join(directory, "codec.npz")) as state:
+                codec.set_state(dict(state))
+        memory = QuantizedMemoryCollection(
+            top_k=manifest["top_k"],
+            max_temporary_buffer_size=manifest["max_temporary_buffer_size"],
+            codec=codec,
+            remember_until_position=manifest["remember_until_position"],
+            rerank_candidates=manifest["rerank_candidates"],
+            storage_directory=storage_directory,
+            chunk_size=manifest["chunk_size"],
+        )
+        memory._local2global_position_offset = manifest["local2global_position_offset"]
+        memory._remembered_tokens = manifest["remembered_tokens"]
+        if manifest["vectors"]:
+            memory._codes = np.load(os.path.join(directory, "codes.npy"), mmap_mode="r")
+            memory._norms = np.load(os.path.join(directory, "norms.npy"), mmap_mode="r")
+            memory._length = manifest["vectors"]
+        memory.pending = VectorArena.load(os.path.join(directory, "pending"), memory.max_temporary_buffer_size)
+        if memory.exact is not None:
+            memory.exact = VectorArena.load(os.path.join(directory, "exact"), memory.max_temporary_buffer_size,
+                                            storage_directory)
+        return memory
+
+# %% ../nbs/00_memory_collection.ipynb 20
+class IVFMemoryCollection(BaseMemoryCollection):
+    """
+    Inverted-file approximate cosine similarity memory.
+    Once `train_size` vectors are remembered - `lists` coarse centroids are trained (spherical k-means)
+    and every vector is put to the posting list of it's closest centroid, new vectors are assigned incrementally.
+    Each query is compared only with vectors from the `nprobe` lists with the closest centroids,
+    so the retrieval cost is ~ nprobe / lists of the brute-force one. Until the centroids are trained
+    (and for queries whose probed lists have less than top_k vectors) the search is brute-force.
+    """
+    def __init__(self, top_k: int,
+                 lists: int,
+                 nprobe: int = 8,
+                 train_size: Optional[int] = None,
+                 remember_until_position: int = 0,
+                 storage_directory: Optional[str] = None,
+                 kmeans_iterations: int = 20,
+                 seed: int = 0) -> None:
+        """
+        :param top_k: how much memories to extract for each input
+        :param lists: how much coarse centroids (posting lists) to use
+        :param nprobe: how much closest posting lists to scan for each input (recall / latency tradeoff)
+        :param train_size: how much vectors to collect before training the centroids (32 * lists by default)
+        :param remember_until_position: remember only tokens with (global) position less than it
+        :param storage_directory: keep vectors in memory-mapped files inside this directory instead of RAM
+        :param kmeans_iterations: k-means iterations for the centroids training
+        :param seed: k-means initialization seed
+        """
+        super().__init__(top_k, remember_until_position)
+        assert lists > 0
+        assert nprobe > 0
+        self.lists = lists
+        self.nprobe = nprobe
+        self.train_size = train_size if train_size is not None else 32 * lists
+        assert self.train_size >= lists
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.arena = VectorArena(self.train_size, storage_directory)
+        self.centroids = None
+        self._clear_lists()
+
+    def _clear_lists(self) -> None:
+        # Posting lists are preallocated arrays of vector ids, their capacity is doubled when exhausted
+        self._postings = [np.zeros((0,), dtype=np.int64) for _ in range(self.lists)]
+        self._posting_sizes = np.zeros((self.lists,), dtype=np.int64)
+        self._assignments = np.zeros((0,), dtype=np.int64)
+        self._assigned = 0
+
+    def reset(self) -> None:
+        # Centroids stay trained, the posting lists are emptied
+        super().reset()
+        self.arena.clear()
+        self._clear_lists()
+
+    def _new_namespace(self, row: int) -> BaseMemoryCollection:
+        storage_directory = None if self.arena.directory is None else os.path.join(self.arena.directory, f"row-{row}")
+        memory = IVFMemoryCollection(self.top_k, self.lists, self.nprobe, self.train_size, self.remember_until_position,
+                                     storage_directory, self.kmeans_iterations, self.seed)
+        # Trained centroids are shared (they are never modified after training)
+        memory.centroids = self.centroids
+        return memory
+
+    def memory_bytes(self) -> int:
+        return super().memory_bytes() + self.arena.nbytes + self._assignments.nbytes + \
+            sum(postings.nbytes for postings in self._postings)
+
+    def mapped_bytes(self) -> int:
+        return super().mapped_bytes() + self.arena.mapped_nbytes
+
+    def __len__(self) -> int:
+        return len(self.arena)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def posting_list(self, i: int) -> np.ndarray:
+        """
+        Ids of the vectors assigned to i-th centroid
+        """
+        return self._postings[i][:self._posting_sizes[i]]
+
+    @property
+    def assignments(self) -> np.ndarray:
+        """
+        Posting list id of every indexed vector
+        """
+        return self._assignments[:self._assigned]
+
+    def _norm(self, inputs: np.ndarray) -> np.ndarray:
+        # Same as CosineKnnMemoryCollection._norm
+        filler_dim_value = 1 / np.sqrt(inputs.shape[-1])
+        norm = np.sqrt((inputs ** 2).sum(axis=-1, keepdims=True))
+        inputs_normed = inputs / np.where(norm == 0, 1.0, norm)
+        inputs_normed[norm[:, 0] == 0] = filler_dim_value
+        return inputs_normed
+
+    def _train(self) -> None:
+        centroids = _kmeans(self.arena.vectors_normed, self.lists, self.kmeans_iterations, self.seed)
+        # Spherical k-means: the closest centroid by the dot product is the closest by the cosine similarity
+        self.centroids = self._norm(centroids).astype(np.float32)
+        self.lists = self.centroids.shape[0]
+        self._clear_lists()
+
+    def _assign(self, vectors_normed: np.ndarray) -> np.ndarray:
+        return (vectors_normed @ self.centroids.T).argmax(axis=1)
+
+    def _append_postings(self, assignments: np.ndarray) -> None:
+        count = assignments.shape[0]
+        if self._assigned + count > self._assignments.shape[0]:
+            new_assignments = np.zeros((max(2 * self._assignments.shape[0], self._assigned + count),), dtype=np.int64)
+            new_assignments[:self._assigned] = self.assignments
+            self._assignments = new_assignments
+        self._assignments[self._assigned : self._assigned + count] = assignments
+        ids = np.arange(self._assigned, self._assigned + count)
+        self._assigned += count
+        order = np.argsort(assignments, kind="stable")
+        list_ids, starts = np.unique(assignments[order], return_index=True)
+        for list_id, ids_chunk in zip(list_ids, np.split(ids[order], starts[1:])):
+            size = self._posting_sizes[list_id]
+            postings = self._postings[list_id]
+            if size + ids_chunk.shape[0] > postings.shape[0]:
+                new_postings = np.zeros((max(2 * postings.shape[0], size + ids_chunk.shape[0]),), dtype=np.int64)
+                new_postings[:size] = postings[:size]
+                postings = new_postings
+                self._postings[list_id] = postings
+            postings[size : size + ids_chunk.shape[0]] = ids_chunk
+            self._posting_sizes[list_id] += ids_chunk.shape[0]
+
+    def _add_filtered(self, inputs: torch.FloatTensor) -> None:
+        with torch.no_grad():
+            vectors = inputs.detach().cpu().float().numpy()
+        if vectors.shape[0] == 0:
+            return
+        vectors_normed = self._norm(vectors)
+        self.arena.append(vectors, vectors_normed)
+        if not self.is_trained:
+            if len(self.arena) < self.train_size:
+                return
+            self._train()
+            vectors_normed = self.arena.vectors_normed
+        self._append_postings(self._assign(vectors_normed))
+
+    def _bruteforce_top(self, queries: np.ndarray, k: int) -> np.ndarray:
+        scores = queries @ self.arena.vectors_normed.T
+        _, indices = _top_similarities(scores, np.broadcast_to(np.arange(scores.shape[1]), scores.shape), k)
+        return indices
+
+    def _search(self, queries: np.ndarray, k: int, nprobe: int) -> np.ndarray:
+        # (seq, k) ids of the best matches within the probed posting lists
+        k = min(k, len(self.arena))
+        if not self.is_trained:
+            return self._bruteforce_top(queries, k)
+        nprobe = min(nprobe, self.lists)
+        # (seq, nprobe) closest posting lists of every query
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        best_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        best_indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        # Scan list by list, comparing it with the queries probing it only
+        for list_id in np.unique(probes):
+            ids = self.posting_list(list_id)
+            if ids.shape[0] == 0:
+                continue
+            rows = np.nonzero((probes == list_id).any(axis=1))[0]
+            scores = queries[rows] @ self.arena.vectors_normed[ids].T
+            best_scores[rows], best_indices[rows] = _top_similarities(
+                np.concatenate((best_scores[rows], scores), axis=1),
+                np.concatenate((best_indices[rows], np.broadcast_to(ids, scores.shape)), axis=1),
+                k,
+            )
+        incomplete = (best_indices < 0).any(axis=1)
+        if incomplete.any():
+            best_indices[incomplete] = self._bruteforce_top(queries[incomplete], k)
+        return best_indices
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        if len(self.arena) == 0:
+            return inputs
+        with torch.no_grad():
+            vectors = inputs.detach().cpu().float().numpy()
+        indices = self._search(self._norm(vectors), self.top_k, self.nprobe)
+        with torch.no_grad():
+            return torch.from_numpy(self.arena.vectors[indices]).to(dtype=inputs.dtype, device=inputs.device)
+
+    def recall(self, inputs: torch.FloatTensor, nprobe: Optional[int] = None) -> float:
+        """
+        Share of the exact (brute-force) top_k matches found by the index, to tune nprobe
+        :param inputs: (seq, dim) queries
+        :param nprobe: how much posting lists to scan (self.nprobe by default)
+        """
+        if len(self.arena) == 0:
+            return 1.0
+        with torch.no_grad():
+            queries = self._norm(inputs.detach().cpu().float().numpy())
+        found = self._search(queries, self.top_k, nprobe if nprobe is not None else self.nprobe)
+        exact = self._bruteforce_top(queries, self.top_k)
+        hits = sum(np.intersect1d(found_row, exact_row).shape[0] for found_row, exact_row in zip(found, exact))
+        return hits / exact.size
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            "format": "ivf-memory",
+            "version": 1,
+            "top_k": self.top_k,
+            "lists": self.lists,
+            "nprobe": self.nprobe,
+            "train_size": self.train_size,
+            "remember_until_position": self.remember_until_position,
+            "kmeans_iterations": self.kmeans_iterations,
+            "seed": self.seed,
+            "local2global_position_offset": self._local2global_position_offset,
+            "remembered_tokens": self._remembered_tokens,
+            "trained": self.is_trained,
+            "vectors": len(self.arena),
+        }
+        self.arena.save(directory)
+        if self.is_trained:
+            np.save(os.path.join(directory, "centroids.npy"), self.centroids)
+            np.save(os.path.join(directory, "assignments.npy"), self.assignments)
+        with open(os.path.join(directory, "manifest.json"), "w") as dst:
+            json.dump(manifest, dst, indent=2)
+
+    @staticmethod
+    def load(directory: str, storage_directory: Optional[str] = None) -> BaseMemoryCollection:
+        with open(os.path.join(directory, "manifest.json"), "r") as src:
+            manifest = json.load(src)
+        assert manifest["format"] == "ivf-memory"
+        memory = IVFMemoryCollection(
+            top_k=manifest["top_k"],
+            lists=manifest["lists"],
+            nprobe=manifest["nprobe"],
+            train_size=manifest["train_size"],
+            remember_until_position=manifest["remember_until_position"],
+            storage_directory=storage_directory,
+            kmeans_iterations=manifest["kmeans_iterations"],
+            seed=manifest["seed"],
+        )
+        memory._local2global_position_offset = manifest["local2global_position_offset"]
+        memory._remembered_tokens = manifest["remembered_tokens"]
+        memory.arena = VectorArena.load(directory, memory.train_size, storage_directory)
+        if manifest["trained"]:
+            memory.centroids = np.load(os.path.join(directory, "centroids.npy"))
+            # Posting lists are rebuilt from the per-vector assignments
+            memory._append_postings(np.load(os.path.join(directory, "assignments.npy")))
+        return memory
+
+# %% ../nbs/00_memory_collection.ipynb 21
+class MemoryPool(BaseMemoryCollection):
+    """
+    Memories of many sessions (conversations / documents) behind a single memory collection interface,
+    so the memorizing layer works with the active session memory.
+    Sessions memories are kept in RAM while they fit `max_memory_bytes`, the least recently used idle ones
+    are saved to `spill_directory` and dropped from RAM, and are loaded back transparently on the next access.
+    Loaded back memories memory-map the saved files, so the files are kept until the session is spilled again
+    (or dropped), and the mapped storage is counted towards the budget.
+    Like with `save` - the memories of the batch rows other than the first one are not spilled.
+    """
+    def __init__(self, memory_factory: Callable[[], BaseMemoryCollection],
+                 spill_directory: str,
+                 max_memory_bytes: int,
+                 remember_until_position: int = 0) -> None:
+        """
+        :param memory_factory: creates an empty memory for the new session
+        :param spill_directory: where to save the evicted sessions memories
+        :param max_memory_bytes: RAM budget for the sessions memories
+            (see `BaseMemoryCollection.memory_bytes` and `BaseMemoryCollection.mapped_bytes`)
+        :param remember_until_position: remember only tokens with (global) position less than it (for every session)
+        """
+        self.memory_factory = memory_factory
+        self.spill_directory = spill_directory
+        self.max_memory_bytes = max_memory_bytes
+        self.device = None
+        # Session id -> memory, in the least recently used first order
+        self.sessions = OrderedDict()
+        # Session id -> directory with the saved memory and it's class
+        self.spilled = {}
+        # Session id -> directory with the files the loaded back session memory may still memory-map
+        self.loaded_directories = {}
+        self.active_session = None
+        self._spills_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        super().__init__(0, remember_until_position)
+
+    @property
+    def memory(self) -> BaseMemoryCollection:
+        """
+        Memory of the active session
+        """
+        assert self.active_session is not None, "No session is activated, call `activate` first"
+        memory = self.sessions[self.active_session]
+        memory.remember_until_position = self.remember_until_position
+        return memory
+
+    @property
+    def version(self) -> Any:
+        return self.memory.version
+
+    @property
+    def position_offset(self) -> int:
+        return self.memory.position_offset
+
+    def seek(self, global_position: int) -> None:
+        self.memory.seek(global_position)
+
+    @property
+    def top_k(self) -> int:
+        if self.active_session is None:
+            return self._top_k
+        return self.memory.top_k
+
+    @top_k.setter
+    def top_k(self, value: int) -> None:
+        self._top_k = value
+
+    def activate(self, session_id: str) -> BaseMemoryCollection:
+        """
+        Make the session memory active (creating it or loading it back from the disk if needed)
+        :param session_id: session identifier
+        :returns: session memory
+        """
+        if session_id in self.sessions:
+            self.hits += 1
+            self.sessions.move_to_end(session_id)
+        else:
+            self.misses += 1
+            if session_id in self.spilled:
+                memory_class, directory = self.spilled.pop(session_id)
+                memory = memory_class.load(directory)
+                self.loaded_directories[session_id] = directory
+                self.loads += 1
+            else:
+                memory = self.memory_factory()
+            if self.device is not None:
+                memory = memory.to(self.device)
+            self.sessions[session_id] = memory
+        self.active_session = session_id
+        self._evict()
+        return self.memory
+
+    def drop(self, session_id: str) -> None:
+        """
+        Forget the session memory (both in RAM and on the disk)
+        """
+        self.sessions.pop(session_id, None)
+        if session_id in self.spilled:
+            _, directory = self.spilled.pop(session_id)
+            shutil.rmtree(directory, ignore_errors=True)
+        if session_id in self.loaded_directories:
+            shutil.rmtree(self.loaded_directories.pop(session_id), ignore_errors=True)
+        if self.active_session == session_id:
+            self.active_session = None
+
+    def memory_bytes(self) -> int:
+        """
+        Size of every session memory in RAM, including the memory-mapped storage of the loaded back ones
+        """
+        return sum(memory.memory_bytes() + memory.mapped_bytes() for memory in self.sessions.values())
+
+    def mapped_bytes(self) -> int:
+        # Already counted by `memory_bytes`
+        return 0
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Active session memory timings, and the size of every session memory in RAM
+        """
+        metrics = self.memory.metrics() if self.active_session is not None else {}
+        metrics["memory_bytes"] = self.memory_bytes()
+        return metrics
+
+    def _spill(self, session_id: str) -> None:
+        memory = self.sessions.pop(session_id)
+        # Every spill goes to the new directory: the memory may still memory-map the files of the previous one
+        directory = os.path.join(self.spill_directory, f"session-{self._spills_count}")
+        self._spills_count += 1
+        memory.save(directory)
+        self.spilled[session_id] = (type(memory), directory)
+        # The previous files are not needed anymore once the memory content is saved aside
+        if session_id in self.loaded_directories:
+            shutil.rmtree(self.loaded_directories.pop(session_id), ignore_errors=True)
+        self.evictions += 1
+
+    def _evict(self) -> None:
+        """
+        Spill the least recently used idle sessions until the rest fit the RAM budget
+        """
+        while self.memory_bytes() > self.max_memory_bytes:
+            idle_sessions = [session_id for session_id in self.sessions if session_id != self.active_session]
+            if not idle_sessions:
+                break
+            self._spill(idle_sessions[0])
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Pool counters
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "sessions_in_memory": len(self.sessions),
+            "sessions_spilled": len(self.spilled),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def reset(self) -> None:
+        """
+        Reset the active session memory
+        """
+        super().reset()
+        if self.active_session is not None:
+            self.memory.reset()
+
+    def namespace(self, row: int) -> BaseMemoryCollection:
+        return self.memory.namespace(row)
+
+    def set_row_remember_until_position(self, row: int, remember_until_position: int) -> None:
+        if row == 0:
+            self.remember_until_position = remember_until_position
+        else:
+            self.memory.set_row_remember_until_position(row, remember_until_position)
+
+    def fork(self) -> BaseMemoryCollection:
+        """
+        Fork of the active session memory (it is not a part of the pool)
+        """
+        return self.memory.fork()
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        return self.memory.get(inputs)
+
+    def get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        return self.memory.get_batch(inputs)
+
+    def add(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        self.memory.add(inputs, local_position_ids)
+        self._evict()
+
+    def add_batch(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        self.memory.add_batch(inputs, local_position_ids)
+        self._evict()
+
+    def to(self, device: torch.device) -> BaseMemoryCollection:
+        self.device = device
+        for session_id in self.sessions:
+            self.sessions[session_id] = self.sessions[session_id].to(device)
+        return self
+
+# %% ../nbs/00_memory_collection.ipynb 22
+class WriteBehindMemoryCollection(BaseMemoryCollection):
+    """
+    Memory wrapper which makes `add` / `add_batch` write-behind: they return right away,
+    while the wrapped memory remembers the inputs in a background thread (in the calls order).
+    Every other call waits for the pending writes first, so it sees the memory with all the previous chunks added.
+    So the (CPU) memory update overlaps with the rest of the model forward pass.
+    Give the wrapper (not the wrapped memory) both to the memorizing layers and to the trainer.
+    """
+    def __init__(self, memory: BaseMemoryCollection) -> None:
+        """
+        :param memory: memory to wrap
+        """
+        self.memory = memory
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending_writes = []
+        super().__init__(memory.top_k, memory.remember_until_position)
+
+    def flush(self) -> None:
+        """
+        Wait until every pending write is done (raising it's exception, if any)
+        """
+        pending_writes = self._pending_writes
+        self._pending_writes = []
+        for future in pending_writes:
+            future.result()
+
+    @property
+    def top_k(self) -> int:
+        return self.memory.top_k
+
+    @top_k.setter
+    def top_k(self, value: int) -> None:
+        self.memory.top_k = value
+
+    @property
+    def remember_until_position(self) -> int:
+        return self.memory.remember_until_position
+
+    @remember_until_position.setter
+    def remember_until_position(self, value: int) -> None:
+        # Pending writes are filtered with the value they were issued with
+        self.flush()
+        self.memory.remember_until_position = value
+
+    @property
+    def version(self) -> Any:
+        self.flush()
+        return self.memory.version
+
+    @property
+    def position_offset(self) -> int:
+        self.flush()
+        return self.memory.position_offset
+
+    def seek(self, global_position: int) -> None:
+        self.flush()
+        self.memory.seek(global_position)
+
+    def reset(self) -> None:
+        self.flush()
+        self.memory.reset()
+
+    def namespace(self, row: int) -> BaseMemoryCollection:
+        self.flush()
+        return self.memory.namespace(row)
+
+    def set_row_remember_until_position(self, row: int, remember_until_position: int) -> None:
+        self.flush()
+        self.memory.set_row_remember_until_position(row, remember_until_position)
+
+    def fork(self) -> BaseMemoryCollection:
+        self.flush()
+        return WriteBehindMemoryCollection(self.memory.fork())
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        self.flush()
+        return self.memory.get(inputs)
+
+    def get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        self.flush()
+        return self.memory.get_batch(inputs)
+
+    def add(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        self._pending_writes.append(self._executor.submit(self.memory.add, inputs.detach(), local_position_ids))
+
+    def add_batch(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        self._pending_writes.append(self._executor.submit(self.memory.add_batch, inputs.detach(), local_position_ids))
+
+    def memory_bytes(self) -> int:
+        self.flush()
+        return self.memory.memory_bytes()
+
+    def mapped_bytes(self) -> int:
+        self.flush()
+        return self.memory.mapped_bytes()
+
+    def metrics(self) -> Dict[str, float]:
+        self.flush()
+        return self.memory.metrics()
+
+    def to(self, device: torch.device) -> BaseMemoryCollection:
+        self.flush()
+        self.memory = self.memory.to(device)
+        return self
+
+    def save(self, directory: str) -> None:
+        self.flush()
+        self.memory.save(directory)
+
+# %% ../nbs/00_memory_collection.ipynb 23
+class MultiLayerMemoryCollection(BaseMemoryCollection):
+    """
+    Memories of several memorizing layers in a single store: every layer has it's own namespace (memory),
+    and the document bookkeeping calls (`reset` / `seek` / `remember_until_position` / `fork`) and persistence
+    of the store are forwarded to every layer memory, so the trainer / generator treat the store as a single memory.
+    The only shared resource is the thread pool fitting the knn indices of the sealed segments (if `index_workers`).
+    It is a container, not a layer-axis store: every layer memory keeps it's own arena, seals, indexes and searches
+    it's own segments, and is persisted as a separate payload (subdirectory).
+    Give the layers memories (`layer`) to the memorizing layers and the store itself to the trainer,
+    the store itself neither retrieves nor remembers anything.
+    """
+    def __init__(self, memory_factory: Callable[[], BaseMemoryCollection],
+                 layers: List[int],
+                 remember_until_position: int = 0,
+                 index_workers: int = 0) -> None:
+        """
+        :param memory_factory: creates an empty memory for the layer
+        :param layers: memorizing layers indices
+        :param remember_until_position: remember only tokens with (global) position less than it (for every layer)
+        :param index_workers: how much threads (shared among the layers) fit the knn indices of the sealed segments,
+                              used by the layers memories with their own `index_workers` set
+        """
+        assert len(layers) == len(set(layers)), "Layers should be unique"
+        self.memory_factory = memory_factory
+        self.index_workers = index_workers
+        self._index_executor = ThreadPoolExecutor(max_workers=index_workers) if index_workers else None
+        self.layers = OrderedDict()
+        for layer in layers:
+            self.layers[layer] = self._share_index_executor(memory_factory())
+        super().__init__(0, remember_until_position)
+
+    def _share_index_executor(self, memory: BaseMemoryCollection) -> BaseMemoryCollection:
+        if self._index_executor is not None and getattr(memory, "index_workers", 0):
+            memory._index_executor = self._index_executor
+        return memory
+
+    def layer(self, layer: int) -> BaseMemoryCollection:
+        """
+        Memory of the given layer
+        """
+        return self.layers[layer]
+
+    @property
+    def remember_until_position(self) -> int:
+        return self._remember_until_position
+
+    @remember_until_position.setter
+    def remember_until_position(self, value: int) -> None:
+        # Layers keep the references to their memories, so the value is set right away
+        self._remember_until_position = value
+        for memory in self.layers.values():
+            memory.remember_until_position = value
+
+    @property
+    def version(self) -> Any:
+        return tuple(memory.version for memory in self.layers.values())
+
+    @property
+    def position_offset(self) -> int:
+        return next(iter(self.layers.values())).position_offset
+
+    def seek(self, global_position: int) -> None:
+        for memory in self.layers.values():
+            memory.seek(min(global_position, memory._remembered_tokens))
+
+    @property
+    def top_k(self) -> int:
+        if not getattr(self, "layers", None):
+            return self._top_k
+        return next(iter(self.layers.values())).top_k
+
+    @top_k.setter
+    def top_k(self, value: int) -> None:
+        self._top_k = value
+
+    def reset(self) -> None:
+        """
+        Reset every layer memory
+        """
+        super().reset()
+        for memory in self.layers.values():
+            memory.reset()
+
+    def namespace(self, row: int) -> BaseMemoryCollection:
+        assert row == 0, "Use the layers memories namespaces"
+        return self
+
+    def set_row_remember_until_position(self, row: int, remember_until_position: int) -> None:
+        if row == 0:
+            self.remember_until_position = remember_until_position
+        else:
+            for memory in self.layers.values():
+                memory.set_row_remember_until_position(row, remember_until_position)
+
+    def fork(self) -> BaseMemoryCollection:
+        """
+        Fork of every layer memory, in the new store
+        """
+        fork = copy.copy(self)
+        fork._namespaces = {}
+        fork.layers = OrderedDict((layer, memory.fork()) for layer, memory in self.layers.items())
+        return fork
+
+    def _not_a_layer_memory(self) -> TypeError:
+        return TypeError("MultiLayerMemoryCollection is a store of the layers memories, "
+                         "retrieve and remember with the layer memory (`store.layer(layer_index)`) instead")
+
+    def get(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        raise self._not_a_layer_memory()
+
+    def get_batch(self, inputs: torch.FloatTensor) -> torch.FloatTensor:
+        raise self._not_a_layer_memory()
+
+    def add(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        raise self._not_a_layer_memory()
+
+    def add_batch(self, inputs: torch.FloatTensor, local_position_ids: torch.LongTensor) -> None:
+        raise self._not_a_layer_memory()
+
+    def memory_bytes(self) -> int:
+        return sum(self.memory_bytes_per_layer().values())
+
+    def mapped_bytes(self) -> int:
+        return sum(memory.mapped_bytes() for memory in self.layers.values())
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Timings, sizes and segment counts of every layer memory, summed
+        """
+        return merge_totals(*[memory.metrics() for memory in self.layers.values()])
+
+    def memory_bytes_per_layer(self) -> Dict[int, int]:
+        """
+        RAM taken by every layer memory (see `BaseMemoryCollection.memory_bytes`)
+        """
+        return {layer: memory.memory_bytes() for layer, memory in self.layers.items()}
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Per-layer memory counters (and the sealed segments stats of the memories having them)
+        """
+        stats = {}
+        for layer, memory in self.layers.items():
+            stats[layer] = {
+                "remembered_tokens": memory._remembered_tokens,
+                "memory_bytes": memory.memory_bytes(),
+            }
+            if hasattr(memory, "segment_stats"):
+                stats[layer].update(memory.segment_stats())
+        return stats
+
+    def to(self, device: torch.device) -> BaseMemoryCollection:
+        for layer in self.layers:
+            self.layers[layer] = self.layers[layer].to(device)
+        return self
+
+    def save(self, directory: str) -> None:
+        """
+        Save every layer memory into it's own subdirectory + small json manifest
+        """
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            "format": "multi-layer-memory",
+            "version": 1,
+            "remember_until_position": self.remember_until_position,
+            "index_workers": self.index_workers,
+            "layers": [],
+        }
+        for layer, memory in self.layers.items():
+            memory.save(os.path.join(directory, f"layer-{layer}"))
+            manifest["layers"].append({"layer": layer, "class": type(memory).__name__})
+        with open(os.path.join(directory, "manifest.json"), "w") as dst:
+            json.dump(manifest, dst, indent=2)
+
+    @staticmethod
+    def load(directory: str, memory_factory: Optional[Callable[[], BaseMemoryCollection]] = None) -> BaseMemoryCollection:
+        """
+        Load the store saved by `save`.
+        :param memory_factory: used for the layers added later, if any
+        """
+        with open(os.path.join(directory, "manifest.json"), "r") as src:
+            manifest = json.load(src)
+        assert manifest["format"] == "multi-layer-memory"
+        memory_classes = {
+            memory_class.__name__: memory_class
+            for memory_class in [CosineKnnMemoryCollection, TorchMemoryCollection,
+                                 QuantizedMemoryCollection, IVFMemoryCollection]
+        }
+        store = MultiLayerMemoryCollection(memory_factory, [],
+                                           remember_until_position=manifest["remember_until_position"],
+                                           index_workers=manifest["index_workers"])
+        for item in manifest["layers"]:
+            memory_class = memory_classes[item["class"]]
+            memory = memory_class.load(os.path.join(directory, f"layer-{item['layer']}"))
+            store.layers[item["layer"]] = store._share_index_executor(memory)
+        store.remember_until_position = manifest["remember_until_position"]
+        return store
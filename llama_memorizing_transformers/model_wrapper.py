@@ -1,28 +1,82 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/03_model_wrapper.ipynb.
 
 # %% auto 0
-__all__ = ['replace_llama_layer_with_memory']
+__all__ = ['replace_llama_layer_with_memory', 'replace_llama_layers_with_memory']
 
 # %% ../nbs/03_model_wrapper.ipynb 1
 from dataclasses import dataclass
-from typing import Dict, Any, Union
+from typing import Dict, Any, Optional, Union, List
 from transformers.models.llama import LlamaModel
 from .memorizing_block import MemorizingLlamaDecoderLayer
-from .memory_collection import BaseMemoryCollection, CosineKnnMemoryCollection
+from .memory_collection import BaseMemoryCollection, CosineKnnMemoryCollection, TorchMemoryCollection
+from .memory_collection import MultiLayerMemoryCollection
 from .context_choice import BaseContextChoice, ContextChoiceConstant, ContextChoiceLinear
 
 # %% ../nbs/03_model_wrapper.ipynb 3
 def replace_llama_layer_with_memory(model: LlamaModel,
                                     layer_index: int,
                                     context: BaseContextChoice,
-                                    memory: BaseMemoryCollection) -> LlamaModel:
+                                    memory: BaseMemoryCollection,
+                                    retrieval_cache_size: int = 0,
+                                    prefetch_distance: int = 0,
+                                    retrieval_threshold: Optional[float] = None,
+                                    retrieval_granularity: str = "token",
+                                    mixing: str = "unfused",
+                                    memory_layer: Optional[int] = None) -> LlamaModel:
     original_layer = model.layers[layer_index]
     new_layer = MemorizingLlamaDecoderLayer(
         module=original_layer,
         context_choice=context.to(model.device),
-        memory=memory,
-        device=model.device
+        memory=memory.to(model.device),
+        device=model.device,
+        retrieval_cache_size=retrieval_cache_size,
+        retrieval_threshold=retrieval_threshold,
+        retrieval_granularity=retrieval_granularity,
+        mixing=mixing,
+        memory_layer=memory_layer,
     )
     model.layers[layer_index] = new_layer
+    if prefetch_distance:
+        # Retrieval starts once the prefetch_distance-th preceding layer output is ready: for 1 it is the exact query
+        # (same outputs as without the prefetch), for more - an approximate one overlapping with the layers in between
+        # (outputs change, see `MemorizingLlamaDecoderLayer.prefetch`)
+        assert 0 < prefetch_distance <= layer_index
+        exact = prefetch_distance == 1
+        model.layers[layer_index - prefetch_distance].register_forward_hook(
+            lambda module, inputs, outputs: new_layer.prefetch(outputs[0] if isinstance(outputs, tuple) else outputs,
+                                                               exact=exact)
+        )
     model._memorizing_patch = True
     return model
+
+# %% ../nbs/03_model_wrapper.ipynb 4
+def replace_llama_layers_with_memory(model: LlamaModel,
+                                     layer_indices: List[int],
+                                     contexts: List[BaseContextChoice],
+                                     memory: MultiLayerMemoryCollection,
+                                     retrieval_cache_size: int = 0,
+                                     prefetch_distance: int = 0,
+                                     retrieval_threshold: Optional[float] = None,
+                                     retrieval_granularity: str = "token",
+                                     mixing: str = "unfused") -> LlamaModel:
+    """
+    Replace several layers with the memorizing ones, each using it's own namespace of the shared memory store.
+    Give the store itself to the trainer / generator, so they reset / seek every layer memory at once.
+    """
+    assert len(layer_indices) == len(contexts)
+    assert set(layer_indices) == set(memory.layers), "Store should have exactly the patched layers memories"
+    memory = memory.to(model.device)
+    for layer_index, context in sorted(zip(layer_indices, contexts), key=lambda item: item[0]):
+        model = replace_llama_layer_with_memory(
+            model,
+            layer_index,
+            context,
+            memory.layer(layer_index),
+            retrieval_cache_size=retrieval_cache_size,
+            prefetch_distance=prefetch_distance,
+            retrieval_threshold=retrieval_threshold,
+            retrieval_granularity=retrieval_granularity,
+            mixing=mixing,
+            memory_layer=layer_index,
+        )
+    return model
@@ -0,0 +1,149 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/14_perplexity.ipynb.
+
+# %% auto 0
+__all__ = ['SlidingWindowPerplexityEvaluator', 'perplexity_summary']
+
+# %% ../nbs/14_perplexity.ipynb 2
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import torch
+from torch.nn.functional import log_softmax
+from peft import PeftModelForCausalLM
+from transformers.models.llama import LlamaForCausalLM
+from .memory_collection import BaseMemoryCollection
+from .document_trainer import sliding_windows
+
+# %% ../nbs/14_perplexity.ipynb 3
+class SlidingWindowPerplexityEvaluator:
+    def __init__(self, model: Union[LlamaForCausalLM, PeftModelForCausalLM],
+                 tokens_per_chunk: int,
+                 tokens_step: int,
+                 memory: Optional[BaseMemoryCollection] = None,
+                 float16: bool = False) -> None:
+        """
+        :param model: plain model, or the model patched by `replace_llama_layer_with_memory`
+        :param tokens_per_chunk: window size (tokens_per_chunk = tokens_step >= document length - the whole document at once)
+        :param tokens_step: window stride, so every window but the first one scores tokens_step new tokens
+        :param memory: memory used by the patched layers (or their `MultiLayerMemoryCollection` store), None for the plain model.
+                       It is reset for every documents batch and fed with the windows like in `MemorizingLlamaDocumentTrainer`
+                       (the overlapping tokens are remembered again, until the document length tokens are remembered).
+        :param float16: run the model under `torch.cuda.amp.autocast`
+        """
+        if memory is not None:
+            if isinstance(model, LlamaForCausalLM):
+                assert hasattr(model.model, "_memorizing_patch")
+            elif isinstance(model, PeftModelForCausalLM):
+                assert hasattr(model.base_model.model.model, "_memorizing_patch")
+            else:
+                raise TypeError("Unknown model type")
+        assert 0 < tokens_step <= tokens_per_chunk
+        self.llama = model
+        self.tokens_per_chunk = tokens_per_chunk
+        self.tokens_step = tokens_step
+        self.memory = memory
+        self.float16 = float16
+
+    def _windows(self, length: int) -> Iterable[Tuple[int, int, int]]:
+        """
+        (start, end, first scored position) of every window over the inputs of the length tokens sequence -
+        positions 0 ... length - 2, which predict the next tokens. These are the trainer blocks (see `sliding_windows`),
+        but the ones with nothing new to score are not computed.
+        """
+        scored = 0
+        for start, end in sliding_windows(length - 1, self.tokens_per_chunk, self.tokens_step):
+            if end <= scored:
+                break
+            yield start, end, scored
+            scored = end
+
+    def _forward(self, tokens: torch.LongTensor, attention_mask: torch.FloatTensor) -> torch.FloatTensor:
+        def _inner() -> torch.FloatTensor:
+            return self.llama(input_ids=tokens, attention_mask=attention_mask, use_cache=False, return_dict=True).logits
+
+        if self.float16:
+            with torch.cuda.amp.autocast():
+                return _inner()
+        return _inner()
+
+    def _evaluate_batch(self, documents: List[torch.LongTensor]) -> Tuple[torch.FloatTensor, torch.LongTensor]:
+        """
+        :param documents: 1d token arrays
+        :returns: negative log-likelihood sum and scored tokens count of every document
+        """
+        device = self.llama.device
+        lengths = torch.tensor([document.shape[0] for document in documents], device=device)
+        tokens = torch.zeros((len(documents), int(lengths.max())), dtype=torch.long)
+        for row, document in enumerate(documents):
+            tokens[row, :document.shape[0]] = document
+        tokens = tokens.to(device)
+        # Padding is excluded by the lengths, not by the token ids (the padding token may be a real one)
+        positions = torch.arange(tokens.shape[1], device=device)
+        valid = positions.unsqueeze(0) < lengths.unsqueeze(1)
+        if self.memory is not None:
+            self.memory.reset()
+            for row, document in enumerate(documents):
+                self.memory.set_row_remember_until_position(row, document.shape[0])
+        nll = torch.zeros((len(documents),), device=device)
+        for start, end, scored in self._windows(tokens.shape[1]):
+            logits = self._forward(tokens[:, start:end], valid[:, start:end].float())
+            # Only the positions not scored by the previous windows
+            log_probabilities = log_softmax(logits[:, scored - start:].float(), dim=-1)
+            labels = tokens[:, scored + 1 : end + 1]
+            token_log_probabilities = log_probabilities.gather(-1, labels.unsqueeze(-1)).squeeze(-1)
+            nll -= (token_log_probabilities * valid[:, scored + 1 : end + 1]).sum(dim=1)
+        return nll.cpu(), (lengths - 1).clamp_min(0).cpu()
+
+    def evaluate(self, documents: Iterable[torch.LongTensor], batch_size: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the per-document results: "document" (index), "tokens" (scored tokens count),
+        "nll" (negative log-likelihood sum) and "perplexity"
+        :param documents: 1d token arrays
+        :param batch_size: how much consecutive documents to evaluate at once (padded to the longest one)
+        """
+        self.llama.eval()
+        batch = []
+        with torch.no_grad():
+            for index, document in enumerate(documents):
+                assert len(document.shape) == 1, "document tokens should be 1d array"
+                batch.append((index, document))
+                if len(batch) == batch_size:
+                    yield from self._batch_results(batch)
+                    batch = []
+            if batch:
+                yield from self._batch_results(batch)
+
+    def _batch_results(self, batch: List[Tuple[int, torch.LongTensor]]) -> Iterable[Dict[str, Any]]:
+        nll, tokens = self._evaluate_batch([document for _, document in batch])
+        results = []
+        for (index, _), document_nll, document_tokens in zip(batch, nll.tolist(), tokens.tolist()):
+            results.append({
+                "document": index,
+                "tokens": document_tokens,
+                "nll": document_nll,
+                "perplexity": math.exp(document_nll / document_tokens) if document_tokens else float("nan"),
+            })
+        return results
+
+# %% ../nbs/14_perplexity.ipynb 4
+def perplexity_summary(results: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Corpus perplexity (over all the scored tokens) and the mean of the documents perplexities
+    :param results: `SlidingWindowPerplexityEvaluator.evaluate` results
+    """
+    documents = 0
+    tokens = 0
+    nll = 0.0
+    perplexities = 0.0
+    for result in results:
+        if not result["tokens"]:
+            continue
+        documents += 1
+        tokens += result["tokens"]
+        nll += result["nll"]
+        perplexities += result["perplexity"]
+    return {
+        "documents": documents,
+        "tokens": tokens,
+        "perplexity": math.exp(nll / tokens) if tokens else float("nan"),
+        "mean_document_perplexity": perplexities / documents if documents else float("nan"),
+    }
@@ -0,0 +1,60 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/12_profiling.ipynb.
+
+# %% auto 0
+__all__ = ['StageTimer', 'merge_totals']
+
+# %% ../nbs/12_profiling.ipynb 2
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import torch
+
+# %% ../nbs/12_profiling.ipynb 3
+class StageTimer:
+    """
+    Cumulative wall time and calls count of the named stages.
+    Stages are marked by `torch.profiler.record_function` too, so they are visible in the profiler traces.
+    CUDA kernels run asynchronously, so their time is counted by the stage which waits for them.
+    """
+    def __init__(self) -> None:
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """
+        Count the time spent inside the context as the stage time
+        """
+        start = time.perf_counter()
+        try:
+            with torch.profiler.record_function(stage):
+                yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - start
+            self.calls[stage] += 1
+
+    def totals(self) -> Dict[str, float]:
+        """
+        {stage}_seconds and {stage}_calls of every stage measured so far
+        """
+        totals = {}
+        for stage in list(self.seconds):
+            totals[f"{stage}_seconds"] = self.seconds[stage]
+            totals[f"{stage}_calls"] = self.calls[stage]
+        return totals
+
+    def reset(self) -> None:
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+# %% ../nbs/12_profiling.ipynb 4
+def merge_totals(*totals: Dict[str, float]) -> Dict[str, float]:
+    """
+    Sum the totals (`StageTimer.totals`, memory metrics) of the several timers
+    """
+    merged = defaultdict(float)
+    for item in totals:
+        for key, value in item.items():
+            merged[key] += value
+    return dict(merged)
@@ -0,0 +1,253 @@
+# AUTOGENERATED! DO NOT EDIT! File to edit: ../nbs/11_token_corpus.ipynb.
+
+# %% ../nbs/11_token_corpus.ipynb 2
+from __future__ import annotations
+import os
+import json
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import torch
+
+# %% auto 0
+__all__ = ['TokenCorpus', 'CorpusDocumentLoader']
+
+# %% ../nbs/11_token_corpus.ipynb 3
+class TokenCorpus:
+    """
+    Memory-mapped pre-tokenized texts: `tokens.bin` with every text tokens one after another,
+    `offsets.npy` with the texts boundaries (texts + 1 items), and the named session sets -
+    `sessions-{name}-texts.npy` with the sessions texts indices one after another + `sessions-{name}-offsets.npy`.
+    The first text of the session is the document, the rest of the session texts are the prompt.
+    """
+    def __init__(self, directory: str) -> None:
+        """
+        Open the corpus written by `write` (token arrays are read from the disk lazily)
+        :param directory: corpus directory
+        """
+        with open(os.path.join(directory, "manifest.json"), "r") as src:
+            manifest = json.load(src)
+        assert manifest["format"] == "token-corpus"
+        self.directory = directory
+        self.dtype = np.dtype(manifest["dtype"])
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        if manifest["tokens"]:
+            self.tokens = np.memmap(os.path.join(directory, "tokens.bin"), dtype=self.dtype, mode="r",
+                                    shape=(manifest["tokens"],))
+        else:
+            # Empty files can not be memory-mapped
+            self.tokens = np.zeros((0,), dtype=self.dtype)
+        self.text_lengths = np.diff(self.offsets)
+        self.session_texts = {}
+        self.session_offsets = {}
+        for name in manifest["sessions"]:
+            self.session_texts[name] = np.load(os.path.join(directory, f"sessions-{name}-texts.npy"), mmap_mode="r")
+            self.session_offsets[name] = np.load(os.path.join(directory, f"sessions-{name}-offsets.npy"), mmap_mode="r")
+
+    @staticmethod
+    def write(directory: str, texts: Iterable[Sequence[int]],
+              sessions: Optional[Dict[str, Iterable[Sequence[int]]]] = None,
+              dtype: str = "uint16") -> TokenCorpus:
+        """
+        Write the corpus, streaming the texts tokens to the disk one by one
+        :param directory: corpus directory
+        :param texts: token ids of every text
+        :param sessions: session set name -> texts indices (positions in `texts`) of every session
+        :param dtype: "uint16" (vocabulary up to 65536 tokens) or "uint32"
+        """
+        assert dtype in {"uint16", "uint32"}
+        max_token = np.iinfo(dtype).max
+        os.makedirs(directory, exist_ok=True)
+        offsets = [0]
+        with open(os.path.join(directory, "tokens.bin"), "wb") as dst:
+            for text_tokens in texts:
+                text_tokens = np.asarray(text_tokens)
+                if text_tokens.shape[0] and (text_tokens.min() < 0 or text_tokens.max() > max_token):
+                    raise ValueError(f"Token ids do not fit {dtype}")
+                text_tokens.astype(dtype).tofile(dst)
+                offsets.append(offsets[-1] + text_tokens.shape[0])
+        np.save(os.path.join(directory, "offsets.npy"), np.array(offsets, dtype=np.int64))
+        sessions = sessions or {}
+        for name, name_sessions in sessions.items():
+            session_texts = []
+            session_offsets = [0]
+            for session in name_sessions:
+                assert len(session) > 0, "Session should have the document text at least"
+                session_texts.extend(session)
+                session_offsets.append(len(session_texts))
+            session_texts = np.array(session_texts, dtype=np.int64)
+            if session_texts.shape[0]:
+                assert 0 <= session_texts.min() and session_texts.max() < len(offsets) - 1, "Unknown text index"
+            np.save(os.path.join(directory, f"sessions-{name}-texts.npy"), session_texts)
+            np.save(os.path.join(directory, f"sessions-{name}-offsets.npy"), np.array(session_offsets, dtype=np.int64))
+        manifest = {
+            "format": "token-corpus",
+            "version": 1,
+            "dtype": dtype,
+            "texts": len(offsets) - 1,
+            "tokens": offsets[-1],
+            "sessions": list(sessions),
+        }
+        with open(os.path.join(directory, "manifest.json"), "w") as dst:
+            json.dump(manifest, dst, indent=2)
+        return TokenCorpus(directory)
+
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+
+    def text(self, index: int) -> np.ndarray:
+        """
+        Text token ids (memory-mapped, not copied)
+        """
+        return self.tokens[self.offsets[index] : self.offsets[index + 1]]
+
+    @property
+    def session_names(self) -> List[str]:
+        return list(self.session_texts)
+
+    def session_count(self, name: str) -> int:
+        return self.session_offsets[name].shape[0] - 1
+
+    def session(self, name: str, index: int) -> np.ndarray:
+        """
+        Texts indices of the session
+        """
+        offsets = self.session_offsets[name]
+        return self.session_texts[name][offsets[index] : offsets[index + 1]]
+
+    def session_lengths(self, name: str) -> np.ndarray:
+        """
+        Tokens count of every session of the set
+        """
+        offsets = self.session_offsets[name]
+        lengths = np.zeros((offsets.shape[0] - 1,), dtype=np.int64)
+        if lengths.shape[0]:
+            # Every session has the document text at least, so reduceat segments are never empty
+            lengths[:] = np.add.reduceat(self.text_lengths[self.session_texts[name]], offsets[:-1])
+        return lengths
+
+    def session_tokens(self, name: str, index: int) -> Tuple[torch.LongTensor, torch.LongTensor]:
+        """
+        Session as the trainer inputs
+        :returns: 1d document tokens and (1, length) prompt tokens
+        """
+        texts = self.session(name, index)
+        document_tokens = torch.from_numpy(self.text(texts[0]).astype(np.int64))
+        prompt_tokens = [self.text(text) for text in texts[1:]]
+        prompt_tokens = np.concatenate(prompt_tokens) if prompt_tokens else np.zeros((0,), dtype=self.dtype)
+        return document_tokens, torch.from_numpy(prompt_tokens.astype(np.int64)).view((1, -1))
+
+# %% ../nbs/11_token_corpus.ipynb 4
+class CorpusDocumentLoader:
+    """
+    Streams the corpus sessions as `(document_tokens, prompt_tokens, sample_weight)` items for
+    `MemorizingLlamaDocumentTrainer.train_document` (or as the `train_documents` batches),
+    reading the next sessions from the disk in a background thread while the current ones are trained on.
+    """
+    def __init__(self, corpus: TokenCorpus, sessions_name: str,
+                 min_length: int = 0,
+                 max_length: Optional[int] = None,
+                 shuffle: bool = False,
+                 random_state: Optional[int] = None,
+                 bucket_size: int = 0,
+                 prefetch: int = 16,
+                 sample_weight: float = 1.0) -> None:
+        """
+        :param corpus: token corpus
+        :param sessions_name: session set to stream
+        :param min_length: skip the sessions with less tokens
+        :param max_length: skip the sessions with more tokens (if set)
+        :param shuffle: stream the sessions in the random order (new one every iteration)
+        :param random_state: random seed for the shuffling
+        :param bucket_size: if set - sessions are sorted by length inside every consecutive bucket_size sessions,
+                            so the batches made of the neighbour sessions need less padding
+        :param prefetch: how much sessions to read ahead (0 - read them in the calling thread)
+        :param sample_weight: sample weight of every session
+        """
+        self.corpus = corpus
+        self.sessions_name = sessions_name
+        self.shuffle = shuffle
+        self.bucket_size = bucket_size
+        self.prefetch = prefetch
+        self.sample_weight = sample_weight
+        self._random = np.random.default_rng(random_state)
+        self.lengths = corpus.session_lengths(sessions_name)
+        mask = self.lengths >= min_length
+        if max_length is not None:
+            mask &= self.lengths <= max_length
+        self.sessions = np.nonzero(mask)[0]
+
+    def __len__(self) -> int:
+        return self.sessions.shape[0]
+
+    def _order(self) -> np.ndarray:
+        sessions = self._random.permutation(self.sessions) if self.shuffle else self.sessions
+        if not self.bucket_size:
+            return sessions
+        buckets = []
+        for start in range(0, sessions.shape[0], self.bucket_size):
+            bucket = sessions[start : start + self.bucket_size]
+            buckets.append(bucket[np.argsort(self.lengths[bucket], kind="stable")])
+        return np.concatenate(buckets) if buckets else sessions
+
+    def _read(self, sessions: np.ndarray) -> Iterator[Tuple[torch.LongTensor, torch.LongTensor, float]]:
+        for session in sessions:
+            document_tokens, prompt_tokens = self.corpus.session_tokens(self.sessions_name, session)
+            yield document_tokens, prompt_tokens, self.sample_weight
+
+    def __iter__(self) -> Iterator[Tuple[torch.LongTensor, torch.LongTensor, float]]:
+        sessions = self._order()
+        if not self.prefetch:
+            yield from self._read(sessions)
+            return
+        items = queue.Queue(maxsize=self.prefetch)
+        stopped = threading.Event()
+        finished = object()
+
+        def _put(item: object) -> bool:
+            # The consumer may stop early, then the producer should not wait for the free queue slots forever
+            while not stopped.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def _producer() -> None:
+            try:
+                for item in self._read(sessions):
+                    if not _put(item):
+                        return
+                _put(finished)
+            except BaseException as exception:
+                _put(exception)
+
+        producer = threading.Thread(target=_producer, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = items.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            producer.join()
+
+    def batches(self, batch_size: int) -> Iterator[Tuple[List[torch.LongTensor], List[torch.LongTensor], List[float]]]:
+        """
+        `(documents_tokens, prompts_tokens, sample_weights)` of every batch_size consecutive sessions,
+        for `MemorizingLlamaDocumentTrainer.train_documents`
+        """
+        batch = []
+        for item in self:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield tuple(map(list, zip(*batch)))
+                batch = []
+        if batch:
+            yield tuple(map(list, zip(*batch)))